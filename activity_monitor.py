@@ -0,0 +1,195 @@
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from viewer_metrics import metrics
+
+# Width and height of the grayscale buffer every frame is reduced to before it is compared
+ANALYSIS_SIZE = (64, 36)
+
+# BGRA byte order of RV32 frames: luma weights for B, G, R
+_LUMA = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def downsample_rv32(data, width, height, pitch, size=ANALYSIS_SIZE):
+    """Tiny grayscale float32 copy of an RV32 frame: strided sampling, then a 2x2 box average."""
+    target_width, target_height = size
+    pixels = np.frombuffer(data, dtype=np.uint8, count=pitch * height).reshape(height, pitch // 4, 4)[:, :width]
+    step_y = max(1, height // (target_height * 2))
+    step_x = max(1, width // (target_width * 2))
+    sampled = pixels[::step_y, ::step_x][:target_height * 2, :target_width * 2]
+    gray = sampled[..., :3].astype(np.float32) @ _LUMA
+    rows, columns = gray.shape[0] // 2 * 2, gray.shape[1] // 2 * 2
+    return gray[:rows, :columns].reshape(rows // 2, 2, columns // 2, 2).mean(axis=(1, 3))
+
+
+def decode_jpeg(jpeg, size=ANALYSIS_SIZE):
+    """(data, width, height, pitch) of a JPEG scaled down to about twice size, as RV32."""
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QImage
+    image = QImage.fromData(jpeg, "JPEG")
+    if image.isNull():
+        return None
+    image = image.scaled(size[0] * 2, size[1] * 2, Qt.IgnoreAspectRatio, Qt.FastTransformation)
+    image = image.convertToFormat(QImage.Format_RGB32)
+    return bytes(image.constBits().asarray(image.byteCount())), image.width(), image.height(), image.bytesPerLine()
+
+
+class _CameraActivity:
+    def __init__(self):
+        self.previous = None
+        self.heat = None
+        self.score = 0.0
+        self.active = False
+        self.since = 0.0
+        self.quiet_since = None
+        self.last_sample = 0.0
+        self.last_update = 0.0
+        self.last_seq = None
+        self.pending = False
+
+
+class ActivityMonitor:
+    """Per-camera activity scores from the difference of consecutive frames at low resolution.
+
+    The viewer asks due() on its timer and hands submit() a function that fetches the newest
+    frame; fetching, downsampling and comparing all happen on a small worker pool, at most
+    one frame per camera in flight, so the GUI thread never touches pixels. A camera turns
+    active when the share of changed cells reaches start_score and quiet again after staying
+    under stop_score for hold seconds; each change is an event. heatmap() is a decaying sum
+    of where the changes were.
+    """
+    def __init__(self, rate=2.0, threshold=12.0, start_score=0.02, stop_score=0.005, hold=5.0, decay=0.9,
+                 workers=2, event_capacity=500):
+        self.rate = rate
+        self.threshold = threshold
+        self.start_score = start_score
+        self.stop_score = stop_score
+        self.hold = hold
+        self.decay = decay
+        self._cameras = {}
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=event_capacity)
+        self._seq = itertools.count(1)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="activity")
+
+    def _state(self, camera):
+        state = self._cameras.get(camera)
+        if state is None:
+            state = self._cameras[camera] = _CameraActivity()
+        return state
+
+    def due(self, camera, now=None):
+        """True if camera should be sampled now: its interval has passed and nothing is in flight."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._state(camera)
+            return not state.pending and now - state.last_sample >= 1.0 / self.rate
+
+    def submit(self, camera, grab):
+        """Analyse the frame grab() returns (a FrameCache-style dict, or None) on the worker pool."""
+        with self._lock:
+            state = self._state(camera)
+            if state.pending:
+                return
+            state.pending = True
+            state.last_sample = time.monotonic()
+        self._pool.submit(self._analyse, camera, grab)
+
+    def _analyse(self, camera, grab):
+        try:
+            frame = grab()
+            with self._lock:
+                state = self._cameras.get(camera)
+                if frame is None or state is None or frame.get("seq") is not None and frame["seq"] == state.last_seq:
+                    return
+                state.last_seq = frame.get("seq")
+            if frame["format"] == "JPEG":
+                decoded = decode_jpeg(frame["data"])
+                if decoded is None:
+                    return
+                gray = downsample_rv32(*decoded)
+            else:
+                gray = downsample_rv32(frame["data"], frame["width"], frame["height"], frame["pitch"])
+            self._update(camera, gray)
+        except Exception as e:
+            metrics.event(f"Error analysing activity of {camera}: {str(e)}", camera=camera, level="error")
+        finally:
+            with self._lock:
+                state = self._cameras.get(camera)
+                if state:
+                    state.pending = False
+
+    def _update(self, camera, gray):
+        now = time.time()
+        with self._lock:
+            state = self._cameras.get(camera)
+            if state is None:
+                return
+            previous, state.previous = state.previous, gray
+            if previous is None or previous.shape != gray.shape:
+                state.heat = np.zeros_like(gray)
+                return
+            changed = np.abs(gray - previous) > self.threshold
+            score = float(changed.mean())
+            state.last_update = now
+            state.heat *= self.decay
+            state.heat += changed
+            state.score = score
+            started = stopped = False
+            if score >= self.start_score:
+                state.quiet_since = None
+                if not state.active:
+                    state.active = started = True
+                    state.since = now
+            elif state.active and score < self.stop_score:
+                if state.quiet_since is None:
+                    state.quiet_since = now
+                elif now - state.quiet_since >= self.hold:
+                    state.active = False
+                    stopped = True
+                    state.since = now
+        metrics.set("activity_score", round(score, 4), camera=camera)
+        if started or stopped:
+            record = {"seq": next(self._seq), "timestamp": now, "camera": camera,
+                      "state": "active" if started else "quiet", "score": round(score, 4)}
+            with self._lock:
+                self._events.append(record)
+            metrics.inc("activity_events_total", camera=camera, state=record["state"])
+            metrics.event(f"{camera}: activity {record['state']} (score {score:.3f})", camera=camera,
+                          level="info" if started else "debug")
+
+    def scores(self):
+        """{camera: {"score", "active", "since"}} for every camera sampled so far.
+
+        A camera whose frames stopped changing hands (paused, frozen, off screen) for longer
+        than hold is reported quiet, whatever it last was.
+        """
+        now = time.time()
+        with self._lock:
+            return {camera: {"score": round(state.score, 4),
+                             "active": state.active and now - state.last_update < self.hold + 2.0 / self.rate,
+                             "since": state.since}
+                    for camera, state in self._cameras.items()}
+
+    def heatmap(self, camera):
+        """Copy of camera's decaying change map (ANALYSIS_SIZE cells), or None before two samples."""
+        with self._lock:
+            state = self._cameras.get(camera)
+            return None if state is None or state.heat is None else state.heat.copy()
+
+    def events(self, since=0):
+        with self._lock:
+            return [record for record in self._events if record["seq"] > since]
+
+    def forget(self, camera):
+        with self._lock:
+            self._cameras.pop(camera, None)
+        metrics.set("activity_score", None, camera=camera)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+
+from viewer_metrics import metrics
+
+CONFIG_FILE = "vms_config.json"
+
+# 1: files written before schema_version existed (square grid_size only)
+# 2: grid_rows/grid_cols and schema_version
+SCHEMA_VERSION = 2
+
+
+def migrate(config):
+    """Upgrade a loaded config dict in place to SCHEMA_VERSION."""
+    version = config.get("schema_version", 1)
+    if version > SCHEMA_VERSION:
+        metrics.event(f"Config schema {version} is newer than this viewer ({SCHEMA_VERSION}); unknown keys are ignored",
+                      level="warning")
+    if version < 2:
+        grid_size = config.pop("grid_size", 2)
+        config.setdefault("grid_rows", grid_size)
+        config.setdefault("grid_cols", grid_size)
+    config["schema_version"] = max(version, SCHEMA_VERSION)
+    return config
+
+
+class ConfigStore:
+    """Writes vms_config.json from a background thread.
+
+    save() serialises the config on the caller's thread, which is cheap, and hands the text to
+    the writer thread; bursts collapse to the newest text. Every write goes to a temp file that
+    is fsynced and renamed over the config, so a crash leaves either the old or the new file,
+    never a torn one. Callables passed to defer() run on the same thread after the next write.
+    """
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = None
+        self._deferred = []
+        self._writing = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="config-writer", daemon=True)
+        self._thread.start()
+
+    def load(self):
+        """The migrated config dict; raises FileNotFoundError when there is none yet."""
+        with open(self.path, "r") as f:
+            return migrate(json.load(f))
+
+    def save(self, config):
+        config = dict(config, schema_version=SCHEMA_VERSION)
+        text = json.dumps(config, indent=4)
+        with self._wakeup:
+            self._pending = text
+            self._wakeup.notify()
+
+    def defer(self, task):
+        with self._wakeup:
+            if task not in self._deferred:
+                self._deferred.append(task)
+            self._wakeup.notify()
+
+    def flush(self, timeout=None):
+        """Wait until everything handed over so far is on disk; False on timeout."""
+        with self._wakeup:
+            return self._wakeup.wait_for(lambda: self._pending is None and not self._deferred and not self._writing,
+                                         timeout)
+
+    def close(self, timeout=None):
+        finished = self.flush(timeout)
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify_all()
+        return finished
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                self._wakeup.wait_for(lambda: self._pending is not None or self._deferred or self._closed)
+                if self._closed and self._pending is None and not self._deferred:
+                    return
+                text, self._pending = self._pending, None
+                tasks, self._deferred = self._deferred, []
+                self._writing = True
+            try:
+                if text is not None:
+                    self._write(text)
+            except Exception as e:
+                metrics.event(f"Error saving config: {str(e)}", level="error")
+            for task in tasks:
+                try:
+                    task()
+                except Exception as e:
+                    metrics.event(f"Error in deferred config task: {str(e)}", level="error")
+            with self._wakeup:
+                self._writing = False
+                self._wakeup.notify_all()
+
+    def _write(self, text):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,618 @@
+import ctypes
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import struct
+import sys
+import threading
+import time
+import types
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import vlc
+
+from viewer_metrics import metrics, camera_label
+
+# Shared frame buffer: a header (sequence, width, height, pitch, front slot) followed by
+# FRAME_SLOTS RV32 pictures. libVLC may hold two slots while the third is the displayed one.
+FRAME_HEADER = struct.Struct("<Q4I")
+HEADER_SIZE = 64
+FRAME_SLOTS = 3
+HEARTBEAT_INTERVAL = 0.5
+
+# Same declaration as video_renderer._FormatCb, repeated so decoder children never import Qt
+_FormatCb = ctypes.CFUNCTYPE(ctypes.c_uint, ctypes.POINTER(ctypes.c_void_p), ctypes.c_void_p,
+                             ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint),
+                             ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint))
+
+
+def _align(value, alignment=64):
+    return (value + alignment - 1) // alignment * alignment
+
+
+def frame_slot_size(max_size):
+    """Bytes per slot for RV32 pictures up to max_size (width, height)."""
+    width, height = max_size
+    return _align(_align(width, 8) * 4 * _align(height, 32))
+
+
+def fit_frame(source_width, source_height, max_size, slot_size=None):
+    """RV32 output size for a source picture scaled down to fit max_size, and its slot if given."""
+    scale = min(1.0, max_size[0] / max(1, source_width), max_size[1] / max(1, source_height))
+    # A width that is a multiple of 8 keeps the RV32 pitch a multiple of 32 bytes
+    out_width = max(8, int(source_width * scale) // 8 * 8)
+    out_height = max(2, int(source_height * scale) // 2 * 2)
+    while slot_size and out_width * 4 * _align(out_height, 32) > slot_size:
+        out_width = max(8, out_width * 3 // 4 // 8 * 8)
+        out_height = max(2, out_height * 3 // 4 // 2 * 2)
+    return out_width, out_height
+
+
+def frame_slot_offset(slot, slot_size):
+    return HEADER_SIZE + slot * slot_size
+
+
+def set_window(player, handle):
+    if sys.platform.startswith("win"):
+        player.set_hwnd(handle)
+    elif sys.platform == "darwin":
+        player.set_nsobject(handle)
+    else:
+        player.set_xwindow(handle)
+
+
+class _SharedFrameWriter:
+    """Child side: libVLC video callbacks that decode straight into the shared-memory slots."""
+    def __init__(self, shm, slot_size, max_size, max_fps):
+        self.shm = shm
+        self.slot_size = slot_size
+        self.max_size = max_size
+        self.max_fps = max_fps
+        self.width = self.height = self.pitch = 0
+        self.source_size = (0, 0)
+        self.seq = 0
+        self._base = ctypes.addressof(ctypes.c_char.from_buffer(shm.buf))
+        self._lock = threading.Lock()
+        self._front = None
+        self._locked = set()
+        self._last_display = 0.0
+        # Errors from libVLC's threads, sent to the parent by the child's main loop
+        self.errors = deque()
+        self._setup_cb = _FormatCb(self._setup)
+        self._cleanup_cb = vlc.CallbackDecorators.VideoCleanupCb(self._cleanup)
+        self._lock_cb = vlc.CallbackDecorators.VideoLockCb(self._lock_picture)
+        self._unlock_cb = vlc.CallbackDecorators.VideoUnlockCb(self._unlock_picture)
+        self._display_cb = vlc.CallbackDecorators.VideoDisplayCb(self._display_picture)
+
+    def attach(self, player):
+        player.video_set_callbacks(self._lock_cb, self._unlock_cb, self._display_cb, None)
+        player.video_set_format_callbacks(ctypes.cast(self._setup_cb, vlc.CallbackDecorators.VideoFormatCb),
+                                          self._cleanup_cb)
+
+    def _setup(self, opaque, chroma, width, height, pitches, lines):
+        try:
+            source_width, source_height = width[0], height[0]
+            # Whatever the requested size, a picture has to fit its slot
+            out_width, out_height = fit_frame(source_width, source_height, self.max_size, self.slot_size)
+            ctypes.memmove(chroma, b"RV32", 4)
+            width[0], height[0] = out_width, out_height
+            pitches[0], lines[0] = out_width * 4, _align(out_height, 32)
+            with self._lock:
+                self.width, self.height, self.pitch = out_width, out_height, out_width * 4
+                self.source_size = (source_width, source_height)
+                self._front = None
+                self._locked.clear()
+            return FRAME_SLOTS - 1
+        except Exception as e:
+            self.errors.append(f"Error configuring shared frames: {str(e)}")
+            return 0
+
+    def _cleanup(self, opaque):
+        with self._lock:
+            self._front = None
+            self._locked.clear()
+
+    def _lock_picture(self, opaque, planes):
+        with self._lock:
+            slot = next((i for i in range(FRAME_SLOTS) if i != self._front and i not in self._locked), 0)
+            self._locked.add(slot)
+            planes[0] = self._base + frame_slot_offset(slot, self.slot_size)
+        return slot + 1
+
+    def _unlock_picture(self, opaque, picture, planes):
+        pass
+
+    def _display_picture(self, opaque, picture):
+        slot = (picture or 1) - 1
+        now = time.monotonic()
+        with self._lock:
+            self._locked.discard(slot)
+            if self.max_fps and now - self._last_display < 1.0 / self.max_fps:
+                return
+            self._front = slot
+            self._last_display = now
+            self.seq += 1
+            FRAME_HEADER.pack_into(self.shm.buf, 0, self.seq, self.width, self.height, self.pitch, slot)
+
+
+def decoder_main(conn, url, options, vlc_args, shm_name=None, slot_size=0, window=None, max_size=(640, 360),
+                 max_fps=15, paused=False):
+    """Entry point of a decoder child: one libVLC instance and player for url.
+
+    Sends ("heartbeat", state, decoded, lost, bitrate) every HEARTBEAT_INTERVAL, plus
+    ("event", message, level) for errors the parent should log and ("format", width, height)
+    when the source picture size is known or changes, and serves commands from the parent.
+    Exits when told to quit or when the parent goes away.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name) if shm_name else None
+    instance = vlc.Instance(vlc_args)
+    player = instance.media_player_new()
+    writer = None
+    media = None
+    try:
+        # Kept for the heartbeat's stats; get_media() would add a reference every time
+        media = instance.media_new(url)
+        if shm:
+            writer = _SharedFrameWriter(shm, slot_size, max_size, max_fps)
+        _start_child_player(player, media, options, writer, window, paused)
+        stats = vlc.MediaStats()
+        source_size = (0, 0)
+        while True:
+            if conn.poll(HEARTBEAT_INTERVAL) and not _serve_command(conn, player, writer, *conn.recv()):
+                break
+            if not media.get_stats(stats):
+                stats = vlc.MediaStats()
+            conn.send(("heartbeat", player.get_state().value, stats.decoded_video, stats.lost_pictures,
+                       stats.input_bitrate))
+            if writer:
+                source_size = _report_writer(conn, writer, source_size)
+    except (EOFError, BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        player.stop()
+        player.release()
+        if media is not None:
+            media.release()
+        instance.release()
+        if shm:
+            writer = None
+            try:
+                shm.close()
+            except BufferError:
+                pass
+
+
+def _start_child_player(player, media, options, writer, window, paused):
+    for option in options:
+        media.add_option(option)
+    player.set_media(media)
+    if writer:
+        writer.attach(player)
+    elif window:
+        set_window(player, window)
+    player.play()
+    if paused:
+        player.set_pause(1)
+
+
+def _serve_command(conn, player, writer, command, *args):
+    """Carry out one command from the parent in the child; False when told to quit."""
+    if command == "quit":
+        return False
+    if command == "pause":
+        player.set_pause(args[0])
+    elif command == "play":
+        player.play()
+    elif command == "window":
+        set_window(player, args[0])
+    elif command == "limits" and writer:
+        writer.max_size, writer.max_fps = tuple(args[0]), args[1]
+    elif command == "snapshot":
+        request, path, width, height = args
+        conn.send(("reply", request, player.video_take_snapshot(0, path, width, height)))
+    return True
+
+
+def _report_writer(conn, writer, source_size):
+    """Send the frame writer's errors and a changed source size; returns the size sent last."""
+    while writer.errors:
+        conn.send(("event", writer.errors.popleft(), "error"))
+    if writer.source_size != source_size:
+        source_size = writer.source_size
+        conn.send(("format",) + source_size)
+    return source_size
+
+
+class ProcessMedia:
+    """What media_new() returns in process mode: the URL and options the child will open."""
+    def __init__(self, url):
+        self.url = url
+        self.options = []
+        self.player = None
+
+    def add_option(self, option):
+        self.options.append(option)
+
+    def get_mrl(self):
+        return self.url
+
+    def get_stats(self, stats):
+        if self.player is None:
+            return False
+        stats.decoded_video, stats.lost_pictures, stats.input_bitrate = self.player.stats()
+        return True
+
+    # libVLC parsing happens in the child once it plays; bring-up only sees "done"
+    def parse_with_options(self, flags, timeout):
+        return 0
+
+    def parse_stop(self):
+        pass
+
+    def get_parsed_status(self):
+        return vlc.MediaParsedStatus.done
+
+    def get_state(self):
+        return vlc.State.NothingSpecial
+
+    def tracks_get(self):
+        return []
+
+    def release(self):
+        pass
+
+
+class _EventManager:
+    def __init__(self):
+        self._callbacks = {}
+
+    def event_attach(self, event_type, callback, *args):
+        self._callbacks[event_type.value] = (callback, args)
+
+    def event_detach(self, event_type):
+        self._callbacks.pop(event_type.value, None)
+
+    def fire(self, event_type):
+        callback, args = self._callbacks.get(event_type.value, (None, ()))
+        if callback:
+            callback(types.SimpleNamespace(type=event_type), *args)
+
+
+class ProcessPlayer:
+    """Stands in for a vlc.MediaPlayer whose decoder runs in a child process.
+
+    Implements the part of the MediaPlayer API the viewer uses, so bring-up, the health
+    monitor, the lifecycle service and the warm pool treat it like any player. play() only
+    asks the host to spawn the child; stop() and release() end it (asking first, then
+    terminating). Pictures reach the parent through shared memory (video_renderer is a
+    SharedFrameRenderer) or through the window handle given to set_xwindow()/set_hwnd().
+    """
+    def __init__(self, host):
+        self.host = host
+        self.media = None
+        self.window = None
+        self.video_renderer = None
+        self.restarts = deque()
+        self._lock = threading.Lock()
+        self._events = _EventManager()
+        self._process = None
+        self._conn = None
+        self._shm = None
+        self._wanted = False
+        self._paused = False
+        self._spawn_at = None
+        self._last_heartbeat = 0.0
+        self._spawned_at = 0.0
+        self._state = vlc.State.NothingSpecial
+        self._stats = (0, 0, 0.0)
+        self._decoded_offset = 0
+        self._replies = {}
+        self._requests = itertools.count(1)
+        if host.shared_frames:
+            from video_renderer import SharedFrameRenderer
+            self._shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + FRAME_SLOTS * host.slot_size)
+            FRAME_HEADER.pack_into(self._shm.buf, 0, 0, 0, 0, 0, 0)
+            self.video_renderer = SharedFrameRenderer(self._shm.buf, host.slot_size, host.max_frame,
+                                                      on_limits=self._send_limits)
+
+    # MediaPlayer API
+
+    def set_media(self, media):
+        self.media = media
+        media.player = self
+
+    def get_media(self):
+        return self.media
+
+    def event_manager(self):
+        return self._events
+
+    def get_state(self):
+        return self._state
+
+    def play(self):
+        with self._lock:
+            self._wanted = True
+            self._paused = False
+            if self._process is None:
+                self._state = vlc.State.Opening
+                self._spawn_at = time.monotonic()
+                self.host.wake()
+                return 0
+        self._send(("play",))
+        return 0
+
+    def set_pause(self, paused):
+        self._paused = bool(paused)
+        self._send(("pause", int(paused)))
+
+    def stop(self):
+        with self._lock:
+            self._wanted = False
+            self._spawn_at = None
+            process, conn = self._process, self._conn
+            self._process = self._conn = None
+            self._state = vlc.State.Stopped
+        self._end(process, conn)
+
+    def release(self):
+        self.stop()
+        self.host.forget(self)
+        self.video_renderer = None
+        if self._shm:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def set_xwindow(self, handle):
+        self.window = handle
+        self._send(("window", handle))
+
+    set_hwnd = set_nsobject = set_xwindow
+
+    def video_take_snapshot(self, num, path, width, height):
+        request = next(self._requests)
+        reply = self._replies[request] = Future()
+        if not self._send(("snapshot", request, path, width, height)):
+            self._replies.pop(request, None)
+            return -1
+        try:
+            return reply.result(timeout=2.0)
+        except Exception:
+            return -1
+        finally:
+            self._replies.pop(request, None)
+
+    # Host side
+
+    def stats(self):
+        decoded, lost, bitrate = self._stats
+        return self._decoded_offset + decoded, lost, bitrate
+
+    def _send(self, message):
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                return False
+            try:
+                conn.send(message)
+                return True
+            except (OSError, ValueError):
+                return False
+
+    def _send_limits(self, max_size, max_fps):
+        self._send(("limits", max_size, max_fps))
+
+    def _spawn(self):
+        renderer = self.video_renderer
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = self.host.context.Process(
+            target=self.host.target, name="vlc-decoder", daemon=True,
+            args=(child_conn, self.media.url, self.media.options, self.host.vlc_args),
+            kwargs={"shm_name": self._shm.name if self._shm else None, "slot_size": self.host.slot_size,
+                    "window": self.window, "max_size": renderer.max_size if renderer else self.host.max_frame,
+                    "max_fps": renderer.max_fps if renderer else 0, "paused": self._paused})
+        process.start()
+        child_conn.close()
+        with self._lock:
+            if not self._wanted:
+                # stop() ran while the child was starting
+                stale = True
+            else:
+                stale = False
+                self._process, self._conn = process, parent_conn
+                self._last_heartbeat = self._spawned_at = time.monotonic()
+        if stale:
+            self._end(process, parent_conn)
+
+    def _receive(self):
+        try:
+            message = self._conn.recv()
+        except (EOFError, OSError, AttributeError):
+            return
+        if message[0] == "heartbeat":
+            _, state, decoded, lost, bitrate = message
+            self._last_heartbeat = time.monotonic()
+            self._stats = (decoded, lost, bitrate)
+            if state == vlc.State.Playing.value and decoded == 0 and self.restarts:
+                # A respawned child is not "Playing" for the health monitor until it shows a
+                # frame, otherwise the gap since the last frame before the crash counts as a stall
+                self._state = vlc.State.Buffering
+            else:
+                self._state = vlc.State(state)
+        elif message[0] == "reply":
+            reply = self._replies.get(message[1])
+            if reply and not reply.done():
+                reply.set_result(message[2])
+        elif message[0] == "event":
+            # The child has no metrics of its own; its events are logged here under the camera
+            metrics.event(message[1], camera=camera_label(self.media.url) if self.media else None, level=message[2])
+        elif message[0] == "format" and self.video_renderer:
+            self.video_renderer.source_size = tuple(message[1:])
+
+    def _end(self, process, conn):
+        if process is None:
+            return
+        try:
+            conn.send(("quit",))
+        except (OSError, ValueError):
+            pass
+        # A child stuck in libVLC gets a short grace period, then is terminated
+        process.join(0.3)
+        if process.is_alive():
+            process.terminate()
+            process.join(0.2)
+        if process.is_alive():
+            process.kill()
+        conn.close()
+
+    def _failed(self, reason, now):
+        """The child died or stopped answering: respawn it, or give up and report an error."""
+        with self._lock:
+            process, conn = self._process, self._conn
+            self._process = self._conn = None
+            if not self._wanted:
+                return
+            self._decoded_offset += self._stats[0]
+            self._stats = (0, 0, 0.0)
+            while self.restarts and now - self.restarts[0] > self.host.restart_window:
+                self.restarts.popleft()
+            give_up = len(self.restarts) >= self.host.max_restarts
+            if give_up:
+                self._wanted = False
+                self._state = vlc.State.Error
+            else:
+                self.restarts.append(now)
+                self._state = vlc.State.Opening
+                self._spawn_at = now + self.host.restart_delay * 2 ** (len(self.restarts) - 1)
+        camera = camera_label(self.media.url) if self.media else None
+        metrics.inc("decoder_restarts_total" if not give_up else "decoder_failures_total", camera=camera)
+        metrics.event(f"Decoder {reason}; {'giving up' if give_up else f'restart {len(self.restarts)}'}",
+                      camera=camera, level="warning")
+        self._end(process, conn)
+        if give_up:
+            self._events.fire(vlc.EventType.MediaPlayerEncounteredError)
+
+
+class DecoderProcessHost:
+    """Stands in for the vlc.Instance when every camera is decoded in its own child process.
+
+    A crash or deadlock in a camera's decoder then only takes down that child, and decoding
+    is spread over all cores instead of one process. A single supervisor thread waits on all
+    children: a child that exits or misses heartbeats for heartbeat_timeout is restarted
+    with doubling delays, and after max_restarts within restart_window its player reports
+    MediaPlayerEncounteredError, which the viewer's reconnect path already handles.
+    """
+    def __init__(self, vlc_args, shared_frames=True, max_frame=(1280, 720), heartbeat_timeout=3.0,
+                 max_restarts=3, restart_window=60.0, restart_delay=0.5, first_frame_timeout=15.0,
+                 target=decoder_main):
+        self.vlc_args = vlc_args
+        self.shared_frames = shared_frames
+        self.max_frame = tuple(max_frame)
+        self.slot_size = frame_slot_size(self.max_frame)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.restart_delay = restart_delay
+        self.first_frame_timeout = first_frame_timeout
+        self.target = target
+        # fork would copy the parent's Qt and libVLC threads into a state they cannot run in
+        self.context = multiprocessing.get_context("spawn")
+        self._players = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = multiprocessing.Pipe(duplex=False)
+        self._thread = threading.Thread(target=self._run, name="decoder-supervisor", daemon=True)
+        self._thread.start()
+
+    def media_new(self, url):
+        return ProcessMedia(url)
+
+    def media_player_new(self):
+        player = ProcessPlayer(self)
+        with self._lock:
+            self._players.add(player)
+        return player
+
+    def forget(self, player):
+        with self._lock:
+            self._players.discard(player)
+
+    def wake(self):
+        try:
+            self._wake_w.send(None)
+        except (OSError, ValueError):
+            pass
+
+    def release(self, timeout=1.0):
+        """Stop supervising and end every child still running."""
+        self._stop.set()
+        self.wake()
+        self._thread.join(timeout)
+        with self._lock:
+            players = list(self._players)
+        # Players normally ended through the lifecycle service; whatever is left is not waited for
+        for player in players:
+            process = player._process
+            if process is not None and process.is_alive():
+                process.terminate()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                players = list(self._players)
+            waitables = self._waitables(players)
+            try:
+                ready = multiprocessing.connection.wait(list(waitables), timeout=0.25)
+            except OSError:
+                continue
+            now = time.monotonic()
+            for item in ready:
+                if item is self._wake_r:
+                    self._drain_wake()
+                else:
+                    self._handle_ready(item, *waitables[item], now)
+            for player in players:
+                try:
+                    self._supervise(player, now)
+                except Exception as e:
+                    metrics.event(f"Error supervising decoder: {str(e)}", level="error")
+
+    def _waitables(self, players):
+        """What the supervisor waits on: the wake pipe, and each running child's pipe and exit sentinel."""
+        waitables = {self._wake_r: None}
+        for player in players:
+            process, conn = player._process, player._conn
+            if process is not None:
+                waitables[conn] = (player, "message")
+                waitables[process.sentinel] = (player, "exit")
+        return waitables
+
+    def _drain_wake(self):
+        try:
+            while self._wake_r.poll():
+                self._wake_r.recv()
+        except (EOFError, OSError):
+            pass
+
+    @staticmethod
+    def _handle_ready(item, player, kind, now):
+        if kind == "message":
+            player._receive()
+        elif player._process is not None and item == player._process.sentinel:
+            player._process.join(0.1)
+            player._failed(f"exited with code {player._process.exitcode}", now)
+
+    def _supervise(self, player, now):
+        """Fail a child that went silent or came back without video; respawn one whose delay is up."""
+        if player._process is not None and now - player._last_heartbeat > self.heartbeat_timeout:
+            player._failed("stopped sending heartbeats", now)
+        elif player._process is not None and player.restarts and player._stats[0] == 0 \
+                and not player._paused and now - player._spawned_at > self.first_frame_timeout:
+            player._failed("restarted without video", now)
+        elif player._process is None and player._wanted and player._spawn_at is not None \
+                and now >= player._spawn_at:
+            player._spawn_at = None
+            player._spawn()
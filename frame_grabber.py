@@ -0,0 +1,92 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+from PyQt5.QtCore import QBuffer, QIODevice
+from PyQt5.QtGui import QImage
+
+from probe_cache import normalize_url
+
+
+def encode_jpeg(data, width, height, pitch, quality=80):
+    """JPEG bytes for an RV32 frame as delivered by libVLC video callbacks."""
+    image = QImage(data, width, height, pitch, QImage.Format_RGB32)
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "JPEG", quality)
+    return bytes(buffer.data())
+
+
+class FrameCache:
+    """Thread-safe ring of the latest decoded frames per camera, keyed by normalised URL.
+
+    Frames arrive either already encoded (format "JPEG", from libVLC snapshots) or raw RV32
+    from video callbacks; raw frames are JPEG-encoded on first request and the result is kept
+    with the frame, so any number of readers of the same frame cost one encode.
+    """
+    def __init__(self, depth=3, quality=80):
+        self.depth = depth
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._frames = {}
+        self._seq = itertools.count(1)
+
+    def push(self, url, data, width=0, height=0, fmt="JPEG", pitch=0):
+        frame = {
+            "seq": next(self._seq),
+            "timestamp": time.time(),
+            "width": width,
+            "height": height,
+            "format": fmt,
+            "pitch": pitch,
+            "data": bytes(data),
+        }
+        frame["jpeg"] = frame["data"] if fmt == "JPEG" else None
+        with self._changed:
+            self._frames.setdefault(normalize_url(url), deque(maxlen=self.depth)).append(frame)
+            self._changed.notify_all()
+        return frame["seq"]
+
+    def latest(self, url):
+        """Newest frame for url as a dict (seq, timestamp, width, height, format, data), or None."""
+        with self._lock:
+            ring = self._frames.get(normalize_url(url))
+            return dict(ring[-1]) if ring else None
+
+    def frames(self, url):
+        with self._lock:
+            return [dict(frame) for frame in self._frames.get(normalize_url(url), ())]
+
+    def jpeg(self, url):
+        """(seq, timestamp, jpeg_bytes) for the newest frame of url, or None."""
+        with self._lock:
+            ring = self._frames.get(normalize_url(url))
+            frame = ring[-1] if ring else None
+        if frame is None:
+            return None
+        if frame["jpeg"] is None:
+            # Two readers may race to encode the same frame; both produce the same bytes
+            frame["jpeg"] = encode_jpeg(frame["data"], frame["width"], frame["height"], frame["pitch"],
+                                        self.quality)
+        return frame["seq"], frame["timestamp"], frame["jpeg"]
+
+    def wait(self, url, after_seq, timeout):
+        """Block until url has a frame newer than after_seq or timeout passes; True if it has."""
+        key = normalize_url(url)
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: bool(self._frames.get(key)) and self._frames[key][-1]["seq"] > after_seq, timeout)
+
+    def forget(self, url):
+        with self._lock:
+            self._frames.pop(normalize_url(url), None)
+
+    def snapshot(self):
+        """Age in seconds and size of the newest frame per camera."""
+        now = time.time()
+        with self._lock:
+            return {key: {"age": round(now - ring[-1]["timestamp"], 3), "width": ring[-1]["width"],
+                          "height": ring[-1]["height"]}
+                    for key, ring in self._frames.items() if ring}
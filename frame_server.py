@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from probe_cache import normalize_url
+from rtsp_probe import RTSPProbeError, split_credentials
+from viewer_metrics import camera_label, metrics
+
+DEFAULT_SNAPSHOT_PORT = 8091
+
+
+def public_url(url):
+    try:
+        return split_credentials(url)[0]
+    except RTSPProbeError:
+        return url
+
+
+class _FrameRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.handle_request(self.route_get)
+
+    def do_POST(self):
+        self.handle_request(self.route_post)
+
+    def handle_request(self, route):
+        parsed = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(parsed.query)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                # Form-encoded body fields, e.g. a camera URL that should not end up in access logs
+                params.update(urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8", "replace")))
+            route(parsed.path, params)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except LookupError as e:
+            self.send_error(404, str(e))
+        except ValueError as e:
+            self.send_error(400, str(e))
+
+    def route_post(self, path, params):
+        if path == "/clip" and self.server.recorder:
+            self.send_clip(self.resolve_camera(params), params)
+        else:
+            self.send_error(404)
+
+    def route_get(self, path, params):
+        if path == "/cameras":
+            self.send_cameras()
+        elif path == "/snapshot":
+            self.send_snapshot(self.resolve_camera(params))
+        elif path == "/mjpeg":
+            self.send_mjpeg(self.resolve_camera(params))
+        elif path == "/clip" and self.server.recorder:
+            # Cutting a clip writes files, so it is not done for a GET
+            self.send_error(405, "Use POST for /clip")
+        elif path == "/recording" and self.server.segment_index:
+            self.send_recording(self.resolve_camera(params), params)
+        elif path == "/activity" and self.server.activity:
+            self.send_activity(params)
+        elif path == "/metrics" and self.server.metrics:
+            self.send_body(self.server.metrics.prometheus_text().encode(), "text/plain; version=0.0.4")
+        elif path == "/metrics.json" and self.server.metrics:
+            self.send_json(self.server.metrics.as_json())
+        elif path == "/events" and self.server.metrics:
+            self.send_json(self.server.metrics.events(int(params.get("since", ["0"])[0])))
+        else:
+            self.send_error(404)
+
+    def resolve_camera(self, params):
+        """?camera=N is the 1-based position in the viewer's camera list, ?url= the RTSP URL itself."""
+        if "url" in params:
+            return params["url"][0]
+        cameras = self.server.cameras()
+        try:
+            return cameras[int(params["camera"][0]) - 1]
+        except (KeyError, ValueError, IndexError):
+            raise LookupError("Unknown camera")
+
+    def send_cameras(self):
+        frames = self.server.frame_cache.snapshot()
+        cameras = []
+        for number, url in enumerate(self.server.cameras(), start=1):
+            frame = frames.get(normalize_url(url))
+            cameras.append({"camera": number, "url": public_url(url), "frame": frame})
+        self.send_json(cameras)
+
+    def send_clip(self, url, params):
+        pre = float(params["pre"][0]) if "pre" in params else None
+        post = float(params.get("post", ["10"])[0])
+        path, _ = self.server.recorder.save_clip(url, pre_seconds=pre, post_seconds=post)
+        self.send_json({"camera": public_url(url), "path": path, "post_seconds": post})
+
+    def send_recording(self, url, params):
+        from segment_index import parse_when
+        if "start" not in params:
+            raise ValueError("start is required")
+        start = parse_when(params["start"][0])
+        end = parse_when(params["end"][0]) if "end" in params else time.time()
+        ranges = self.server.segment_index.ranges(url, start, end)
+        if not ranges:
+            raise LookupError("Nothing recorded for this camera in that range")
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp2t")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for data in self.server.segment_index.read(ranges):
+            if self.server.stopping.is_set():
+                break
+            self.wfile.write(data)
+
+    def send_activity(self, params):
+        monitor = self.server.activity
+        result = {"cameras": monitor.scores(), "events": monitor.events(int(params.get("since", ["0"])[0]))}
+        if "heatmap" in params:
+            camera = camera_label(self.resolve_camera(params))
+            heat = monitor.heatmap(camera)
+            result["heatmap"] = None if heat is None else heat.round(2).tolist()
+        self.send_json(result)
+
+    def send_json(self, data):
+        self.send_body(json.dumps(data, default=str).encode(), "application/json")
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_snapshot(self, url):
+        result = self.server.frame_cache.jpeg(url)
+        if result is None:
+            raise LookupError("No frame for this camera yet")
+        _, timestamp, jpeg = result
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(jpeg)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Frame-Age", f"{time.time() - timestamp:.3f}")
+        self.end_headers()
+        self.wfile.write(jpeg)
+
+    def send_mjpeg(self, url):
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        seq = 0
+        interval = 1.0 / self.server.mjpeg_fps
+        while not self.server.stopping.is_set():
+            if not self.server.frame_cache.wait(url, seq, 1.0):
+                continue
+            result = self.server.frame_cache.jpeg(url)
+            if result is None:
+                # The camera was forgotten while we waited
+                break
+            seq, _, jpeg = result
+            self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+            self.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+            self.wfile.write(jpeg)
+            self.wfile.write(b"\r\n")
+            time.sleep(interval)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FrameServer:
+    """Optional local HTTP endpoint for the frame cache.
+
+    GET /cameras lists the cameras with the age of their latest frame, /snapshot?camera=N (or
+    ?url=) returns the latest frame as JPEG and /mjpeg?camera=N streams it as multipart MJPEG.
+    Binds to localhost by default; the camera list leaves credentials out of the URLs.
+    Given a ViewerMetrics, it also serves /metrics (Prometheus text), /metrics.json and
+    /events?since=SEQ from the metrics' last published snapshot. Given a Recorder, POST
+    /clip with camera=N (or url=), pre=S and post=S as query or form fields starts an event clip
+    and returns the path it is written to.
+    Given a SegmentIndex, GET /recording?camera=N&start=T[&end=T] streams the recorded MPEG-TS
+    from the keyframe at or before start, which is how the viewer plays recordings back.
+    Given an ActivityMonitor, GET /activity?since=SEQ returns the activity scores and events,
+    plus &heatmap=1&camera=N the change map of one camera.
+    """
+    def __init__(self, frame_cache, cameras, host="127.0.0.1", port=DEFAULT_SNAPSHOT_PORT, mjpeg_fps=5,
+                 metrics=None, recorder=None, segment_index=None, activity=None):
+        self.httpd = ThreadingHTTPServer((host, port), _FrameRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.frame_cache = frame_cache
+        self.httpd.cameras = cameras
+        self.httpd.mjpeg_fps = mjpeg_fps
+        self.httpd.metrics = metrics
+        self.httpd.recorder = recorder
+        self.httpd.segment_index = segment_index
+        self.httpd.activity = activity
+        self.httpd.stopping = threading.Event()
+        # Short poll interval: stop() waits for it and runs inside the viewer's shutdown deadline
+        self._thread = threading.Thread(target=self.httpd.serve_forever, args=(0.1,), name="frame-server",
+                                        daemon=True)
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def start(self):
+        self._thread.start()
+        metrics.event(f"Frame server listening on http://{self.address[0]}:{self.address[1]}")
+
+    def stop(self):
+        self.httpd.stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
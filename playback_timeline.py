@@ -0,0 +1,254 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import vlc
+
+from viewer_metrics import metrics, camera_label
+
+# Playback speeds offered by the viewer's timeline bar
+PLAYBACK_RATES = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+
+# Frame length assumed by step(); cameras that record at another rate are resynchronised on resume
+STEP_SECONDS = 1 / 25
+
+
+def prefetch(path):
+    """Pull path into the OS page cache ahead of playback: posix_fadvise where there is one, else read it through."""
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    except OSError:
+        return
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while os.read(fd, 1024 * 1024):
+                pass
+    finally:
+        os.close(fd)
+
+
+class PlaybackClock:
+    """Position of a synchronised playback in wall-clock seconds of the recording.
+
+    Kept as an anchor (position, monotonic time) plus a rate, so reading it is arithmetic and
+    pause, seek and speed changes only move the anchor.
+    """
+    def __init__(self, position=0.0, rate=1.0):
+        self.rate = rate
+        self.paused = True
+        self._position = position
+        self._anchor = time.monotonic()
+
+    def position(self, now=None):
+        if self.paused:
+            return self._position
+        now = time.monotonic() if now is None else now
+        return self._position + (now - self._anchor) * self.rate
+
+    def _reanchor(self, position=None):
+        now = time.monotonic()
+        self._position = self.position(now) if position is None else position
+        self._anchor = now
+
+    def seek(self, position):
+        self._reanchor(position)
+
+    def play(self):
+        self._reanchor()
+        self.paused = False
+
+    def pause(self):
+        self._reanchor()
+        self.paused = True
+
+    def set_rate(self, rate):
+        self._reanchor()
+        self.rate = rate
+
+
+class _TimelineTile:
+    def __init__(self, key, url, player):
+        self.key = key
+        self.url = url
+        self.camera = camera_label(url)
+        self.player = player
+        self.segment = None
+        self.loaded_at = 0.0
+        self.prefetched = None
+        self.visible = True
+        self.status = None
+
+
+class PlaybackTimeline:
+    """Recorded cameras played side by side against one PlaybackClock.
+
+    Tiles play the segment files straight from disk: they are seekable, so libVLC seeks to
+    the exact time instead of the keyframe before it, and a seek inside the current segment
+    is a set_time() rather than a reopen. tick() keeps every visible tile within max_drift of
+    the clock, moves tiles across segment boundaries and gaps, and prefetches the next
+    segment on a small thread pool before it is needed. Hidden tiles are paused, so only
+    what is on screen decodes; they catch up with the clock when shown again.
+    """
+    def __init__(self, instance, index, position, max_drift=0.25, file_caching=1000, prefetch_seconds=15.0,
+                 on_status=None):
+        self.instance = instance
+        self.index = index
+        self.max_drift = max_drift
+        self.file_caching = file_caching
+        self.prefetch_seconds = prefetch_seconds
+        self.on_status = on_status
+        self.clock = PlaybackClock(position)
+        self.tiles = {}
+        self._prefetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="playback-prefetch")
+
+    def add(self, key, url):
+        """Create the player for tile key showing url; the caller attaches it to a window."""
+        player = self.instance.media_player_new()
+        self.tiles[key] = _TimelineTile(key, url, player)
+        return player
+
+    def position(self):
+        return self.clock.position()
+
+    def set_visible(self, keys):
+        for key, tile in self.tiles.items():
+            visible = key in keys
+            if visible == tile.visible:
+                continue
+            tile.visible = visible
+            if not visible and tile.segment:
+                tile.player.set_pause(1)
+            elif visible:
+                self._sync_tile(tile, self.clock.position(), force=True)
+                if tile.segment and not self.clock.paused:
+                    # It was paused when hidden; a seek inside its segment does not resume it
+                    tile.player.set_pause(0)
+
+    def play(self):
+        self.clock.play()
+        for tile in self._visible():
+            if tile.segment:
+                tile.player.set_pause(0)
+        self.tick()
+
+    def pause(self):
+        self.clock.pause()
+        for tile in self._visible():
+            if tile.segment:
+                tile.player.set_pause(1)
+        # Every tile stops on the same picture
+        self._sync_all(force=True)
+
+    def toggle(self):
+        if self.clock.paused:
+            self.play()
+        else:
+            self.pause()
+
+    def seek(self, position):
+        self.clock.seek(position)
+        self._sync_all(force=True)
+
+    def skip(self, seconds):
+        self.seek(self.clock.position() + seconds)
+
+    def step(self, frames=1):
+        """Pause and move every visible tile by frames pictures (backwards by seeking)."""
+        if not self.clock.paused:
+            self.pause()
+        if frames < 0:
+            self.seek(self.clock.position() + frames * STEP_SECONDS)
+            return
+        for _ in range(frames):
+            for tile in self._visible():
+                if tile.segment:
+                    tile.player.next_frame()
+        self.clock.seek(self.clock.position() + frames * STEP_SECONDS)
+
+    def set_rate(self, rate):
+        self.clock.set_rate(rate)
+        for tile in self.tiles.values():
+            tile.player.set_rate(rate)
+
+    def tick(self):
+        """Called a few times a second: resync drifting tiles and follow segment boundaries."""
+        self._sync_all(force=False)
+
+    def _visible(self):
+        return [tile for tile in self.tiles.values() if tile.visible]
+
+    def _sync_all(self, force):
+        position = self.clock.position()
+        for tile in self._visible():
+            self._sync_tile(tile, position, force)
+
+    def _sync_tile(self, tile, position, force):
+        try:
+            self._sync(tile, position, force)
+        except Exception as e:
+            metrics.event(f"Error in playback of {tile.camera}: {str(e)}", camera=tile.camera, level="error")
+
+    def _sync(self, tile, position, force):
+        segment = tile.segment
+        # A segment still being recorded ends at what was on disk when it was opened; reopening continues it
+        ended = segment is not None and segment["end"] is None \
+            and tile.player.get_state() in (vlc.State.Ended, vlc.State.Error)
+        if segment is None or position < segment["start"] or ended \
+                or (segment["end"] is not None and position >= segment["end"]):
+            self._load(tile, position)
+            return
+        offset = position - segment["start"]
+        if force:
+            tile.player.set_time(int(offset * 1000))
+        elif not self.clock.paused and time.monotonic() - tile.loaded_at > 1.0:
+            # Right after a load get_time() is still 0; after that a tile that drifted is pulled back
+            drift = tile.player.get_time() / 1000.0 - offset
+            if abs(drift) > self.max_drift * max(1.0, self.clock.rate):
+                tile.player.set_time(int(offset * 1000))
+                metrics.inc("playback_resyncs_total", camera=tile.camera)
+        if segment["end"] is not None and segment["end"] - position < self.prefetch_seconds * self.clock.rate:
+            following = self.index.next_segment(tile.url, segment["start"])
+            if following and following["path"] != tile.prefetched:
+                tile.prefetched = following["path"]
+                self._prefetcher.submit(prefetch, following["path"])
+
+    def _load(self, tile, position):
+        segment = self.index.segment_at(tile.url, position)
+        if segment is None:
+            if tile.segment:
+                tile.player.set_pause(1)
+            tile.segment = None
+            following = self.index.next_segment(tile.url, position)
+            when = time.strftime("%H:%M:%S", time.localtime(following["start"])) if following else "none"
+            self._set_status(tile, f"No recording here (next: {when})")
+            return
+        media = self.instance.media_new(segment["path"])
+        media.add_option(f"start-time={position - segment['start']:.3f}")
+        media.add_option(f"file-caching={self.file_caching}")
+        if self.clock.paused:
+            media.add_option("start-paused")
+        tile.player.set_media(media)
+        media.release()
+        tile.player.play()
+        tile.player.set_rate(self.clock.rate)
+        tile.segment = segment
+        tile.loaded_at = time.monotonic()
+        if segment["path"] != tile.prefetched:
+            tile.prefetched = segment["path"]
+            self._prefetcher.submit(prefetch, segment["path"])
+        self._set_status(tile, "")
+
+    def _set_status(self, tile, text):
+        if text != tile.status:
+            tile.status = text
+            if self.on_status:
+                self.on_status(tile.key, text)
+
+    def close(self):
+        """Stop prefetching and hand back the players for the caller to release."""
+        self._prefetcher.shutdown(wait=False, cancel_futures=True)
+        players = [tile.player for tile in self.tiles.values()]
+        self.tiles = {}
+        return players
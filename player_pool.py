@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+
+from probe_cache import normalize_url
+
+
+def pool_key(url, media_options, decode_options=()):
+    """Players are only interchangeable for the same stream opened with the same media and decode-limit options."""
+    return normalize_url(url), tuple(media_options), tuple(decode_options)
+
+
+class WarmPlayerPool:
+    """Idle, already-negotiated libVLC players that a tile can adopt instead of opening a new session.
+
+    Each entry keeps the player together with the widget it renders into, so adopting an entry
+    moves the video window to the new tile rather than asking libVLC to switch windows. The pool
+    only does the bookkeeping: entries it evicts are returned to the caller, which owns releasing
+    the player and deleting the widget.
+    """
+    def __init__(self, max_idle=16, idle_ttl=15.0):
+        self.max_idle = max_idle
+        self.idle_ttl = idle_ttl
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def park(self, key, player, widget, paused=False, now=None):
+        """Add an idle player; returns the entries pushed out to stay within max_idle."""
+        evicted = []
+        if key in self._entries:
+            evicted.append(self._entries.pop(key))
+        self._entries[key] = {"player": player, "widget": widget, "parked_at": time.monotonic() if now is None else now,
+                              "paused": paused}
+        while len(self._entries) > self.max_idle:
+            evicted.append(self._entries.popitem(last=False)[1])
+        return evicted
+
+    def take(self, key):
+        return self._entries.pop(key, None)
+
+    def idle(self):
+        """Entries still waiting to be adopted, oldest first."""
+        return list(self._entries.values())
+
+    def expire(self, now=None):
+        """Remove and return entries that have been idle longer than idle_ttl."""
+        now = time.monotonic() if now is None else now
+        expired = [key for key, entry in self._entries.items() if now - entry["parked_at"] > self.idle_ttl]
+        return [self._entries.pop(key) for key in expired]
+
+    def drain(self):
+        entries = list(self._entries.values())
+        self._entries.clear()
+        return entries
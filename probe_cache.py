@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+from viewer_metrics import metrics
+
+DEFAULT_CACHE_FILE = "vms_probe_cache.json"
+
+# Keys carry a digest of user:password instead of the credentials; this prefix marks a digest
+CREDENTIAL_PREFIX = "cred-"
+
+
+def credential_digest(username, password=None):
+    userinfo = username if password is None else f"{username}:{password}"
+    return CREDENTIAL_PREFIX + hashlib.sha256(userinfo.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_url(url):
+    """Canonical cache key for an RTSP URL: lowercase scheme/host, explicit port, no fragment.
+
+    The userinfo is replaced by a digest, so the same camera with other credentials gets its own
+    key but no password ends up in the key or in files keyed by it. Keys normalise to themselves.
+    """
+    parsed = urllib.parse.urlsplit(url.strip())
+    scheme = (parsed.scheme or "rtsp").lower()
+    host = (parsed.hostname or "").lower()
+    default_port = 322 if scheme == "rtsps" else 554
+    try:
+        port = parsed.port or default_port
+    except ValueError:
+        port = default_port
+    auth = ""
+    if parsed.username is not None:
+        if parsed.password is None and parsed.username.startswith(CREDENTIAL_PREFIX):
+            auth = parsed.username + "@"
+        else:
+            username = urllib.parse.unquote(parsed.username)
+            password = None if parsed.password is None else urllib.parse.unquote(parsed.password)
+            auth = credential_digest(username, password) + "@"
+    if ":" in host:
+        host = f"[{host}]"
+    path = parsed.path or "/"
+    return urllib.parse.urlunsplit((scheme, f"{auth}{host}:{port}", path, parsed.query, ""))
+
+
+class ProbeCache:
+    """Thread-safe cache of probe results keyed by normalised URL.
+
+    Entries that passed validation live for positive_ttl seconds, failures only for
+    negative_ttl so a camera coming back online is picked up quickly. Expired successes are
+    kept for stale_ttl so restoring a saved wall can start playing without re-probing.
+    """
+    def __init__(self, path=DEFAULT_CACHE_FILE, positive_ttl=600.0, negative_ttl=30.0, stale_ttl=86400.0):
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _max_age(self, entry):
+        return max(self.positive_ttl, self.stale_ttl) if entry.get("valid") else self.negative_ttl
+
+    def get(self, url, allow_stale=False):
+        """Return the cached entry for url, or None if missing or expired.
+
+        With allow_stale an expired success is returned too; the caller is expected to notice
+        a camera that has gone away since (the health monitor does).
+        """
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.time() - entry["timestamp"]
+            if age > self._max_age(entry):
+                del self._entries[key]
+                self._dirty = True
+                return None
+            if entry["valid"] and age > self.positive_ttl and not allow_stale:
+                return None
+            return dict(entry)
+
+    def put(self, url, reachable, valid, metadata=None):
+        entry = {
+            "reachable": bool(reachable),
+            "valid": bool(valid),
+            "metadata": metadata or {},
+            "timestamp": time.time(),
+        }
+        with self._lock:
+            self._entries[normalize_url(url)] = entry
+            self._dirty = True
+        return entry
+
+    def invalidate(self, url=None):
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(normalize_url(url), None)
+            self._dirty = True
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._entries.items()}
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            entries = data.get("entries", {})
+            now = time.time()
+            with self._lock:
+                self._dirty = False
+                for key, entry in entries.items():
+                    if now - entry.get("timestamp", 0) <= self._max_age(entry):
+                        self._entries[normalize_url(key)] = entry
+                    # Files from before keys were digested still hold the credentials; rewrite them
+                    self._dirty = self._dirty or normalize_url(key) != key
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            metrics.event(f"Error loading probe cache: {str(e)}", level="error")
+
+    def save(self, force=False):
+        with self._lock:
+            if not (self._dirty or force):
+                return
+            data = {"entries": dict(self._entries)}
+            self._dirty = False
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            metrics.event(f"Error saving probe cache: {str(e)}", level="error")
@@ -0,0 +1,83 @@
+import bisect
+import random
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class ReconnectManager:
+    """Per-camera exponential backoff with jitter and a circuit breaker.
+
+    Consecutive failures double the delay up to max_delay. After failure_threshold failures the
+    circuit opens and the camera is only retried once every open_cooldown seconds (half-open)
+    until an attempt succeeds. Every scheduled attempt is also kept at least min_spacing
+    seconds from any other attempt scheduled around the same time, so a whole NVR dropping
+    at once reconnects as a trickle while a circuit waiting out its cooldown delays no one.
+    """
+    def __init__(self, base_delay=1.0, max_delay=60.0, multiplier=2.0, failure_threshold=6,
+                 open_cooldown=120.0, min_spacing=0.3):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.failure_threshold = failure_threshold
+        self.open_cooldown = open_cooldown
+        self.min_spacing = min_spacing
+        self._lock = threading.Lock()
+        self._cameras = {}
+        # Start times of the attempts handed out and not yet due, in order
+        self._slots = []
+
+    def _entry(self, key):
+        return self._cameras.setdefault(key, {"failures": 0, "state": CLOSED})
+
+    def next_attempt(self, key, now=None):
+        """Record a failure for key and return (delay_seconds, state, attempt_number)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entry(key)
+            entry["failures"] += 1
+            if entry["failures"] >= self.failure_threshold:
+                entry["state"] = OPEN
+                base = self.open_cooldown
+            else:
+                base = min(self.max_delay, self.base_delay * self.multiplier ** (entry["failures"] - 1))
+            # Equal jitter: never retry sooner than half the backoff, spread the rest randomly
+            delay = base / 2 + random.uniform(0, base / 2)
+            start = self._free_slot(now, now + delay)
+            return start - now, entry["state"], entry["failures"]
+
+    def _free_slot(self, now, wanted):
+        """Earliest time from wanted that is min_spacing clear of every scheduled attempt; reserves it."""
+        del self._slots[:bisect.bisect_left(self._slots, now - self.min_spacing)]
+        start = wanted
+        for slot in self._slots[bisect.bisect_left(self._slots, wanted - self.min_spacing):]:
+            if slot - start >= self.min_spacing:
+                break
+            start = max(start, slot + self.min_spacing)
+        bisect.insort(self._slots, start)
+        return start
+
+    def attempt_started(self, key):
+        with self._lock:
+            entry = self._entry(key)
+            if entry["state"] == OPEN:
+                entry["state"] = HALF_OPEN
+
+    def record_success(self, key):
+        with self._lock:
+            self._cameras.pop(key, None)
+
+    def state(self, key):
+        with self._lock:
+            entry = self._cameras.get(key)
+            return (entry["state"], entry["failures"]) if entry else (CLOSED, 0)
+
+    def forget(self, key=None):
+        with self._lock:
+            if key is None:
+                self._cameras.clear()
+            else:
+                self._cameras.pop(key, None)
@@ -0,0 +1,684 @@
+import datetime
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from probe_cache import normalize_url
+from reconnect import ReconnectManager
+from segment_index import INDEX_FILE, SegmentIndex
+from viewer_metrics import metrics, camera_label
+
+DEFAULT_RECORDINGS_DIR = "recordings"
+
+TS_PACKET_SIZE = 188
+
+# Seconds a segment with no end may go unwritten before a new recorder takes it for abandoned
+DANGLING_GRACE = 30.0
+
+# Keyframes closer together than this share one index entry; seeking lands at most this far early
+KEYFRAME_INDEX_INTERVAL = 1.0
+
+# libVLC cuts each camera's stream into chunk files of about this many seconds, at keyframes
+CHUNK_SECONDS = 1
+
+# Chunks a spool playlist lists; they are picked up long before they drop off it
+SPOOL_PLAYLIST_CHUNKS = 10
+
+# A chunk is renamed with this suffix once taken, and deleted once its data is written
+TAKEN_SUFFIX = ".taken"
+
+# How often the spool directories are checked for finished chunks
+POLL_INTERVAL = 0.25
+
+# A pause longer than this between two chunks (a reopen, a dead camera) starts a new segment
+MAX_CHUNK_GAP = 2.0
+
+# Packets at the start of a chunk searched for its keyframe: the program tables come first
+KEYFRAME_SCAN_PACKETS = 32
+
+# Options of the viewer's players that only matter to decoding and display
+DISPLAY_ONLY_OPTIONS = ("no-audio", "no-video-title", "avcodec-", "clock-", "video-filter", "fps-")
+
+DEFAULT_MEDIA_OPTIONS = ["rtsp-tcp", "network-caching=1000"]
+
+
+def camera_slug(url):
+    """Directory name for a camera: its URL without credentials, scheme or unsafe characters."""
+    label = camera_label(url).split("://", 1)[-1]
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", label).strip("_") or "camera"
+
+
+def has_random_access(chunk):
+    """True if a TS packet in chunk sets random_access_indicator, i.e. a keyframe starts there."""
+    for offset in range(0, len(chunk) - 5, TS_PACKET_SIZE):
+        if chunk[offset] != 0x47:
+            continue
+        # adaptation_field_control has an adaptation field, it is not empty, and its RAI bit is set
+        if chunk[offset + 3] & 0x20 and chunk[offset + 4] and chunk[offset + 5] & 0x40:
+            return True
+    return False
+
+
+def recording_media_options(media_options, spool, run):
+    """The camera's media options plus a sout that stream-copies it into chunk files under spool.
+
+    Options that only matter to decoding and display are dropped. libVLC's livehttp output
+    writes MPEG-TS chunks of CHUNK_SECONDS, cut at keyframes, named after run, and lists each
+    one in the run's playlist with its duration once it is complete. Nothing is decoded, and
+    unlike a socket a file loses nothing when the recorder falls behind.
+    """
+    spool = os.path.abspath(spool).replace(os.sep, "/")
+    chunks = f"{run}-{'#' * 8}.ts"
+    sout = (f"#std{{access=livehttp{{seglen={CHUNK_SECONDS},delsegs=false,numsegs={SPOOL_PLAYLIST_CHUNKS},"
+            f'index="{spool}/{run}.m3u8",index-url={chunks}}},mux=ts{{use-key-frames}},dst="{spool}/{chunks}"}}')
+    return [option for option in media_options if not option.startswith(DISPLAY_ONLY_OPTIONS)] + [f"sout={sout}"]
+
+
+def read_playlist(path):
+    """{chunk file name: duration} for the chunks a spool playlist lists; empty if there is none."""
+    durations = {}
+    try:
+        with open(path, "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return durations
+    duration = None
+    for line in lines:
+        if line.startswith("#EXTINF:"):
+            try:
+                duration = float(line[len("#EXTINF:"):].split(",", 1)[0])
+            except ValueError:
+                duration = None
+        elif line and not line.startswith("#"):
+            durations[os.path.basename(line)] = duration
+            duration = None
+    return durations
+
+
+def chunk_run(name):
+    """The run a chunk file name belongs to."""
+    return name.rsplit("-", 1)[0]
+
+
+class _Session:
+    """One recorded camera: its libVLC player and spool, pre-event ring and open files."""
+    def __init__(self, url, directory, media_options):
+        self.url = url
+        self.camera = camera_label(url)
+        self.directory = directory
+        self.media_options = list(media_options)
+        self.spool = os.path.join(directory, camera_slug(url), "spool")
+        self.player = None
+        self.run = None
+        self.runs = 0
+        self.lock = threading.Lock()
+        # Held while chunks are taken and fed, so they go in in order
+        self.collecting = threading.Lock()
+        self.ring = deque()
+        self.segment = None
+        self.segment_started = 0.0
+        self.segment_end = 0.0
+        self.segment_size = 0
+        self.last_indexed = 0.0
+        self.clips = []
+        self.ops = []
+        self.last_data = time.monotonic()
+        self.pending_size = 0
+        self.next_restart = 0.0
+        self.restarting = False
+        self.closed = False
+
+    def _write(self, path, chunk):
+        if self.ops and self.ops[-1][0] == "write" and self.ops[-1][1] == path:
+            self.ops[-1][2].extend(chunk)
+        else:
+            self.ops.append(["write", path, bytearray(chunk)])
+
+    def _close(self, path, future=None):
+        self.ops.append(["close", path, future])
+
+    def _end_segment(self):
+        self._close(self.segment)
+        self.ops.append(["end", self.segment, self.segment_end, self.segment_size])
+
+    def _new_path(self, kind, wall, taken=()):
+        stamp = datetime.datetime.fromtimestamp(wall).strftime("%Y%m%d-%H%M%S")
+        path = base = os.path.join(self.directory, camera_slug(self.url), kind, f"{stamp}.ts")
+        # Two files started in the same second get their own names
+        suffix = 1
+        while path in taken or os.path.exists(path):
+            suffix += 1
+            path = f"{base[:-3]}-{suffix}.ts"
+        return path
+
+    def take_chunks(self, run, final=False, recover=False):
+        """Claim run's chunk files that libVLC has finished, oldest first, as (path, duration, mtime).
+
+        A chunk is finished once the run's playlist lists it or a newer one exists, or once the
+        run's player has stopped (final). Claimed chunks are renamed so they are taken once;
+        recover also takes chunks an earlier recorder claimed but never wrote.
+        """
+        suffixes = (".ts", ".ts" + TAKEN_SUFFIX) if recover else (".ts",)
+        try:
+            names = sorted(name for name in os.listdir(self.spool)
+                           if name.endswith(suffixes) and chunk_run(name) == run)
+        except OSError:
+            return []
+        playlist = os.path.join(self.spool, f"{run}.m3u8")
+        durations = read_playlist(playlist)
+        if names and not final and names[-1] not in durations:
+            self._note_progress(os.path.join(self.spool, names.pop()))
+        chunks = [self._claim(name, durations) for name in names]
+        if final:
+            try:
+                os.remove(playlist)
+            except OSError:
+                pass
+        return [chunk for chunk in chunks if chunk]
+
+    def _claim(self, name, durations):
+        path = taken = os.path.join(self.spool, name)
+        try:
+            mtime = os.stat(path).st_mtime
+            if not name.endswith(TAKEN_SUFFIX):
+                taken = path + TAKEN_SUFFIX
+                os.replace(path, taken)
+        except OSError:
+            return None
+        return taken, durations.get(name.replace(TAKEN_SUFFIX, "")), mtime
+
+    def _note_progress(self, path):
+        # The chunk being written still counts as data for stall detection
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if size != self.pending_size:
+            self.pending_size = size
+            self.last_data = time.monotonic()
+
+    def feed(self, chunk, start, end, segment_seconds, pre_event_seconds, source=None):
+        """Add a chunk spanning start to end (wall clock); source is its spool file, deleted once written."""
+        keyframe = has_random_access(chunk[:KEYFRAME_SCAN_PACKETS * TS_PACKET_SIZE])
+        with self.lock:
+            if self.closed:
+                return
+            self.last_data = time.monotonic()
+            self.ring.append((start, chunk, keyframe))
+            while self.ring and end - self.ring[0][0] > pre_event_seconds:
+                self.ring.popleft()
+            gap = self.segment is not None and start - self.segment_end > MAX_CHUNK_GAP
+            age = start - self.segment_started
+            # Segments start on a keyframe where the camera marks them, never run past twice the length,
+            # and never span a gap, so a position in a segment is always its start plus the media time
+            if self.segment is None or gap or (age >= segment_seconds and keyframe) or age >= 2 * segment_seconds:
+                if self.segment:
+                    self._end_segment()
+                    metrics.inc("recorded_segments_total", camera=self.camera)
+                self.segment = self._new_path("segments", start, taken=(self.segment,))
+                self.segment_started = start
+                self.segment_size = 0
+                self.last_indexed = 0.0
+                self.ops.append(["segment", self.segment, self.url, start])
+            if keyframe and start - self.last_indexed >= KEYFRAME_INDEX_INTERVAL:
+                self.ops.append(["keyframe", self.segment, start, self.segment_size])
+                self.last_indexed = start
+            self._write(self.segment, chunk)
+            self.segment_size += len(chunk)
+            self.segment_end = end
+            for clip in list(self.clips):
+                self._write(clip["path"], chunk)
+                if end >= clip["until"]:
+                    self.clips.remove(clip)
+                    self._close(clip["path"], clip["future"])
+            if source:
+                self.ops.append(["unlink", source])
+
+    def start_clip(self, now, pre_seconds, post_seconds, path=None):
+        """Clip from the last keyframe at least pre_seconds old (as far as the ring goes) to now + post_seconds."""
+        future = Future()
+        with self.lock:
+            if path is None:
+                path = self._new_path("clips", now - pre_seconds, taken=[clip["path"] for clip in self.clips])
+            chunks = [entry for entry in self.ring if now - entry[0] <= pre_seconds]
+            older_keyframes = [i for i, entry in enumerate(self.ring) if entry[2] and now - entry[0] > pre_seconds]
+            if older_keyframes:
+                # Back up to the keyframe just before the window so the clip starts with a decodable picture
+                chunks = list(self.ring)[older_keyframes[-1]:]
+            else:
+                first_keyframe = next((i for i, entry in enumerate(chunks) if entry[2]), 0)
+                chunks = chunks[first_keyframe:]
+            for _, chunk, _ in chunks:
+                self._write(path, chunk)
+            self.clips.append({"path": path, "until": now + post_seconds, "future": future})
+        metrics.inc("clips_total", camera=self.camera)
+        return path, future
+
+    def drain(self):
+        with self.lock:
+            ops, self.ops = self.ops, []
+        return ops
+
+    def finish(self):
+        """Close the open segment and end clips early; called when recording stops."""
+        with self.lock:
+            self.closed = True
+            if self.segment:
+                self._end_segment()
+                self.segment = None
+            for clip in self.clips:
+                self._close(clip["path"], clip["future"])
+            self.clips = []
+            self.ring.clear()
+
+
+class Recorder:
+    """Records cameras by stream copy into fixed-length MPEG-TS segment files.
+
+    Each camera gets a libVLC player whose sout copies the untouched stream to disk as short
+    chunks cut at keyframes (see recording_media_options), so no frame is decoded, re-encoded
+    or dropped on the way. A collector thread takes each finished chunk into the camera's
+    pre-event ring (the last pre_event_seconds, for clips) and its current segment; one writer
+    thread flushes everything every flush_interval as large appends, camera after camera, so
+    many cameras share a single disk without seek storms, and only then deletes the chunks.
+    Chunks a killed recorder left behind are recovered when the camera is next started.
+    A camera that writes nothing for stall_timeout is reopened with ReconnectManager backoff.
+    Every segment and its keyframe offsets go into a SegmentIndex for playback and clip lookups.
+    A vlc_instance passed in (the viewer's) is shared and left for its owner to release.
+    """
+    def __init__(self, vlc_args="--no-xlib --aout=dummy --no-video-title-show --rtsp-timeout=15",
+                 directory=DEFAULT_RECORDINGS_DIR, segment_seconds=60, pre_event_seconds=10, flush_interval=2.0,
+                 stall_timeout=10.0, vlc_instance=None, index=None):
+        self.vlc_args = vlc_args
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.pre_event_seconds = pre_event_seconds
+        self.flush_interval = flush_interval
+        self.stall_timeout = stall_timeout
+        self.index = index or SegmentIndex(os.path.join(directory, INDEX_FILE))
+        # Segments left open by a recorder that was killed; a live one elsewhere keeps writing within the grace
+        self._close_dangling(before=time.time() - max(DANGLING_GRACE, 4 * flush_interval))
+        self.reconnect_manager = ReconnectManager(base_delay=2.0, max_delay=60.0)
+        self._instance = vlc_instance
+        self._owns_instance = vlc_instance is None
+        self._sessions = {}
+        self._retired = []
+        self._stoppers = []
+        self._lock = threading.Lock()
+        # start()/stop() may come from several threads; one at a time keeps a camera from opening twice
+        self._control = threading.Lock()
+        self._stop = threading.Event()
+        self._flush = threading.Event()
+        self._collector = threading.Thread(target=self._run_collector, name="recorder-collect", daemon=True)
+        self._writer = threading.Thread(target=self._run_writer, name="recorder-write", daemon=True)
+        self._collector.start()
+        self._writer.start()
+
+    def _vlc(self):
+        if self._instance is None:
+            import vlc
+            self._instance = vlc.Instance(self.vlc_args)
+        return self._instance
+
+    def cameras(self):
+        with self._lock:
+            return [session.url for session in self._sessions.values()]
+
+    def start(self, url, media_options=None):
+        """Start recording url with the viewer's media_options for it; a camera already recorded is left alone."""
+        with self._control:
+            self._start(url, DEFAULT_MEDIA_OPTIONS if media_options is None else media_options)
+
+    def _start(self, url, media_options):
+        key = normalize_url(url)
+        with self._lock:
+            if key in self._sessions:
+                return
+        # Nothing of this camera can still be open: its session is the one being created
+        self._close_dangling(url)
+        session = _Session(url, self.directory, media_options)
+        os.makedirs(session.spool, exist_ok=True)
+        with self._lock:
+            self._sessions[key] = session
+        self._recover(session)
+        with session.lock:
+            # close() may have taken the session already; a player opened now would never be stopped
+            if not session.closed:
+                self._open(session)
+        metrics.event(f"Recording {session.camera} to {os.path.join(self.directory, camera_slug(url))}")
+
+    def _close_dangling(self, url=None, before=None):
+        try:
+            closed = self.index.close_dangling(url, before)
+        except Exception as e:
+            metrics.event(f"Error closing dangling segments: {str(e)}", level="error")
+            return
+        if closed:
+            metrics.event(f"Closed {closed} segment(s) left open by an earlier recorder"
+                          + (f" of {camera_label(url)}" if url else ""), level="warning")
+
+    def _recover(self, session):
+        """Record the chunks an earlier recorder of this camera left in its spool."""
+        try:
+            runs = sorted({chunk_run(name) for name in os.listdir(session.spool)
+                           if name.endswith((".ts", ".ts" + TAKEN_SUFFIX))})
+        except OSError:
+            return
+        for run in runs:
+            self._collect(session, run, final=True, recover=True)
+        if runs:
+            metrics.event(f"Recovered the spooled recording of {session.camera} from an earlier recorder",
+                          camera=session.camera, level="warning")
+
+    def _open(self, session):
+        """Start session's player; the caller holds session.lock and has checked session.closed."""
+        instance = self._vlc()
+        session.runs += 1
+        session.run = f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}-{session.runs}"
+        player = instance.media_player_new()
+        media = instance.media_new(session.url)
+        for option in recording_media_options(session.media_options, session.spool, session.run):
+            media.add_option(option)
+        player.set_media(media)
+        media.release()
+        session.player = player
+        session.last_data = time.monotonic()
+        self.reconnect_manager.attempt_started(session.url)
+        player.play()
+
+    def stop(self, url):
+        with self._control, self._lock:
+            session = self._sessions.pop(normalize_url(url), None)
+        if session:
+            self._close_session(session)
+
+    def _close_session(self, session):
+        with session.lock:
+            player, session.player = session.player, None
+            run = session.run
+        # Stopping the player writes its last chunk; a dead RTSP session may hold stop() for seconds
+        self._spawn(self._finish_session, session, player, run, name="recorder-stop")
+
+    def _finish_session(self, session, player, run):
+        if player:
+            self._release_player(player)
+        if run:
+            self._collect(session, run, final=True)
+        session.finish()
+        with self._lock:
+            self._retired.append(session)
+        self._flush.set()
+
+    def _spawn(self, target, *args, name):
+        """Run a blocking player call on a daemon thread that close() waits for before releasing libVLC."""
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        with self._lock:
+            self._stoppers = [stopper for stopper in self._stoppers if stopper.is_alive()] + [thread]
+        thread.start()
+
+    @staticmethod
+    def _release_player(player):
+        try:
+            player.stop()
+            player.release()
+        except Exception as e:
+            metrics.event(f"Error stopping recorder player: {str(e)}", level="error")
+
+    def save_clip(self, url, pre_seconds=None, post_seconds=10.0, path=None):
+        """Turn the ring and the next post_seconds of url into a clip file.
+
+        Returns (path, future); the future resolves to the path once the clip is on disk.
+        Raises LookupError if url is not being recorded.
+        """
+        with self._lock:
+            session = self._sessions.get(normalize_url(url))
+        if session is None:
+            raise LookupError(f"{camera_label(url)} is not being recorded")
+        pre_seconds = self.pre_event_seconds if pre_seconds is None else min(pre_seconds, self.pre_event_seconds)
+        return session.start_clip(time.time(), pre_seconds, post_seconds, path)
+
+    def status(self):
+        now = time.monotonic()
+        wall = time.time()
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {session.camera: {"segment": session.segment, "idle": round(now - session.last_data, 1),
+                                 "ring_seconds": round(wall - session.ring[0][0], 1) if session.ring else 0.0,
+                                 "clips": len(session.clips)}
+                for session in sessions}
+
+    def close(self, timeout=2.0):
+        """Stop every camera and wait up to timeout for the last chunks to be written.
+
+        Returns True if everything reached disk and no player is still stopping. Chunks that
+        did not make it stay in the spool for the next start.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            try:
+                self._close_session(session)
+            except Exception as e:
+                metrics.event(f"Error stopping recording of {session.camera}: {str(e)}", level="error")
+        # The sessions are gone, so a reopen starting after this finds them closed and opens nothing
+        with self._lock:
+            stoppers = list(self._stoppers)
+        for stopper in stoppers:
+            stopper.join(max(0.0, deadline - time.monotonic()))
+        self._stop.set()
+        self._flush.set()
+        self._writer.join(max(0.0, deadline - time.monotonic()))
+        self._collector.join(max(0.0, min(0.5, deadline - time.monotonic())))
+        stopped = not any(stopper.is_alive() for stopper in stoppers)
+        # Releasing the instance under a player that is still stopping would crash libVLC
+        if self._owns_instance and self._instance is not None and stopped:
+            self._instance.release()
+        return stopped and not self._writer.is_alive()
+
+    def _run_collector(self):
+        while not self._stop.wait(POLL_INTERVAL):
+            with self._lock:
+                sessions = list(self._sessions.values())
+            for session in sessions:
+                self._collect(session, session.run)
+            self._check_stalls(time.monotonic())
+
+    def _collect(self, session, run, final=False, recover=False):
+        """Take run's finished chunks into session; the writer deletes them once their data is on disk."""
+        with session.collecting:
+            try:
+                chunks = session.take_chunks(run, final, recover) if run else []
+            except Exception as e:
+                metrics.event(f"Error reading the spool of {session.camera}: {str(e)}", camera=session.camera,
+                              level="error")
+                return
+            if not chunks:
+                return
+            # The newest chunk ended when it was written; the ones before it are placed by their durations
+            end = time.time() if not recover else chunks[-1][2]
+            timed = []
+            for path, duration, _ in reversed(chunks):
+                start = end - (duration if duration is not None else CHUNK_SECONDS)
+                timed.append((path, start, end))
+                end = start
+            received = 0
+            for path, start, end in reversed(timed):
+                try:
+                    with open(path, "rb") as f:
+                        chunk = f.read()
+                except OSError as e:
+                    metrics.event(f"Error reading {path}: {str(e)}", camera=session.camera, level="error")
+                    continue
+                session.feed(chunk, start, end, self.segment_seconds, self.pre_event_seconds, source=path)
+                received += len(chunk)
+        if received:
+            metrics.inc("recorded_bytes_total", received, camera=session.camera)
+            if session.next_restart:
+                session.next_restart = 0.0
+                self.reconnect_manager.record_success(session.url)
+
+    def _check_stalls(self, now):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            if session.restarting or session.player is None or now - session.last_data < self.stall_timeout \
+                    or now < session.next_restart:
+                continue
+            delay, state, attempt = self.reconnect_manager.next_attempt(session.url)
+            session.next_restart = now + delay
+            session.restarting = True
+            metrics.inc("recording_restarts_total", camera=session.camera)
+            metrics.event(f"Recording of {session.camera} stalled; reopening (attempt {attempt}, {state})",
+                          camera=session.camera, level="warning")
+            # stop() on a dead RTSP session can block for seconds; the other cameras keep being collected
+            self._spawn(self._reopen, session, name="recorder-reopen")
+
+    def _reopen(self, session):
+        try:
+            with session.lock:
+                player, session.player = session.player, None
+                run = session.run
+            if player:
+                player.stop()
+                player.release()
+            # Whatever the old player got out before it stalled
+            self._collect(session, run, final=True)
+            with session.lock:
+                # Re-checked under the lock finish() takes, so a stop() racing this never misses the new player
+                if not session.closed:
+                    self._open(session)
+        except Exception as e:
+            metrics.event(f"Error reopening recording of {session.camera}: {str(e)}", level="error")
+        finally:
+            session.restarting = False
+
+    def _run_writer(self):
+        files = {}
+        while True:
+            self._flush.wait(self.flush_interval)
+            self._flush.clear()
+            stopping = self._stop.is_set()
+            self._write_ops(self._drain_ops(), files)
+            if stopping:
+                for handle in files.values():
+                    handle.close()
+                self.index.close()
+                return
+
+    def _drain_ops(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            retired, self._retired = self._retired, []
+        # Sessions closed by stop()/close() still hold their final ops
+        return [op for session in sessions + retired for op in session.drain()]
+
+    def _write_ops(self, ops, files):
+        entries = []
+        spooled = []
+        written = set()
+        failed = False
+        for op in ops:
+            if op[0] in ("segment", "keyframe", "end"):
+                entries.append(op)
+            elif op[0] == "unlink":
+                spooled.append(op[1])
+            else:
+                failed |= not self._apply(op, files, written)
+        # Flushed first, so the index never points past what other processes can read
+        # and no chunk is deleted before its data is out
+        failed |= not self._flush_files(files, written)
+        if entries:
+            try:
+                self.index.record(entries)
+            except Exception as e:
+                metrics.event(f"Error updating segment index: {str(e)}", level="error")
+        if not failed:
+            # Otherwise left in the spool for the next start to recover
+            self._remove_spooled(spooled)
+
+    @staticmethod
+    def _flush_files(files, paths):
+        flushed = True
+        for path in paths:
+            try:
+                if path in files:
+                    files[path].flush()
+            except Exception as e:
+                flushed = False
+                metrics.event(f"Error writing {path}: {str(e)}", level="error")
+        return flushed
+
+    @staticmethod
+    def _remove_spooled(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError as e:
+                metrics.event(f"Error removing {path}: {str(e)}", level="error")
+
+    @staticmethod
+    def _apply(op, files, written):
+        """Carry out a write or close op; False if it failed."""
+        try:
+            if op[0] == "write":
+                handle = files.get(op[1])
+                if handle is None:
+                    os.makedirs(os.path.dirname(op[1]), exist_ok=True)
+                    handle = files[op[1]] = open(op[1], "ab")
+                handle.write(op[2])
+                written.add(op[1])
+            else:
+                handle = files.pop(op[1], None)
+                if handle:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                    handle.close()
+                if op[2] is not None and not op[2].done():
+                    op[2].set_result(op[1])
+            return True
+        except Exception as e:
+            metrics.event(f"Error writing {op[1]}: {str(e)}", level="error")
+            if op[0] == "close" and op[2] is not None and not op[2].done():
+                op[2].set_exception(e)
+            return False
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import signal
+
+    from config_store import CONFIG_FILE, migrate
+    from tuning_profiles import build_media_options, resolve_profile_name
+
+    parser = argparse.ArgumentParser(description="Record cameras from the viewer's config without the GUI")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("urls", nargs="*", help="cameras to record instead of the config's recording.cameras")
+    args = parser.parse_args()
+    with open(args.config, "r") as f:
+        config = migrate(json.load(f))
+    settings = config.get("recording", {})
+    urls = args.urls or settings.get("cameras", [])
+    if urls == "all":
+        urls = config.get("rtsp_urls", [])
+    if not urls:
+        parser.error("no cameras to record: pass URLs or set recording.cameras in the config")
+    recorder = Recorder(directory=settings.get("directory", DEFAULT_RECORDINGS_DIR),
+                        segment_seconds=settings.get("segment_seconds", 60),
+                        pre_event_seconds=settings.get("pre_event_seconds", 10))
+    camera_tuning = config.get("camera_tuning", {})
+    for url in urls:
+        # The same caching and transport the viewer's players use for this camera
+        profile = resolve_profile_name(camera_tuning.get(url, config.get("tuning_profile")))
+        recorder.start(url, build_media_options(profile))
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    while not stop.wait(1.0):
+        metrics.publish()
+    recorder.close()
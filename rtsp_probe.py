@@ -0,0 +1,456 @@
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import ssl
+import time
+import urllib.parse
+
+USER_AGENT = "rtsp_viewer-probe/1.0"
+
+# RTP/AVP static payload types (RFC 3551) for streams that omit a=rtpmap
+STATIC_PAYLOAD_TYPES = {
+    0: ("PCMU", 8000),
+    8: ("PCMA", 8000),
+    14: ("MPA", 90000),
+    26: ("JPEG", 90000),
+    32: ("MPV", 90000),
+    33: ("MP2T", 90000),
+}
+
+
+class RTSPProbeError(Exception):
+    pass
+
+
+def split_credentials(url):
+    """Return (url_without_credentials, username, password, host, port, scheme)."""
+    parsed = urllib.parse.urlsplit(url.strip())
+    scheme = (parsed.scheme or "rtsp").lower()
+    host = parsed.hostname
+    if not host:
+        raise RTSPProbeError(f"No host in URL {url}")
+    port = parsed.port or (322 if scheme == "rtsps" else 554)
+    username = urllib.parse.unquote(parsed.username) if parsed.username else None
+    password = urllib.parse.unquote(parsed.password) if parsed.password else ""
+    netloc = f"[{host}]" if ":" in host else host
+    if parsed.port:
+        netloc += f":{parsed.port}"
+    clean_url = urllib.parse.urlunsplit((scheme, netloc, parsed.path or "/", parsed.query, ""))
+    return clean_url, username, password, host, port, scheme
+
+
+def parse_auth_challenges(values):
+    """Parse WWW-Authenticate header values into {scheme: params}."""
+    challenges = {}
+    for value in values:
+        scheme, _, rest = value.strip().partition(" ")
+        params = {}
+        for match in re.finditer(r'(\w+)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|([^,\s]+))', rest):
+            params[match.group(1).lower()] = match.group(2) if match.group(2) is not None else match.group(3)
+        challenges[scheme.lower()] = params
+    return challenges
+
+
+def build_authorization(challenges, method, uri, username, password, nonce_count=1):
+    """Build an Authorization header value, preferring Digest over Basic."""
+    if "digest" in challenges:
+        params = challenges["digest"]
+        realm = params.get("realm", "")
+        nonce = params.get("nonce", "")
+        algorithm = params.get("algorithm", "MD5")
+        qop_options = [q.strip() for q in params.get("qop", "").split(",") if q.strip()]
+
+        def md5(text):
+            return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+        cnonce = os.urandom(8).hex()
+        ha1 = md5(f"{username}:{realm}:{password}")
+        if algorithm.upper() == "MD5-SESS":
+            ha1 = md5(f"{ha1}:{nonce}:{cnonce}")
+        ha2 = md5(f"{method}:{uri}")
+        nc = f"{nonce_count:08x}"
+        if "auth" in qop_options:
+            response = md5(f"{ha1}:{nonce}:{nc}:{cnonce}:auth:{ha2}")
+        else:
+            response = md5(f"{ha1}:{nonce}:{ha2}")
+        header = (f'Digest username="{username}", realm="{realm}", nonce="{nonce}", '
+                  f'uri="{uri}", response="{response}"')
+        if "algorithm" in params:
+            header += f", algorithm={algorithm}"
+        if "opaque" in params:
+            header += f', opaque="{params["opaque"]}"'
+        if "auth" in qop_options:
+            header += f', qop=auth, nc={nc}, cnonce="{cnonce}"'
+        return header, "digest"
+    if "basic" in challenges:
+        token = base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+        return f"Basic {token}", "basic"
+    return None, None
+
+
+class _BitReader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def bit(self):
+        byte = self.data[self.pos >> 3]
+        value = (byte >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return value
+
+    def bits(self, n):
+        value = 0
+        for _ in range(n):
+            value = (value << 1) | self.bit()
+        return value
+
+    def ue(self):
+        zeros = 0
+        while self.bit() == 0:
+            zeros += 1
+        return (1 << zeros) - 1 + self.bits(zeros)
+
+    def se(self):
+        value = self.ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+def _strip_emulation_prevention(nal):
+    out = bytearray()
+    zeros = 0
+    for byte in nal:
+        if zeros >= 2 and byte == 3:
+            zeros = 0
+            continue
+        out.append(byte)
+        zeros = zeros + 1 if byte == 0 else 0
+    return bytes(out)
+
+
+def _skip_scaling_lists(reader, count):
+    for i in range(count):
+        if reader.bit():
+            size = 16 if i < 6 else 64
+            last, next_scale = 8, 8
+            for _ in range(size):
+                if next_scale != 0:
+                    next_scale = (last + reader.se() + 256) % 256
+                last = next_scale if next_scale != 0 else last
+
+
+def _skip_pic_order_cnt(reader):
+    pic_order_cnt_type = reader.ue()
+    if pic_order_cnt_type == 0:
+        reader.ue()
+    elif pic_order_cnt_type == 1:
+        reader.bit()
+        reader.se()
+        reader.se()
+        for _ in range(reader.ue()):
+            reader.se()
+
+
+def parse_h264_sps(nal):
+    """Return (width, height) from an H.264 SPS NAL unit, or None if it cannot be decoded."""
+    try:
+        reader = _BitReader(_strip_emulation_prevention(nal[1:]))
+        profile_idc = reader.bits(8)
+        reader.bits(16)  # constraint flags + level_idc
+        reader.ue()  # seq_parameter_set_id
+        chroma_format_idc = 1
+        if profile_idc in (100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135):
+            chroma_format_idc = reader.ue()
+            if chroma_format_idc == 3:
+                reader.bit()
+            reader.ue()
+            reader.ue()
+            reader.bit()
+            if reader.bit():  # seq_scaling_matrix_present_flag
+                _skip_scaling_lists(reader, 8 if chroma_format_idc != 3 else 12)
+        reader.ue()  # log2_max_frame_num_minus4
+        _skip_pic_order_cnt(reader)
+        reader.ue()  # max_num_ref_frames
+        reader.bit()
+        width_mbs = reader.ue() + 1
+        height_map_units = reader.ue() + 1
+        frame_mbs_only = reader.bit()
+        if not frame_mbs_only:
+            reader.bit()
+        reader.bit()  # direct_8x8_inference_flag
+        crop = (0, 0, 0, 0)
+        if reader.bit():
+            crop = (reader.ue(), reader.ue(), reader.ue(), reader.ue())
+        sub_width = 1 if chroma_format_idc == 3 else 2
+        sub_height = 2 if chroma_format_idc == 1 else 1
+        if chroma_format_idc == 0:
+            sub_width = sub_height = 1
+        crop_unit_y = sub_height * (2 - frame_mbs_only)
+        width = width_mbs * 16 - sub_width * (crop[0] + crop[1])
+        height = (2 - frame_mbs_only) * height_map_units * 16 - crop_unit_y * (crop[2] + crop[3])
+        return width, height
+    except (IndexError, ValueError):
+        return None
+
+
+def _sdp_media(value):
+    parts = value.split()
+    payload_type = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else None
+    track = {"media": parts[0], "payload_type": payload_type, "transport": parts[2] if len(parts) > 2 else None}
+    if payload_type in STATIC_PAYLOAD_TYPES:
+        track["codec"], track["clock_rate"] = STATIC_PAYLOAD_TYPES[payload_type]
+    return track
+
+
+def _sdp_rtpmap(track, attr):
+    pt, _, encoding = attr.partition(" ")
+    if pt.strip() == str(track.get("payload_type")):
+        codec_parts = encoding.split("/")
+        track["codec"] = codec_parts[0].upper()
+        if len(codec_parts) > 1 and codec_parts[1].isdigit():
+            track["clock_rate"] = int(codec_parts[1])
+
+
+def _sdp_fmtp(track, attr):
+    _, _, params = attr.partition(" ")
+    fmtp = {}
+    for item in params.split(";"):
+        key, _, val = item.strip().partition("=")
+        if key:
+            fmtp[key.lower()] = val
+    track["fmtp"] = fmtp
+    sprop = fmtp.get("sprop-parameter-sets")
+    if sprop and "width" not in track:
+        try:
+            sps = base64.b64decode(sprop.split(",")[0] + "==")
+            size = parse_h264_sps(sps)
+            if size:
+                track["width"], track["height"] = size
+        except (ValueError, TypeError):
+            pass
+
+
+def _sdp_framerate(track, attr):
+    try:
+        track["framerate"] = float(attr)
+    except ValueError:
+        pass
+
+
+def _sdp_size(track, name, attr):
+    numbers = [int(n) for n in re.findall(r"\d+", attr)]
+    if name == "framesize" and len(numbers) >= 3:
+        track["width"], track["height"] = numbers[1], numbers[2]
+    elif name == "x-dimensions" and len(numbers) >= 2:
+        track["width"], track["height"] = numbers[0], numbers[1]
+    elif name == "cliprect" and len(numbers) >= 4 and "width" not in track:
+        track["width"], track["height"] = numbers[3], numbers[2]
+
+
+def _sdp_attribute(track, session, value):
+    name, _, attr = value.partition(":")
+    if name == "rtpmap" and track is not session:
+        _sdp_rtpmap(track, attr)
+    elif name == "fmtp":
+        _sdp_fmtp(track, attr)
+    elif name == "control":
+        track["control"] = attr
+    elif name == "framerate":
+        _sdp_framerate(track, attr)
+    elif name in ("framesize", "x-dimensions", "cliprect"):
+        _sdp_size(track, name, attr)
+
+
+def parse_sdp(sdp):
+    """Parse an SDP body into a list of track dicts (media, payload type, codec, resolution hints)."""
+    tracks = []
+    session = {}
+    current = session
+    for raw_line in sdp.splitlines():
+        line = raw_line.strip()
+        if len(line) < 2 or line[1] != "=":
+            continue
+        kind, value = line[0], line[2:]
+        if kind == "m":
+            current = _sdp_media(value)
+            tracks.append(current)
+        elif kind == "a":
+            _sdp_attribute(current, session, value)
+    return tracks
+
+
+class _RTSPConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.cseq = 0
+
+    async def request(self, method, url, headers=None):
+        self.cseq += 1
+        lines = [f"{method} {url} RTSP/1.0", f"CSeq: {self.cseq}", f"User-Agent: {USER_AGENT}"]
+        for key, value in (headers or {}).items():
+            lines.append(f"{key}: {value}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("utf-8"))
+        await self.writer.drain()
+        return await self.read_response()
+
+    async def read_response(self):
+        while True:
+            first = await self.reader.readexactly(1)
+            if first == b"$":
+                # Interleaved RTP from a previous session on the same socket: skip it
+                header = await self.reader.readexactly(3)
+                await self.reader.readexactly(int.from_bytes(header[1:3], "big"))
+                continue
+            break
+        head = first + await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("utf-8", "replace").split("\r\n")
+        parts = lines[0].split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("RTSP/"):
+            raise RTSPProbeError(f"Malformed RTSP status line: {lines[0]!r}")
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ""
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, _, value = line.partition(":")
+                headers.setdefault(key.strip().lower(), []).append(value.strip())
+        body = b""
+        length = int(headers.get("content-length", ["0"])[0] or 0)
+        if length:
+            body = await self.reader.readexactly(length)
+        return status, reason, headers, body.decode("utf-8", "replace")
+
+    async def close(self):
+        try:
+            self.writer.close()
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+async def _open_connection(host, port, scheme):
+    ssl_context = None
+    if scheme == "rtsps":
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+    reader, writer = await asyncio.open_connection(host, port, ssl=ssl_context)
+    return _RTSPConnection(reader, writer)
+
+
+async def _probe(url, result):
+    clean_url, username, password, host, port, scheme = split_credentials(url)
+    started = time.monotonic()
+    connection = await _open_connection(host, port, scheme)
+    result["reachable"] = True
+    result["connect_latency"] = round(time.monotonic() - started, 4)
+    try:
+        status, reason, headers, _ = await connection.request("OPTIONS", clean_url)
+        result["server"] = headers.get("server", [None])[0]
+        result["methods"] = [m.strip() for m in headers.get("public", [""])[0].split(",") if m.strip()]
+
+        describe_headers = {"Accept": "application/sdp"}
+        status, reason, headers, body = await connection.request("DESCRIBE", clean_url, describe_headers)
+        if status == 401:
+            if username is None:
+                result["auth"] = "required"
+                raise RTSPProbeError("Authentication required but no credentials in URL")
+            challenges = parse_auth_challenges(headers.get("www-authenticate", []))
+            authorization, auth_scheme = build_authorization(challenges, "DESCRIBE", clean_url, username, password)
+            if authorization is None:
+                result["auth"] = "unsupported"
+                raise RTSPProbeError(f"Unsupported auth challenge: {headers.get('www-authenticate')}")
+            describe_headers["Authorization"] = authorization
+            try:
+                status, reason, headers, body = await connection.request("DESCRIBE", clean_url, describe_headers)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                # Some cameras close the socket after a 401; retry on a fresh one
+                await connection.close()
+                connection = await _open_connection(host, port, scheme)
+                status, reason, headers, body = await connection.request("DESCRIBE", clean_url, describe_headers)
+            result["auth"] = auth_scheme if status != 401 else "failed"
+        elif status < 400:
+            result["auth"] = "none"
+        result["status"] = status
+        if status != 200:
+            raise RTSPProbeError(f"DESCRIBE returned {status} {reason}")
+        _record_tracks(result, parse_sdp(body))
+    finally:
+        await connection.close()
+
+
+def _record_tracks(result, tracks):
+    result["tracks"] = tracks
+    video = next((t for t in tracks if t.get("media") == "video"), None)
+    if video:
+        for key in ("codec", "width", "height", "framerate"):
+            if key in video:
+                result[key] = video[key]
+    result["valid"] = bool(tracks)
+    if not tracks:
+        result["error"] = "SDP contains no media"
+
+
+async def probe_rtsp(url, timeout=5.0):
+    """Probe an RTSP URL with OPTIONS + DESCRIBE and return a result dict.
+
+    The dict always has url, reachable, valid, latency and error keys; on success it also
+    carries status, auth, server, tracks and the first video track's codec/width/height.
+    """
+    result = {"url": url, "reachable": False, "valid": False, "status": None, "auth": None,
+              "tracks": [], "latency": None, "error": None}
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(_probe(url, result), timeout)
+    except asyncio.TimeoutError:
+        result["error"] = f"Timed out after {timeout}s"
+    except (RTSPProbeError, OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+        result["error"] = str(e) or type(e).__name__
+    result["latency"] = round(time.monotonic() - started, 4)
+    return result
+
+
+async def probe_many(urls, concurrency=64, timeout=5.0, on_result=None):
+    """Probe many URLs with at most `concurrency` in flight; results keep the input order.
+
+    on_result, if given, is called with each result as soon as it is in (for progress output).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(url):
+        async with semaphore:
+            result = await probe_rtsp(url, timeout)
+        if on_result:
+            on_result(result)
+        return result
+
+    return await asyncio.gather(*(bounded(url) for url in urls))
+
+
+def probe_rtsp_sync(url, timeout=5.0, cancel_event=None):
+    """Blocking wrapper for worker threads; returns early if cancel_event is set."""
+    async def runner():
+        task = asyncio.ensure_future(probe_rtsp(url, timeout))
+        while not task.done():
+            await asyncio.wait({task}, timeout=0.05)
+            if cancel_event is not None and cancel_event.is_set() and not task.done():
+                task.cancel()
+                return {"url": url, "reachable": False, "valid": False, "status": None, "auth": None,
+                        "tracks": [], "latency": None, "error": "Cancelled"}
+        return task.result()
+
+    return asyncio.run(runner())
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python rtsp_probe.py <rtsp_url> [<rtsp_url> ...]")
+        sys.exit(1)
+    for probe_result in asyncio.run(probe_many(sys.argv[1:])):
+        print(json.dumps(probe_result, indent=4))
@@ -1,15 +1,40 @@
+# First, so the clock --startup-profile reads (PROCESS_START) covers the heavy imports too
+from viewer_metrics import PROCESS_START, metrics, camera_label
+import time
 import sys
+import os
 import vlc
 import math
-import time
+import re
 import socket
 import urllib.parse
-import json
+import queue
+import itertools
+import threading
+from concurrent.futures import Future
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QTextEdit, QDialog, QVBoxLayout, 
                              QGridLayout, QWidget, QLabel, QMessageBox, QComboBox, QHBoxLayout, QProgressBar, 
-                             QSizePolicy, QDesktopWidget, QLineEdit, QInputDialog, QMenu, QAction)
-from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QRect
-from PyQt5.QtGui import QResizeEvent
+                             QSizePolicy, QDesktopWidget, QLineEdit, QInputDialog, QMenu, QAction, QCheckBox,
+                             QSlider)
+from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal, QRect
+from PyQt5.QtGui import QResizeEvent, QPainter
+from probe_cache import ProbeCache, DEFAULT_CACHE_FILE, normalize_url
+from tuning_profiles import (TUNING_PROFILES, DEFAULT_PROFILE, build_media_options, resolve_profile_name,
+                             tile_limits, limit_media_options)
+from reconnect import ReconnectManager, CLOSED
+from config_store import ConfigStore, CONFIG_FILE
+from player_pool import WarmPlayerPool, pool_key
+from frame_grabber import FrameCache
+from segment_index import SegmentIndex, INDEX_FILE, parse_when
+
+# Stream profiles from lowest to highest resolution; a missing profile falls back to the next one up
+STREAM_PROFILES = ["mobile", "sub", "main"]
+
+# Seconds closing the window may take in all; whatever is still stuck after that is left to process exit
+SHUTDOWN_DEADLINE = 0.9
+
+# Grid layouts offered in the combo box, as (rows, columns)
+GRID_LAYOUTS = [(1, 1), (2, 2), (2, 3), (3, 3), (3, 4), (4, 4), (4, 5), (5, 5), (5, 6), (6, 6)]
 
 class CustomLabel(QLabel):
     def __init__(self, parent=None, camera_id=None):
@@ -18,6 +43,8 @@ class CustomLabel(QLabel):
         self.original_pos = None
         self.aspect_ratio = 4 / 3  # Default 4:3
         self.camera_id = camera_id
+        # Set in composited mode: the player's frames are painted here instead of into a native window
+        self.renderer = None
         self.setStyleSheet("background-color: black; color: white;")
         self.setAlignment(Qt.AlignCenter)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -31,36 +58,89 @@ class CustomLabel(QLabel):
         change_url_action = QAction("Change RTSP URL", self)
         change_url_action.triggered.connect(self.change_rtsp_url)
         menu.addAction(change_url_action)
+        for profile in ("sub", "mobile"):
+            profile_action = QAction(f"Set {profile.capitalize()} Stream URL", self)
+            profile_action.triggered.connect(lambda checked=False, p=profile: self.change_profile_url(p))
+            menu.addAction(profile_action)
+        tuning_menu = menu.addMenu("Tuning Profile")
+        current = self.window().tuning_for(self.camera_id)
+        for name in TUNING_PROFILES:
+            tuning_action = QAction(name, self)
+            tuning_action.setCheckable(True)
+            tuning_action.setChecked(name == current)
+            tuning_action.triggered.connect(lambda checked=False, n=name: self.window().set_tuning_profile(self.camera_id, n))
+            tuning_menu.addAction(tuning_action)
+        if self.window().segment_index and not self.window().timeline:
+            playback_action = QAction("Play Recording...", self)
+            playback_action.triggered.connect(self.play_recording)
+            menu.addAction(playback_action)
+        if self.window().in_playback(self.camera_id) and not self.window().timeline:
+            live_action = QAction("Back to Live", self)
+            live_action.triggered.connect(lambda: self.window().back_to_live(self.camera_id))
+            menu.addAction(live_action)
         menu.exec_(self.mapToGlobal(pos))
     
+    def set_renderer(self, renderer):
+        self.renderer = renderer
+        self.update()
+
+    def paintEvent(self, event):
+        if self.renderer and self.renderer.has_frame():
+            painter = QPainter(self)
+            painter.fillRect(self.rect(), Qt.black)
+            self.renderer.paint(painter, self.rect())
+            painter.end()
+            return
+        super().paintEvent(event)
+
     def change_rtsp_url(self):
         url, ok = QInputDialog.getText(self, "Change RTSP URL", "Enter new RTSP URL:", QLineEdit.Normal, "")
         if ok and url.strip():
             self.window().change_stream_url(self.camera_id, url.strip())
     
-    def mouseDoubleClickEvent(self, event):
+    def change_profile_url(self, profile):
+        url, ok = QInputDialog.getText(self, f"Set {profile.capitalize()} Stream URL",
+                                       f"Enter {profile} stream RTSP URL (empty to clear):", QLineEdit.Normal, "")
+        if ok:
+            self.window().set_profile_url(self.camera_id, profile, url.strip())
+
+    def play_recording(self):
+        when, ok = QInputDialog.getText(self, "Play Recording",
+                                        "Time (HH:MM[:SS], YYYY-MM-DD HH:MM:SS or -5m):", QLineEdit.Normal, "-1m")
+        if ok and when.strip():
+            self.window().play_recording(self.camera_id, when.strip())
+
+    def set_fullscreen(self, fullscreen):
+        if fullscreen == self.is_fullscreen:
+            return
         screen = QDesktopWidget().screenGeometry()
         max_width, max_height = screen.width(), screen.height() - 50
+        if self.is_fullscreen:
+            self.setGeometry(self.original_pos)
+            self.is_fullscreen = False
+        else:
+            self.original_pos = self.geometry()
+            new_geometry = QRect(0, 0, min(self.window().width(), max_width), min(self.window().height(), max_height))
+            self.setGeometry(new_geometry)
+            self.is_fullscreen = True
+        self.window().tile_fullscreen_changed(self.camera_id, self.is_fullscreen)
+
+    def mouseDoubleClickEvent(self, event):
         try:
-            if self.is_fullscreen:
-                self.setGeometry(self.original_pos)
-                self.is_fullscreen = False
-            else:
-                self.original_pos = self.geometry()
-                new_geometry = QRect(0, 0, min(self.window().width(), max_width), min(self.window().height(), max_height))
-                self.setGeometry(new_geometry)
-                self.is_fullscreen = True
+            self.set_fullscreen(not self.is_fullscreen)
         except Exception as e:
-            print(f"Error in mouseDoubleClickEvent: {str(e)}")
+            metrics.event(f"Error in mouseDoubleClickEvent: {str(e)}", level="error")
         event.accept()
 
 class InputDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, urls=None):
         super().__init__(parent)
         self.setWindowTitle("Enter RTSP Links")
         self.setFixedSize(400, 300)
         self.layout = QVBoxLayout()
         self.text_edit = QTextEdit()
+        # Start from the current list so changing one camera does not mean retyping all of them
+        self.text_edit.setPlainText("\n".join(urls or []))
         self.layout.addWidget(QLabel("RTSP URLs (one per line):"))
         self.layout.addWidget(self.text_edit)
         self.submit_button = QPushButton("Submit")
@@ -68,93 +148,799 @@ class InputDialog(QDialog):
         self.layout.addWidget(self.submit_button)
         self.setLayout(self.layout)
 
-class StreamUpdateWorker(QThread):
+
+class StartupProfile:
+    """Wall-clock marks from process start to the first page being up, printed with --startup-profile."""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = PROCESS_START
+        self.marks = []
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        with self._lock:
+            if not any(mark == name for mark, _ in self.marks):
+                self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        with self._lock:
+            if not self.enabled or self.reported:
+                return
+            self.reported = True
+            marks = sorted(self.marks, key=lambda mark: mark[1])
+        print("Startup profile:")
+        previous = self.started
+        for name, at in marks:
+            print(f"  {name:<24} +{(at - previous) * 1000:7.1f} ms  {(at - self.started) * 1000:8.1f} ms")
+            previous = at
+
+
+class DeferredVlcInstance:
+    """vlc.Instance created on a background thread so the window shows before libVLC has loaded its plugins.
+
+    Used exactly like the instance; the first attribute access blocks until libVLC is ready.
+    Bring-up workers are the first callers and hide the wait behind their probes.
+    """
+    def __init__(self, args, on_ready=None):
+        self._ready = threading.Event()
+        self._instance = None
+        self._error = None
+        self.args = args
+        self.on_ready = on_ready
+        threading.Thread(target=self._create, name="vlc-init", daemon=True).start()
+
+    def _create(self):
+        try:
+            self._instance = vlc.Instance(self.args)
+            if self._instance is None:
+                raise RuntimeError("libVLC failed to initialise")
+        except Exception as e:
+            metrics.event(f"Error creating VLC instance: {str(e)}", level="error")
+            self._error = e
+        finally:
+            self._ready.set()
+        if self.on_ready:
+            self.on_ready()
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def get(self, timeout=None):
+        if not self._ready.wait(timeout):
+            raise TimeoutError("libVLC is still initialising")
+        if self._error is not None:
+            raise self._error
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def release(self):
+        # Never wait for an init that is still running; the process is exiting anyway
+        if self._ready.is_set() and self._instance is not None:
+            self._instance.release()
+
+
+class StreamUpdateWorker(QObject):
+    """Brings up a single tile: reachability check, media validation, player setup.
+
+    Runs on a StreamBringUpPool thread. Cancellation is cooperative: every step checks
+    cancel_event and a cancelled worker releases whatever libVLC objects it created
+    and emits nothing.
+    """
     progress_update = pyqtSignal(str)
     stream_configured = pyqtSignal(int, object, bool, str)
     finished = pyqtSignal()
     
-    def __init__(self, url, index, vlc_instance, parent=None):
+    def __init__(self, url, index, vlc_instance, parent=None, deadline=13.0, probe_cache=None, media_options=None,
+                 decode_options=None, trust_stale=False, camera=None):
         super().__init__(parent)
         self.url = url
+        self.media_options = media_options or build_media_options(DEFAULT_PROFILE)
+        # Tile-size dependent limits, kept apart from media_options so they don't split the warm player pool
+        self.decode_options = decode_options or []
         self.index = index
+        # Credential-free main camera URL that labels this bring-up in the metrics
+        self.camera = camera
         self.vlc_instance = vlc_instance
+        self.deadline = deadline
+        self.probe_cache = probe_cache
+        # Restoring a saved wall: a camera that probed fine before is played straight away
+        self.trust_stale = trust_stale
+        self.media_info = {}
+        self.reachable = False
+        self.started_at = None
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def remaining_time(self):
+        if self.started_at is None:
+            return self.deadline
+        return max(0.0, self.deadline - (time.monotonic() - self.started_at))
     
     def check_rtsp_url(self, url):
         try:
             parsed_url = urllib.parse.urlparse(url)
             host = parsed_url.hostname
             port = parsed_url.port or 554
-            with socket.create_connection((host, port), timeout=3):
-                print(f"URL {url} is reachable")
+            with socket.create_connection((host, port), timeout=min(3.0, max(0.1, self.remaining_time()))):
+                metrics.event(f"URL {url} is reachable", level="debug")
                 return True
         except Exception as e:
-            print(f"URL {url} is unreachable: {str(e)}")
+            metrics.event(f"URL {url} is unreachable: {str(e)}", level="warning")
             return False
     
     def validate_media(self, url):
+        """OPTIONS/DESCRIBE probe for RTSP URLs; other schemes fall back to a libVLC parse."""
+        if urllib.parse.urlsplit(url).scheme.lower() not in ("rtsp", "rtsps"):
+            return self.validate_media_vlc(url)
+        timeout = self.remaining_time()
+        if timeout <= 0 or self.is_cancelled():
+            return False
+        # Imported here: rtsp_probe pulls in asyncio, which the window does not need to show
+        from rtsp_probe import probe_rtsp_sync
+        result = probe_rtsp_sync(url, timeout, self.cancel_event)
+        self.reachable = result["reachable"]
+        if not result["valid"]:
+            metrics.event(f"Invalid media for {url}: {result['error']}", level="warning")
+            return False
+        self.media_info = {key: result[key] for key in ("codec", "width", "height", "framerate", "auth", "tracks")
+                           if key in result}
+        metrics.event(f"Valid media for {url}: {self.media_info.get('codec')} "
+                      f"{self.media_info.get('width')}x{self.media_info.get('height')} in {result['latency']}s")
+        return True
+
+    def validate_media_vlc(self, url):
+        media = None
         try:
+            timeout = self.remaining_time()
+            if timeout <= 0 or self.is_cancelled():
+                return False
             media = self.vlc_instance.media_new(url)
             media.add_option('rtsp-tcp')
-            media.parse_with_options(vlc.MediaParseFlag.network, 10000)
+            media.parse_with_options(vlc.MediaParseFlag.network, int(timeout * 1000))
+            # parse_with_options is asynchronous; poll so a cancel can interrupt it
+            done_states = (vlc.MediaParsedStatus.done, vlc.MediaParsedStatus.failed,
+                           vlc.MediaParsedStatus.timeout, vlc.MediaParsedStatus.skipped)
+            while media.get_parsed_status() not in done_states:
+                if self.cancel_event.wait(0.05) or self.remaining_time() <= 0:
+                    media.parse_stop()
+                    metrics.event(f"Validation of {url} cancelled or timed out", level="warning")
+                    return False
             state = media.get_state()
-            parsed = media.is_parsed()
-            media.release()
+            parsed = media.get_parsed_status() == vlc.MediaParsedStatus.done
             if state == vlc.State.Error or not parsed:
-                print(f"Invalid media for {url}: state={state}")
+                metrics.event(f"Invalid media for {url}: state={state}", level="warning")
                 return False
-            print(f"Valid media for {url}")
+            self.media_info = self.read_media_info(media)
+            metrics.event(f"Valid media for {url}")
             return True
         except Exception as e:
-            print(f"Error validating media for {url}: {str(e)}")
+            metrics.event(f"Error validating media for {url}: {str(e)}", level="error")
             return False
+        finally:
+            if media:
+                media.release()
     
+    def read_media_info(self, media):
+        info = {"tracks": []}
+        try:
+            for track in media.tracks_get() or []:
+                entry = {
+                    "type": str(track.type),
+                    "codec": track.codec.to_bytes(4, "little").decode("ascii", "replace").strip(),
+                }
+                if track.type == vlc.TrackType.video:
+                    video = track.u.video.contents
+                    entry["width"] = video.width
+                    entry["height"] = video.height
+                    info.setdefault("width", video.width)
+                    info.setdefault("height", video.height)
+                    info.setdefault("codec", entry["codec"])
+                info["tracks"].append(entry)
+        except Exception as e:
+            metrics.event(f"Error reading track info: {str(e)}", level="error")
+        return info
+
+    def probe(self, url):
+        """Return True if url is playable, consulting the probe cache before the network."""
+        if self.probe_cache:
+            cached = self.probe_cache.get(url, allow_stale=self.trust_stale)
+            if cached is not None:
+                metrics.event(f"Using cached probe for {url}: valid={cached['valid']}", level="debug")
+                self.media_info = cached["metadata"]
+                return cached["valid"]
+        self.reachable = False
+        if urllib.parse.urlsplit(url).scheme.lower() in ("rtsp", "rtsps"):
+            # The RTSP probe opens its own connection, so a separate TCP check is redundant
+            valid = self.validate_media(url)
+        else:
+            self.reachable = self.check_rtsp_url(url)
+            valid = self.reachable and self.validate_media(url)
+        # A cancelled probe says nothing about the camera, so it is not cached
+        if self.probe_cache and not self.is_cancelled():
+            self.probe_cache.put(url, self.reachable, valid, self.media_info)
+        return valid
+
     def run(self):
+        player = None
         try:
+            self.started_at = time.monotonic()
+            if self.is_cancelled():
+                return
             self.progress_update.emit(f"Configuring stream {self.index + 1}...")
-            player = self.vlc_instance.media_player_new()
             message = ""
             status = False
             
-            if self.url and self.check_rtsp_url(self.url) and self.validate_media(self.url):
+            if self.url and self.probe(self.url):
+                if self.is_cancelled():
+                    return
+                player = self.vlc_instance.media_player_new()
                 media = self.vlc_instance.media_new(self.url)
-                media.add_option('avcodec-hw=nvidia')
-                media.add_option('no-audio')
-                media.add_option('rtsp-tcp')
-                media.add_option('no-video-title')
-                media.add_option('ffmpeg-threads=2')
+                for option in self.media_options + self.decode_options:
+                    media.add_option(option)
                 player.set_media(media)
+                media.release()
                 status = True
                 message = f"Stream {self.index + 1} ready"
             else:
                 message = "No Stream" if not self.url else "Unreachable or Invalid URL"
             
+            if self.is_cancelled():
+                return
             self.stream_configured.emit(self.index, player, status, message)
+            player = None
             self.progress_update.emit(f"Stream {self.index + 1} setup complete!")
         except Exception as e:
             self.progress_update.emit(f"Error: {str(e)}")
         finally:
-            self.finished.emit()
+            if player:
+                # Cancelled after the player was created: never hand it to the GUI
+                player.release()
+            if not self.is_cancelled():
+                self.finished.emit()
+
+
+class StreamBringUpPool:
+    """Bounded, reusable executor for StreamUpdateWorker jobs.
+
+    Jobs with the lowest priority value are served first, so visible tiles are
+    brought up before the rest. Threads are started on demand and kept for reuse.
+    """
+    def __init__(self, max_workers=9):
+        self.max_workers = max_workers
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._active = set()
+        self._threads = []
+        self._idle = 0
+        self._shutdown = False
+
+    def submit(self, worker, priority=0):
+        with self._lock:
+            if self._shutdown:
+                worker.cancel()
+                return
+            self._active.add(worker)
+            self._queue.put((priority, next(self._counter), worker))
+            if self._idle < self._queue.qsize() and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._run, name=f"bringup-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._idle += 1
+            _, _, worker = self._queue.get()
+            with self._lock:
+                self._idle -= 1
+            if worker is None:
+                return
+            try:
+                worker.run()
+            except Exception as e:
+                metrics.event(f"Error in bring-up worker {worker.index}: {str(e)}", level="error")
+            finally:
+                with self._lock:
+                    self._active.discard(worker)
+
+    def cancel_all(self):
+        with self._lock:
+            for worker in self._active:
+                worker.cancel()
+            self._active.clear()
+
+    def shutdown(self):
+        self.cancel_all()
+        with self._lock:
+            self._shutdown = True
+            for _ in self._threads:
+                self._queue.put((float('inf'), next(self._counter), None))
+
+
+class PlayerLifecycleService(QObject):
+    """Owns the libVLC player calls that can block (open, play, pause, stop, release, snapshots) off the Qt thread.
+
+    Every call returns a concurrent.futures.Future and is also reported through completed() on
+    the GUI thread. Calls for one player always land on the same thread, so a stop queued
+    before a play is applied first. shutdown() waits at most deadline seconds and then leaves
+    whatever is still stuck on a dead RTSP session to the daemon threads.
+    """
+    completed = pyqtSignal(object)
+
+    def __init__(self, workers=4, parent=None):
+        super().__init__(parent)
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._drained = threading.Condition(self._lock)
+        self._shutdown = False
+        self._threads = []
+        for i, jobs in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(jobs,), name=f"player-lifecycle-{i}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self, player):
+        return self._submit([player], "stop")
+
+    def open(self, instance, mrl, options=()):
+        """Create a player for mrl with media options; the result is the player, or None if that failed."""
+        return self._submit([instance], "open", mrl, list(options))
+
+    def play(self, player):
+        """The result is 1 if play() failed, 0 otherwise."""
+        return self._submit([player], "play")
+
+    def pause(self, player, paused=True):
+        return self.pause_many([player], paused)
+
+    def pause_many(self, players, paused=True):
+        return self._submit([player for player in players if player], "pause", int(paused))
+
+    def snapshot(self, player, width=0):
+        """JPEG bytes of the picture player is showing (None if there is none); never races a release."""
+        return self._submit([player], "snapshot", width)
+
+    def release(self, player):
+        return self.release_many([player])
+
+    def release_many(self, players):
+        """Stop and release players as one handle; each lifecycle thread takes its share as a batch."""
+        return self._submit([player for player in players if player], "release")
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self, deadline=0.8):
+        """Stop accepting work and wait up to deadline seconds; True if every queued call finished."""
+        end = time.monotonic() + deadline
+        with self._lock:
+            self._shutdown = True
+            while self._pending:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._drained.wait(remaining)
+            finished = not self._pending
+        for jobs in self._queues:
+            jobs.put(None)
+        return finished
+
+    def _submit(self, players, action, *args):
+        handle = Future()
+        batches = {}
+        for player in players:
+            batches.setdefault(id(player) % len(self._queues), []).append(player)
+        with self._lock:
+            if self._shutdown:
+                handle.set_exception(RuntimeError("player lifecycle service is shut down"))
+                return handle
+            if not batches:
+                handle.set_result(0)
+                self.completed.emit(handle)
+                return handle
+            handle.remaining = len(batches)
+            handle.failures = 0
+            self._pending.add(handle)
+        for slot, batch in batches.items():
+            self._queues[slot].put((handle, action, batch, args))
+        return handle
+
+    def _run(self, jobs):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            handle, action, batch, args = job
+            if action == "snapshot":
+                self._finish(handle, 0, self._take_snapshot(batch[0], *args))
+            elif action == "open":
+                self._finish(handle, 0, self._open(batch[0], *args))
+            elif action == "play":
+                self._finish(handle, self._each(batch, lambda player: player.play(), "starting"))
+            elif action == "pause":
+                self._finish(handle, self._each(batch, lambda player: player.set_pause(args[0]), "pausing"))
+            else:
+                # Stop the whole batch before releasing any of it: stop is the call that blocks
+                failures = self._each(batch, self._stop_player, "stopping")
+                if action == "release":
+                    failures += self._each(batch, lambda player: player.release(), "releasing")
+                self._finish(handle, failures)
+
+    def _finish(self, handle, failures, *result):
+        """Count one batch of handle as done; the handle's result is result if given, else the failure count."""
+        with self._lock:
+            handle.failures += failures
+            handle.remaining -= 1
+            done = handle.remaining == 0
+            if done:
+                self._pending.discard(handle)
+                self._drained.notify_all()
+        if done:
+            handle.set_result(result[0] if result else handle.failures)
+            self.completed.emit(handle)
+
+    @staticmethod
+    def _each(batch, call, doing):
+        """Apply call to every player of batch; how many raised or returned -1."""
+        failures = 0
+        for player in batch:
+            try:
+                if call(player) == -1:
+                    failures += 1
+            except Exception as e:
+                metrics.event(f"Error {doing} player: {str(e)}", level="error")
+                failures += 1
+        return failures
+
+    @staticmethod
+    def _stop_player(player):
+        if player.get_state() not in (vlc.State.Stopped, vlc.State.Ended):
+            player.stop()
+
+    @staticmethod
+    def _open(instance, mrl, options):
+        player = None
+        try:
+            player = instance.media_player_new()
+            media = instance.media_new(mrl)
+            for option in options:
+                media.add_option(option)
+            player.set_media(media)
+            media.release()
+            return player
+        except Exception as e:
+            metrics.event(f"Error creating player: {str(e)}", level="error")
+            if player is not None:
+                player.release()
+            return None
+
+    def _take_snapshot(self, player, width):
+        import tempfile
+        # One file per lifecycle thread, so concurrent snapshots never share a path
+        path = os.path.join(tempfile.gettempdir(), f"vms_snapshot_{os.getpid()}_{threading.get_ident()}.jpg")
+        try:
+            if player.get_state() != vlc.State.Playing or player.video_take_snapshot(0, path, width, 0) != 0:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except Exception as e:
+            metrics.event(f"Error taking snapshot: {str(e)}", level="error")
+            return None
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class StreamHealthMonitor(QObject):
+    """Watches registered players from its own thread and reports failures to the GUI.
+
+    libVLC error/end events are queued by the libVLC callback and handled here; a watchdog
+    compares decoded-frame counters so a stream that is "Playing" but frozen is caught too.
+    """
+    stream_failed = pyqtSignal(int, object, str)
+    stream_healthy = pyqtSignal(int, object)
+
+    def __init__(self, stall_timeout=1.0, first_frame_timeout=15.0, interval=0.25, parent=None):
+        super().__init__(parent)
+        self.stall_timeout = stall_timeout
+        self.first_frame_timeout = first_frame_timeout
+        self.interval = interval
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._watched = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stream-health", daemon=True)
+        self._thread.start()
+
+    def register(self, index, player, camera=None):
+        """Watch player in tile index; camera labels its libVLC stats in the metrics."""
+        self.unregister(player)
+        entry = {
+            "index": index,
+            "camera": camera,
+            "player": player,
+            "event_manager": player.event_manager(),
+            "registered_at": time.monotonic(),
+            "decoded": 0,
+            "last_progress": None,
+            "frame_interval": None,
+            "buffering": 0.0,
+            "stats": None,
+            "failed": False,
+        }
+        key = id(player)
+        for event_type in (vlc.EventType.MediaPlayerEncounteredError, vlc.EventType.MediaPlayerEndReached,
+                           vlc.EventType.MediaPlayerBuffering):
+            # Runs on a libVLC thread: only hand the event over, never touch Qt or the player here
+            entry["event_manager"].event_attach(event_type, self._on_vlc_event, key)
+        with self._lock:
+            self._watched[key] = entry
+
+    def unregister(self, player):
+        with self._lock:
+            entry = self._watched.pop(id(player), None)
+        if entry:
+            with self._check_lock:
+                pass
+            for event_type in (vlc.EventType.MediaPlayerEncounteredError, vlc.EventType.MediaPlayerEndReached,
+                               vlc.EventType.MediaPlayerBuffering):
+                try:
+                    entry["event_manager"].event_detach(event_type)
+                except Exception:
+                    pass
+
+    def snapshot(self):
+        """Latest health figures per tile index."""
+        with self._lock:
+            return {entry["index"]: {"decoded": entry["decoded"], "buffering": entry["buffering"],
+                                     "frame_interval": entry["frame_interval"], "stats": entry["stats"],
+                                     "failed": entry["failed"]}
+                    for entry in self._watched.values()}
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self._events.put(None)
+        self._thread.join(timeout)
+
+    def _on_vlc_event(self, event, key):
+        buffering = None
+        if event.type == vlc.EventType.MediaPlayerBuffering:
+            buffering = event.u.new_cache
+        self._events.put((key, event.type, buffering))
+
+    def _run(self):
+        next_check = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            try:
+                item = self._events.get(timeout=max(0.0, next_check - time.monotonic()))
+                if item is not None:
+                    self._handle_event(*item)
+            except queue.Empty:
+                pass
+            if time.monotonic() >= next_check:
+                self._check_stalls()
+                next_check = time.monotonic() + self.interval
+
+    def _handle_event(self, key, event_type, buffering):
+        with self._lock:
+            entry = self._watched.get(key)
+            if not entry or entry["failed"]:
+                return
+            if event_type == vlc.EventType.MediaPlayerBuffering:
+                entry["buffering"] = buffering
+                return
+            entry["failed"] = True
+        reason = "error" if event_type == vlc.EventType.MediaPlayerEncounteredError else "ended"
+        self.stream_failed.emit(entry["index"], entry["player"], reason)
+
+    def _check_stalls(self):
+        now = time.monotonic()
+        with self._lock:
+            entries = [entry for entry in self._watched.values() if not entry["failed"]]
+        for entry in entries:
+            try:
+                with self._check_lock:
+                    stats = self._read_stats(entry)
+                    reason = self._check_progress(entry, stats, now) if stats else None
+            except Exception as e:
+                metrics.event(f"Error checking stream {entry['index']}: {str(e)}", level="error")
+                continue
+            if reason:
+                with self._lock:
+                    if entry["failed"] or id(entry["player"]) not in self._watched:
+                        continue
+                    entry["failed"] = True
+                self.stream_failed.emit(entry["index"], entry["player"], reason)
+
+    def _read_stats(self, entry):
+        """entry's media stats, or None if there are none yet; the caller holds _check_lock."""
+        # unregister() waits for _check_lock, so a player handed over for release is not read here
+        with self._lock:
+            if id(entry["player"]) not in self._watched:
+                return None
+        media = entry["player"].get_media()
+        if media is None:
+            return None
+        stats = vlc.MediaStats()
+        try:
+            has_stats = media.get_stats(stats)
+        finally:
+            # get_media() hands out a reference of its own
+            media.release()
+        return stats if has_stats else None
+
+    def _check_progress(self, entry, stats, now):
+        """Record entry's stats; returns why it failed if it stopped decoding, else None."""
+        decoded = stats.decoded_video
+        entry["stats"] = {"decoded_video": decoded, "lost_pictures": stats.lost_pictures,
+                          "input_bitrate": stats.input_bitrate}
+        if entry["camera"]:
+            metrics.set("decoded_frames", decoded, camera=entry["camera"])
+            metrics.set("lost_pictures", stats.lost_pictures, camera=entry["camera"])
+            metrics.set("input_bitrate", stats.input_bitrate, camera=entry["camera"])
+        if decoded > entry["decoded"]:
+            self._progressed(entry, decoded, now)
+        elif entry["last_progress"] is None:
+            if now - entry["registered_at"] > self.first_frame_timeout:
+                return "no video"
+        elif entry["player"].get_state() == vlc.State.Playing:
+            # Allow a few frame intervals so 1-2 fps cameras are not flagged
+            limit = max(self.stall_timeout, 3 * (entry["frame_interval"] or 0))
+            if now - entry["last_progress"] > limit:
+                return "stalled"
+        return None
+
+    def _progressed(self, entry, decoded, now):
+        if entry["last_progress"] is None:
+            self.stream_healthy.emit(entry["index"], entry["player"])
+        else:
+            interval = (now - entry["last_progress"]) / (decoded - entry["decoded"])
+            previous = entry["frame_interval"]
+            entry["frame_interval"] = interval if previous is None else 0.8 * previous + 0.2 * interval
+        entry["decoded"] = decoded
+        entry["last_progress"] = now
+        if entry["camera"] and entry["frame_interval"]:
+            metrics.set("frame_interval_seconds", round(entry["frame_interval"], 4), camera=entry["camera"])
+
 
 class RTSPViewer(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup_profile=None, vlc_verbose=0):
         super().__init__()
+        self.startup_profile = startup_profile or StartupProfile()
+        # vms_config.json is written atomically from a background thread; see config_store.py.
+        # The saved state is read on a helper thread while the widgets below are built.
+        self.config_store = ConfigStore(CONFIG_FILE)
+        self.probe_cache = ProbeCache(DEFAULT_CACHE_FILE)
+        self.saved_state = Future()
+        threading.Thread(target=self.read_saved_state, name="config-restore", daemon=True).start()
         self.setWindowTitle("RTSP Video Viewer (VMS Prototype)")
         self.setGeometry(100, 100, 800, 600)
         
+        # rtsp_urls is the whole camera list; the per-tile lists below only cover the current page
         self.rtsp_urls = []
         self.players = []
         self.labels = []
         self.stream_status = []
-        self.max_streams = 8
-        self.grid_size = 2
-        self.vlc_instance = vlc.Instance('--no-xlib --verbose=2 --network-caching=1000 --rtsp-caching=1000 --live-caching=1000 '
-                                         '--no-video-title-show --clock-jitter=0 --clock-synchro=0 '
-                                         '--rtsp-frame-buffer-size=200000 --rtsp-timeout=15 --aout=dummy --no-audio')
+        self.active_urls = []
+        self.suspended = []
+        self.reconnect_tokens = []
+        self.hidden_tile_policy = "pause"
+        self.stream_profiles = {}
+        self.profile_thresholds = {"main": 960, "sub": 480}
+        self.grid_rows = 2
+        self.grid_cols = 2
+        self.page = 0
+        self.tour_enabled = False
+        self.tour_interval = 30
+        self.prewarm_lead = 3
+        self.prewarm = None
+        # Caching, clock and decoder settings are per media, see tuning_profiles.py. libVLC's plugin
+        # scan is the slowest part of startup, so it runs in the background while the window comes up.
+        self.vlc_args = (f'--no-xlib --verbose={vlc_verbose} --no-video-title-show '
+                         '--rtsp-timeout=15 --aout=dummy --no-audio --snapshot-format=jpg')
+        self.vlc_instance = DeferredVlcInstance(self.vlc_args,
+                                                on_ready=lambda: self.startup_profile.mark("vlc instance ready"))
+        # Optional: one supervised decoder process per camera instead of players in this process
+        self.decoder_processes = {"enabled": False, "max_frame": [1280, 720], "heartbeat_timeout": 3.0,
+                                  "max_restarts": 3, "restart_window": 60.0}
+        self.decoder_host = None
+        self.tuning_profile = DEFAULT_PROFILE
+        self.camera_tuning = {}
+        self.hw_decode = "auto"
+        # Per-camera overrides of tile_limits(): max_fps, max_width, skip_loop_filter, skip_frame, keyframe_only
+        self.camera_limits = {}
         self.workers = []
+        self.bringup_pool = StreamBringUpPool(max_workers=9)
+        self.restoring = False
+        self.health_monitor = StreamHealthMonitor()
+        self.health_monitor.stream_failed.connect(self.on_stream_failed)
+        self.health_monitor.stream_healthy.connect(self.on_stream_healthy)
+        # stop()/release() can block for seconds on a dead RTSP session, so they never run here
+        self.lifecycle = PlayerLifecycleService()
+        self.lifecycle.completed.connect(self.lifecycle_completed)
+        self.retired_labels = {}
+        # Players that left the grid stay negotiated for a while so a grid or page change can adopt them
+        self.player_pool = WarmPlayerPool()
+        self.player_keys = {}
+        # Player -> time play() was called, for the time-to-first-frame histogram
+        self.play_started = {}
+        self.reconnect_manager = ReconnectManager()
+        # Latest picture per camera for thumbnails; taken from the running players, no extra session
+        self.frame_cache = FrameCache()
+        self.snapshot_interval = 2.0
+        self.snapshot_width = 640
+        self.snapshot_port = 0
+        self.frame_server = None
+        # Snapshot handle -> player; only touched on the GUI thread, cleared from lifecycle_completed
+        self.snapshots_pending = {}
+        # play() handle -> (tile index, player), checked for a failed start in lifecycle_completed
+        self.plays_pending = {}
+        # Tile index -> open() handle of the recording it is about to play
+        self.playback_opening = {}
+        # Stream-copied segment files and event clips; cameras is a list of URLs or "all"
+        self.recording = {"cameras": [], "directory": "recordings", "segment_seconds": 60, "pre_event_seconds": 10}
+        self.recorder = None
+        # Recorded segments by time, from this viewer's recorder or a headless one; None if nothing is recorded
+        self.segment_index = None
+        self.playback_players = set()
+        # Optional motion analysis of the decoded tiles (activity_monitor.py, needs NumPy)
+        self.activity = {"enabled": False, "rate": 2.0, "threshold": 12.0, "start_score": 0.02, "stop_score": 0.005,
+                         "hold": 5.0, "auto_promote": False}
+        self.activity_monitor = None
+        self.activity_timer = QTimer()
+        self.activity_timer.timeout.connect(self.sample_activity)
+        # Tile made fullscreen by auto-promotion; a manual double-click takes it back
+        self.promoted = None
+        self.promoting = False
+        # Grid-wide synchronised playback (PlaybackTimeline) while the timeline bar is open
+        self.timeline = None
+        self.timeline_origin = 0.0
+        self.timeline_bar = None
+        self.timeline_timer = QTimer()
+        self.timeline_timer.timeout.connect(self.tick_timeline)
+        self.timeline_seek_timer = QTimer()
+        self.timeline_seek_timer.setSingleShot(True)
+        self.timeline_seek_timer.timeout.connect(self.seek_timeline_to_slider)
+        # "window" gives every tile a native window; "composited" paints callback frames into the labels
+        self.render_mode = "window"
+        self.render_fps = 15
         self.updating = False
+        self.save_timer = QTimer()
+        self.save_timer.setSingleShot(True)
+        self.save_timer.timeout.connect(self.write_config)
         self.resize_timer = QTimer()
         self.resize_timer.setSingleShot(True)
         self.resize_timer.timeout.connect(self.deferred_resize)
+        self.tour_timer = QTimer()
+        self.tour_timer.setSingleShot(True)
+        self.tour_timer.timeout.connect(self.tour_next_page)
+        self.prewarm_timer = QTimer()
+        self.prewarm_timer.setSingleShot(True)
+        self.prewarm_timer.timeout.connect(self.prewarm_next_page)
+        self.pool_timer = QTimer()
+        self.pool_timer.timeout.connect(self.expire_player_pool)
+        self.snapshot_timer = QTimer()
+        self.snapshot_timer.timeout.connect(self.grab_snapshots)
+        self.render_timer = QTimer()
+        self.render_timer.timeout.connect(self.repaint_tiles)
+        # Readers of the metrics (HTTP endpoint) only ever see the snapshot published here
+        self.metrics_interval = 1.0
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self.publish_metrics)
         
         # Main widget and layout
         self.central_widget = QWidget()
@@ -172,8 +958,17 @@ class RTSPViewer(QMainWindow):
         self.input_button = QPushButton("Add RTSP Links")
         self.input_button.clicked.connect(self.open_input_dialog)
         self.grid_combo = QComboBox()
-        self.grid_combo.addItems(["1 (1x1)", "4 (2x2)", "9 (3x3)"])
+        self.grid_combo.addItems([f"{rows * cols} ({rows}x{cols})" for rows, cols in GRID_LAYOUTS])
         self.grid_combo.currentTextChanged.connect(self.change_grid_size)
+        self.prev_page_button = QPushButton("<")
+        self.prev_page_button.clicked.connect(lambda: self.show_page(self.page - 1))
+        self.next_page_button = QPushButton(">")
+        self.next_page_button.clicked.connect(lambda: self.show_page(self.page + 1))
+        self.page_label = QLabel("Page 1/1")
+        self.tour_check = QCheckBox("Tour")
+        self.tour_check.toggled.connect(self.set_tour_enabled)
+        self.timeline_button = QPushButton("Timeline")
+        self.timeline_button.clicked.connect(self.open_timeline)
         
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -182,11 +977,19 @@ class RTSPViewer(QMainWindow):
         self.control_layout.addWidget(QLabel("Grid Size:"))
         self.control_layout.addWidget(self.grid_combo)
         self.control_layout.addWidget(self.input_button)
+        self.control_layout.addWidget(self.prev_page_button)
+        self.control_layout.addWidget(self.page_label)
+        self.control_layout.addWidget(self.next_page_button)
+        self.control_layout.addWidget(self.tour_check)
+        self.control_layout.addWidget(self.timeline_button)
         self.control_layout.addStretch()
         self.control_layout.addWidget(self.status_label)
         
         self.main_layout.addLayout(self.control_layout)
         self.main_layout.addWidget(self.progress_bar)
+        self.timeline_layout = QHBoxLayout()
+        self.timeline_layout.setContentsMargins(0, 0, 0, 0)
+        self.main_layout.addLayout(self.timeline_layout)
         
         # Grid layout for video streams
         self.grid_layout = QGridLayout()
@@ -195,40 +998,164 @@ class RTSPViewer(QMainWindow):
         self.main_layout.addLayout(self.grid_layout)
         self.main_layout.setStretchFactor(self.grid_layout, 1)
         
-        # Load saved configuration
+        self.startup_profile.mark("window built")
+
+        # Load saved settings now; the cameras are only opened once the window is on screen
         self.load_config()
-        
-        # Start monitoring streams
-        QTimer.singleShot(5000, self.monitor_streams)
-        
+        self.startup_profile.mark("config loaded")
+        if self.decoder_processes.get("enabled"):
+            self.start_decoder_host()
+        self.start_recording()
+        self.timeline_button.setVisible(bool(self.segment_index))
+        self.start_activity()
+        self.start_snapshots()
+        self.metrics_timer.start(int(self.metrics_interval * 1000))
+        if self.render_mode == "composited":
+            self.render_timer.start(1000 // 30)
+        QTimer.singleShot(0, self.restore_session)
+
+    def read_saved_state(self):
+        try:
+            self.probe_cache.load()
+            self.saved_state.set_result(self.config_store.load())
+        except Exception as e:
+            self.saved_state.set_exception(e)
+
     def load_config(self):
         try:
-            with open("vms_config.json", "r") as f:
-                config = json.load(f)
-                self.rtsp_urls = config.get("rtsp_urls", [])
-                self.grid_size = config.get("grid_size", 2)
-                self.grid_combo.setCurrentText(f"{self.grid_size * self.grid_size} ({self.grid_size}x{self.grid_size})")
-                if self.rtsp_urls:
-                    self.start_stream_update('\n'.join(self.rtsp_urls))
+            config = self.saved_state.result()
+            cache_config = config.get("probe_cache", {})
+            self.probe_cache.positive_ttl = cache_config.get("positive_ttl", self.probe_cache.positive_ttl)
+            self.probe_cache.negative_ttl = cache_config.get("negative_ttl", self.probe_cache.negative_ttl)
+            self.probe_cache.stale_ttl = cache_config.get("stale_ttl", self.probe_cache.stale_ttl)
+            self.rtsp_urls = config.get("rtsp_urls", [])
+            self.stream_profiles = config.get("stream_profiles", {})
+            self.profile_thresholds.update(config.get("profile_thresholds", {}))
+            self.hidden_tile_policy = config.get("hidden_tile_policy", self.hidden_tile_policy)
+            self.tuning_profile = resolve_profile_name(config.get("tuning_profile", self.tuning_profile))
+            self.camera_tuning = config.get("camera_tuning", {})
+            self.hw_decode = config.get("hw_decode", self.hw_decode)
+            self.camera_limits = config.get("camera_limits", {})
+            reconnect_config = config.get("reconnect", {})
+            for key in ("base_delay", "max_delay", "failure_threshold", "open_cooldown", "min_spacing"):
+                if key in reconnect_config:
+                    setattr(self.reconnect_manager, key, reconnect_config[key])
+            health_config = config.get("health", {})
+            self.health_monitor.stall_timeout = health_config.get("stall_timeout", self.health_monitor.stall_timeout)
+            self.health_monitor.first_frame_timeout = health_config.get("first_frame_timeout",
+                                                                        self.health_monitor.first_frame_timeout)
+            self.render_mode = config.get("render_mode", self.render_mode)
+            self.render_fps = config.get("render_fps", self.render_fps)
+            snapshot_config = config.get("snapshots", {})
+            self.snapshot_interval = snapshot_config.get("interval", self.snapshot_interval)
+            self.snapshot_width = snapshot_config.get("width", self.snapshot_width)
+            self.snapshot_port = snapshot_config.get("port", self.snapshot_port)
+            metrics_config = config.get("metrics", {})
+            self.metrics_interval = metrics_config.get("interval", self.metrics_interval)
+            metrics.echo = metrics_config.get("echo", metrics.echo)
+            metrics.min_level = metrics_config.get("level", metrics.min_level)
+            self.decoder_processes.update(config.get("decoder_processes", {}))
+            self.recording.update(config.get("recording", {}))
+            self.activity.update(config.get("activity", {}))
+            pool_config = config.get("player_pool", {})
+            self.player_pool.max_idle = pool_config.get("max_idle", self.player_pool.max_idle)
+            self.player_pool.idle_ttl = pool_config.get("idle_ttl", self.player_pool.idle_ttl)
+            self.grid_rows = config.get("grid_rows", 2)
+            self.grid_cols = config.get("grid_cols", 2)
+            self.page = config.get("page", 0)
+            tour_config = config.get("tour", {})
+            self.tour_interval = tour_config.get("interval", self.tour_interval)
+            self.prewarm_lead = tour_config.get("prewarm_lead", self.prewarm_lead)
+            layout_text = f"{self.grid_rows * self.grid_cols} ({self.grid_rows}x{self.grid_cols})"
+            if self.grid_combo.findText(layout_text) < 0:
+                self.grid_combo.addItem(layout_text)
+            self.grid_combo.setCurrentText(layout_text)
+            self.tour_check.setChecked(tour_config.get("enabled", False))
         except FileNotFoundError:
-            print("No config file found")
+            metrics.event("No config file found", level="warning")
         except Exception as e:
-            print(f"Error loading config: {str(e)}")
+            metrics.event(f"Error loading config: {str(e)}", level="error")
     
+    def restore_session(self):
+        """Open the saved page once the window is up, trusting earlier probe results so tiles start at once."""
+        self.startup_profile.mark("window shown")
+        if not self.rtsp_urls:
+            self.startup_profile.report()
+            return
+        self.restoring = True
+        self.show_page(self.page)
+        self.check_bringup_done()
+
     def save_config(self):
+        # Bursts of edits (grid changes, URL edits, tour toggles) end up as one write
+        self.save_timer.start(500)
+
+    def write_config(self):
         try:
-            config = {"rtsp_urls": self.rtsp_urls, "grid_size": self.grid_size}
-            with open("vms_config.json", "w") as f:
-                json.dump(config, f, indent=4)
+            config = {
+                "rtsp_urls": self.rtsp_urls,
+                "grid_rows": self.grid_rows,
+                "grid_cols": self.grid_cols,
+                "page": self.page,
+                "tour": {
+                    "enabled": self.tour_enabled,
+                    "interval": self.tour_interval,
+                    "prewarm_lead": self.prewarm_lead,
+                },
+                "stream_profiles": self.stream_profiles,
+                "profile_thresholds": self.profile_thresholds,
+                "hidden_tile_policy": self.hidden_tile_policy,
+                "tuning_profile": self.tuning_profile,
+                "camera_tuning": self.camera_tuning,
+                "hw_decode": self.hw_decode,
+                "camera_limits": self.camera_limits,
+                "render_mode": self.render_mode,
+                "render_fps": self.render_fps,
+                "reconnect": {
+                    "base_delay": self.reconnect_manager.base_delay,
+                    "max_delay": self.reconnect_manager.max_delay,
+                    "failure_threshold": self.reconnect_manager.failure_threshold,
+                    "open_cooldown": self.reconnect_manager.open_cooldown,
+                    "min_spacing": self.reconnect_manager.min_spacing,
+                },
+                "health": {
+                    "stall_timeout": self.health_monitor.stall_timeout,
+                    "first_frame_timeout": self.health_monitor.first_frame_timeout,
+                },
+                "snapshots": {
+                    "interval": self.snapshot_interval,
+                    "width": self.snapshot_width,
+                    "port": self.snapshot_port,
+                },
+                "metrics": {
+                    "interval": self.metrics_interval,
+                    "echo": metrics.echo,
+                    "level": metrics.min_level,
+                },
+                "decoder_processes": self.decoder_processes,
+                "recording": self.recording,
+                "activity": self.activity,
+                "player_pool": {
+                    "max_idle": self.player_pool.max_idle,
+                    "idle_ttl": self.player_pool.idle_ttl,
+                },
+                "probe_cache": {
+                    "positive_ttl": self.probe_cache.positive_ttl,
+                    "negative_ttl": self.probe_cache.negative_ttl,
+                    "stale_ttl": self.probe_cache.stale_ttl,
+                },
+            }
+            self.config_store.save(config)
+            self.config_store.defer(self.probe_cache.save)
         except Exception as e:
-            print(f"Error saving config: {str(e)}")
+            metrics.event(f"Error saving config: {str(e)}", level="error")
     
     def open_input_dialog(self):
         if self.updating:
             QMessageBox.information(self, "Info", "Please wait for current operation to complete.")
             return
             
-        dialog = InputDialog(self)
+        dialog = InputDialog(self, self.rtsp_urls)
         if dialog.exec_():
             urls_text = dialog.text_edit.toPlainText()
             self.start_stream_update(urls_text)
@@ -237,167 +1164,1112 @@ class RTSPViewer(QMainWindow):
         try:
             if self.updating:
                 return
-            new_grid_size = int(math.sqrt(int(text.split()[0])))
-            if new_grid_size != self.grid_size:
-                self.grid_size = new_grid_size
-                print(f"Changed grid size to {self.grid_size}x{self.grid_size}")
-                self.update_grid_layout()
+            match = re.search(r"\((\d+)x(\d+)\)", text)
+            if not match:
+                return
+            rows, cols = int(match.group(1)), int(match.group(2))
+            if (rows, cols) != (self.grid_rows, self.grid_cols):
+                # Keep the camera in the top-left tile on screen after the change
+                first_camera = self.page * self.tiles_per_page()
+                self.grid_rows, self.grid_cols = rows, cols
+                metrics.event(f"Changed grid size to {self.grid_rows}x{self.grid_cols}")
+                self.discard_prewarm()
+                if self.rtsp_urls:
+                    self.show_page(first_camera // self.tiles_per_page())
+                else:
+                    self.update_grid_layout()
                 self.save_config()
         except Exception as e:
-            print(f"Error changing grid size: {str(e)}")
+            metrics.event(f"Error changing grid size: {str(e)}", level="error")
     
+    def tiles_per_page(self):
+        return self.grid_rows * self.grid_cols
+
+    def page_count(self):
+        return max(1, math.ceil(len(self.rtsp_urls) / self.tiles_per_page()))
+
+    def page_cameras(self, page, urls):
+        """The cameras of urls that page shows."""
+        tiles = self.tiles_per_page()
+        return urls[page * tiles:(page + 1) * tiles]
+
+    def camera_url(self, index):
+        """Main URL of the camera shown in tile index of the current page."""
+        camera = self.page * self.tiles_per_page() + index
+        return self.rtsp_urls[camera] if camera < len(self.rtsp_urls) else ''
+
+    def camera_label(self, index):
+        """Credential-free main URL of tile index, used to label its metrics."""
+        return camera_label(self.camera_url(index)) or None
+
     def start_stream_update(self, urls_text):
         try:
             if self.updating:
                 return
-                
+
+            # Parse URLs; any number of cameras is fine, only the current page is played
+            urls = [url.strip() for url in urls_text.strip().split('\n') if url.strip()]
+            old_urls, self.rtsp_urls = self.rtsp_urls, urls
+            if urls == old_urls:
+                metrics.event("Camera list unchanged", level="debug")
+                return
+            for url in set(old_urls) - set(urls):
+                self.reconnect_manager.forget(url)
+                self.frame_cache.forget(url)
+                metrics.forget(camera_label(url))
+                if self.activity_monitor:
+                    self.activity_monitor.forget(camera_label(url))
+            if self.recorder:
+                self.sync_recording()
+
+            # Reconcile instead of rebuilding: a page whose cameras did not change keeps running
+            # untouched, and show_page adopts the warm players of cameras that only moved.
+            staged = self.prewarm
+            if staged and self.page_cameras(staged["page"], urls) != self.page_cameras(staged["page"], old_urls):
+                self.discard_prewarm()
+            page = min(self.page, self.page_count() - 1)
+            if self.labels and page == self.page \
+                    and self.page_cameras(page, urls) == self.page_cameras(page, old_urls):
+                metrics.event(f"Cameras on page {self.page + 1} unchanged")
+                self.page_label.setText(f"Page {self.page + 1}/{self.page_count()}")
+                self.schedule_tour()
+            else:
+                self.show_page(page)
+            self.save_config()
+        except Exception as e:
+            metrics.event(f"Error in start_stream_update: {str(e)}", level="error")
+
+    def show_page(self, page):
+        """Bring up the tiles of page and release everything else.
+
+        If the page was pre-warmed for a tour its tiles are already playing and are swapped in as-is.
+        """
+        try:
+            if self.updating:
+                return
             self.updating = True
             self.set_controls_enabled(False)
             self.progress_bar.setVisible(True)
             self.progress_bar.setRange(0, 0)
             
-            # Parse URLs
-            new_urls = [url.strip() for url in urls_text.strip().split('\n') if url.strip()]
-            if len(new_urls) > self.max_streams:
-                QMessageBox.warning(self, "Warning", f"Maximum {self.max_streams} streams allowed. Taking first {self.max_streams} URLs.")
-                new_urls = new_urls[:self.max_streams]
-            
-            # Stop existing players
-            self.stop_existing_players()
-            
-            # Update labels and players
-            required_labels = min(self.grid_size * self.grid_size, self.max_streams)
-            current_label_count = len(self.labels)
-            
-            if current_label_count < required_labels:
-                for i in range(current_label_count, required_labels):
-                    label = CustomLabel(self.central_widget, camera_id=i)
-                    label.setText("Initializing...")
-                    self.labels.append(label)
-                    self.players.append(None)
-                    self.stream_status.append(False)
-            elif current_label_count > required_labels:
-                for label in self.labels[required_labels:]:
-                    label.deleteLater()
-                self.labels = self.labels[:required_labels]
-                self.players = self.players[:required_labels]
-                self.stream_status = self.stream_status[:required_labels]
-            
-            self.rtsp_urls = new_urls
-            self.workers = [None] * required_labels
+            if self.timeline:
+                self.stop_timeline()
+            self.promoted = None
+            self.page = page % self.page_count()
+            released = self.stop_existing_players(park=True)
+            tiles = self.tiles_per_page()
+            staged = self.prewarm
+            if staged and (staged["page"] != self.page or len(staged["labels"]) != tiles):
+                self.discard_prewarm()
+                staged = None
             
-            for i in range(required_labels):
-                url = self.rtsp_urls[i] if i < len(self.rtsp_urls) else ''
-                worker = StreamUpdateWorker(url, i, self.vlc_instance, self)
-                worker.progress_update.connect(self.update_status)
-                worker.stream_configured.connect(self.configure_stream)
-                worker.finished.connect(lambda idx=i: self.worker_finished(idx))
-                self.workers[i] = worker
-                worker.start()
+            if staged:
+                self.show_prewarmed_page(staged, released, tiles)
+            else:
+                self.open_page(released, tiles)
             
+            self.settle_player_pool()
             self.update_grid_layout()
-            self.save_config()
+            self.page_label.setText(f"Page {self.page + 1}/{self.page_count()}")
+            self.schedule_tour()
+            self.check_bringup_done()
+        except Exception as e:
+            metrics.event(f"Error in show_page: {str(e)}", level="error")
+
+    def show_prewarmed_page(self, staged, released, tiles):
+        metrics.event(f"Showing pre-warmed page {self.page + 1}")
+        self.retire_labels([label for label in self.labels if label], released)
+        self.labels = staged["labels"]
+        self.players = staged["players"]
+        self.stream_status = staged["status"]
+        self.active_urls = staged["urls"]
+        self.workers = staged["workers"]
+        self.suspended = [False] * tiles
+        self.reconnect_tokens = [None] * tiles
+        self.prewarm = None
+        for i in range(tiles):
+            if self.workers[i] is None and not self.stream_status[i] and self.active_urls[i]:
+                self.schedule_reconnect(i, "unreachable")
+
+    def open_page(self, released, tiles):
+        """Fill the page from warm pooled players where possible and bring up the rest."""
+        # Labels whose player was parked went to the pool with it; the rest are reused as-is
+        spare = [label for label in self.labels if label]
+        self.labels = []
+        self.players = [None] * tiles
+        self.stream_status = [False] * tiles
+        self.active_urls = [''] * tiles
+        self.suspended = [False] * tiles
+        self.reconnect_tokens = [None] * tiles
+        self.workers = [None] * tiles
+
+        cell_width, _ = self.compute_cell_size()
+        pending = []
+        for i in range(tiles):
+            url = self.stream_url_for(self.camera_url(i), cell_width)
+            if url and self.adopt_pooled_player(i, url, cell_width):
+                continue
+            label = spare.pop(0) if spare else CustomLabel(self.central_widget, camera_id=i)
+            label.camera_id = i
+            label.set_renderer(None)
+            label.setText("Initializing...")
+            self.labels.append(label)
+            pending.append((i, url))
+        self.retire_labels(spare, released)
+
+        # Tiles are laid out row-major, so the index doubles as the bring-up priority
+        for i, url in pending:
+            self.submit_worker(i, url, priority=i)
+        if len(pending) < tiles:
+            metrics.event(f"Reused {tiles - len(pending)} warm player(s), opening {len(pending)}")
+
+    def set_tour_enabled(self, enabled):
+        self.tour_enabled = enabled
+        self.schedule_tour()
+        self.save_config()
+
+    def schedule_tour(self):
+        self.tour_timer.stop()
+        self.prewarm_timer.stop()
+        if self.tour_enabled and self.page_count() > 1:
+            self.tour_timer.start(int(self.tour_interval * 1000))
+            self.prewarm_timer.start(int(max(0, self.tour_interval - self.prewarm_lead) * 1000))
+
+    def tour_next_page(self):
+        if self.updating:
+            self.tour_timer.start(1000)
+            return
+        self.show_page(self.page + 1)
+
+    def prewarm_next_page(self):
+        next_page = (self.page + 1) % self.page_count()
+        if next_page != self.page:
+            self.prewarm_page(next_page)
+
+    def prewarm_page(self, page):
+        """Start the tiles of page on hidden labels so a tour switch only has to swap them in."""
+        try:
+            self.discard_prewarm()
+            tiles = self.tiles_per_page()
+            cell_width, cell_height = self.compute_cell_size()
+            staged = {"page": page, "labels": [], "players": [None] * tiles, "status": [False] * tiles,
+                      "urls": [''] * tiles, "workers": [None] * tiles}
+            self.prewarm = staged
+            for i in range(tiles):
+                label = CustomLabel(self.central_widget, camera_id=i)
+                label.setFixedSize(cell_width, cell_height)
+                label.setText("Initializing...")
+                label.hide()
+                staged["labels"].append(label)
+                camera = page * tiles + i
+                main_url = self.rtsp_urls[camera] if camera < len(self.rtsp_urls) else ''
+                url = self.stream_url_for(main_url, cell_width)
+                staged["urls"][i] = url
+                # Queued behind every tile of the current page
+                staged["workers"][i] = self.create_worker(i, url, main_url)
+                self.bringup_pool.submit(staged["workers"][i], tiles + i)
+            metrics.event(f"Pre-warming page {page + 1}")
         except Exception as e:
-            print(f"Error in start_stream_update: {str(e)}")
+            metrics.event(f"Error in prewarm_page: {str(e)}", level="error")
+
+    def discard_prewarm(self):
+        staged, self.prewarm = self.prewarm, None
+        if not staged:
+            return
+        for worker in staged["workers"]:
+            if worker:
+                worker.cancel()
+        players = [player for player in staged["players"] if player]
+        for player in players:
+            self.health_monitor.unregister(player)
+            self.player_keys.pop(player, None)
+            self.play_started.pop(player, None)
+        self.retire_labels(staged["labels"], self.lifecycle.release_many(players))
     
     def change_stream_url(self, index, url):
         try:
             if index < len(self.labels) and index < len(self.players):
-                if self.players[index]:
-                    try:
-                        state = self.players[index].get_state()
-                        if state not in (vlc.State.Stopped, vlc.State.Ended):
-                            self.players[index].stop()
-                        self.players[index].release()
-                    except Exception as e:
-                        print(f"Error stopping player {index}: {str(e)}")
-                
-                self.rtsp_urls[index] = url
-                worker = StreamUpdateWorker(url, index, self.vlc_instance, self)
-                worker.progress_update.connect(self.update_status)
-                worker.stream_configured.connect(self.configure_stream)
-                worker.finished.connect(lambda: self.worker_finished(index))
-                self.workers[index] = worker
-                worker.start()
+                camera = self.page * self.tiles_per_page() + index
+                while len(self.rtsp_urls) <= camera:
+                    self.rtsp_urls.append('')
+                self.rtsp_urls[camera] = url
+                self.switch_stream(index, self.tile_url(index, self.compute_cell_size()[0]))
                 self.save_config()
         except Exception as e:
-            print(f"Error in change_stream_url: {str(e)}")
+            metrics.event(f"Error in change_stream_url: {str(e)}", level="error")
     
-    def stop_existing_players(self):
+    def switch_stream(self, index, url, priority=-1):
+        """Replace whatever tile index is playing or bringing up with url."""
+        if self.workers[index]:
+            self.workers[index].cancel()
+        self.reconnect_tokens[index] = None
+        self.release_player(index)
+        self.submit_worker(index, url, priority)
+
+    def release_player(self, index):
+        self.cancel_playback_open(index)
+        if self.players[index]:
+            self.playback_players.discard(self.players[index])
+            try:
+                self.health_monitor.unregister(self.players[index])
+                self.player_keys.pop(self.players[index], None)
+                self.play_started.pop(self.players[index], None)
+                self.lifecycle.release(self.players[index])
+            except Exception as e:
+                metrics.event(f"Error stopping player {index}: {str(e)}", level="error")
+        self.players[index] = None
+        self.stream_status[index] = False
+        self.suspended[index] = False
+        if index < len(self.labels):
+            self.labels[index].set_renderer(None)
+
+    def cancel_playback_open(self, index):
+        opening = self.playback_opening.pop(index, None)
+        if opening:
+            # The recording is still being opened: release its player as soon as it exists
+            opening[0].add_done_callback(self.release_opened)
+
+    def release_opened(self, handle):
+        player = None if handle.exception() else handle.result()
+        if player:
+            self.lifecycle.release(player)
+
+    def retire_labels(self, labels, handle):
+        """Hide labels now and delete them once the players drawing into them are released."""
+        for label in labels:
+            label.hide()
+        if handle is None or handle.done():
+            for label in labels:
+                label.deleteLater()
+        else:
+            self.retired_labels.setdefault(handle, []).extend(labels)
+
+    def lifecycle_completed(self, handle):
+        self.snapshots_pending.pop(handle, None)
+        for label in self.retired_labels.pop(handle, []):
+            label.deleteLater()
+        started = self.plays_pending.pop(handle, None)
+        if started and handle.result():
+            self.play_failed(*started)
+        for index, opening in list(self.playback_opening.items()):
+            if opening[0] is handle:
+                del self.playback_opening[index]
+                self.start_playback(index, handle.result(), opening[1])
+
+    def start_play(self, index, player):
+        """play() player for tile index on the lifecycle service; a failed start lands in play_failed()."""
+        self.plays_pending[self.lifecycle.play(player)] = (index, player)
+
+    def play_failed(self, index, player):
+        if index >= len(self.players) or self.players[index] is not player:
+            # Released meanwhile, or a pre-warmed player: the health monitor reports it once it is on the grid
+            metrics.event(f"Error starting player {index}", level="error")
+        elif player in self.playback_players:
+            metrics.event(f"Error starting playback on tile {index}", level="error")
+            self.release_player(index)
+        else:
+            self.on_stream_failed(index, player, "play failed")
+
+    def adopt_pooled_player(self, index, url, cell_width):
+        """Move a warm player for url, opened with the limits of a cell_width tile, and its label into tile index."""
+        key = self.tile_pool_key(index, url, cell_width)
+        entry = self.player_pool.take(key)
+        if not entry:
+            return False
+        label = entry["widget"]
+        label.camera_id = index
+        label.is_fullscreen = False
+        self.labels.append(label)
+        self.players[index] = entry["player"]
+        self.player_keys[entry["player"]] = key
+        self.stream_status[index] = True
+        self.active_urls[index] = url
+        if entry["paused"]:
+            # update_tile_visibility resumes it once the label is back on the grid
+            self.suspended[index] = True
+        else:
+            self.health_monitor.register(index, entry["player"], self.camera_label(index))
+        metrics.inc("warm_adoptions_total", camera=self.camera_label(index))
+        metrics.event(f"Reusing warm player for tile {index}", level="debug")
+        return True
+
+    def settle_player_pool(self):
+        """Pause whatever was parked and not adopted; it is released if nothing claims it in time."""
+        settling = [entry for entry in self.player_pool.idle() if not entry["paused"]]
+        for entry in settling:
+            entry["widget"].hide()
+            entry["paused"] = True
+        self.lifecycle.pause_many([entry["player"] for entry in settling])
+        if len(self.player_pool) and not self.pool_timer.isActive():
+            self.pool_timer.start(1000)
+
+    def start_decoder_host(self):
+        """Decode every camera in its own child process; the players stay drop-in for the rest of the viewer."""
+        from decoder_process import DecoderProcessHost
+        settings = self.decoder_processes
+        self.decoder_host = DecoderProcessHost(self.vlc_args, shared_frames=self.render_mode == "composited",
+                                               max_frame=settings["max_frame"],
+                                               heartbeat_timeout=settings["heartbeat_timeout"],
+                                               max_restarts=settings["max_restarts"],
+                                               restart_window=settings["restart_window"])
+        output = "shared memory" if self.decoder_host.shared_frames else "embedded windows"
+        metrics.event(f"Decoding in child processes, frames via {output}")
+
+    def recorded_cameras(self):
+        cameras = self.recording.get("cameras") or []
+        return list(self.rtsp_urls) if cameras == "all" else list(cameras)
+
+    def start_recording(self):
+        """Record the configured cameras to segment files; each runs its own stream-copy player on our libVLC."""
+        if not self.recorded_cameras():
+            index_path = os.path.join(self.recording["directory"], INDEX_FILE)
+            if os.path.exists(index_path):
+                # Recorded by `python recorder.py`: still available for playback
+                self.segment_index = SegmentIndex(index_path)
+            return
+        from recorder import Recorder
+        self.recorder = Recorder(directory=self.recording["directory"],
+                                 segment_seconds=self.recording["segment_seconds"],
+                                 pre_event_seconds=self.recording["pre_event_seconds"],
+                                 vlc_instance=self.vlc_instance)
+        self.segment_index = self.recorder.index
+        self.sync_recording()
+
+    def sync_recording(self):
+        """Start and stop recordings to match the configured cameras, off the GUI thread."""
+        threading.Thread(target=self.apply_recorded_cameras, args=(self.recorded_cameras(),),
+                         name="recording-sync", daemon=True).start()
+
+    def apply_recorded_cameras(self, wanted):
+        # Runs on the recording-sync thread: opening RTSP sessions can take seconds
+        try:
+            wanted_keys = {normalize_url(url) for url in wanted}
+            for url in self.recorder.cameras():
+                if normalize_url(url) not in wanted_keys:
+                    self.recorder.stop(url)
+            for url in wanted:
+                # Same transport and caching as the camera's tiles; the recorder drops the decode options
+                self.recorder.start(url, build_media_options(self.tuning_for_url(url), self.hw_decode))
+        except Exception as e:
+            metrics.event(f"Error updating recordings: {str(e)}", level="error")
+
+    def start_activity(self):
+        if not self.activity.get("enabled"):
+            return
+        try:
+            from activity_monitor import ActivityMonitor
+        except ImportError as e:
+            metrics.event(f"Activity analysis needs NumPy: {str(e)}", level="warning")
+            return
+        settings = self.activity
+        self.activity_monitor = ActivityMonitor(rate=settings["rate"], threshold=settings["threshold"],
+                                                start_score=settings["start_score"],
+                                                stop_score=settings["stop_score"], hold=settings["hold"])
+        self.activity_timer.start(int(1000 / settings["rate"]))
+
+    def sample_activity(self):
+        """Hand each visible tile's newest frame to the activity pool; nothing is decoded or compared here."""
+        try:
+            for i in self.visible_tiles():
+                player = self.players[i] if i < len(self.players) else None
+                if not player or not self.stream_status[i] or self.suspended[i] or player in self.playback_players:
+                    continue
+                camera = self.camera_label(i)
+                if not self.activity_monitor.due(camera):
+                    continue
+                renderer = getattr(player, "video_renderer", None)
+                if renderer:
+                    self.activity_monitor.submit(camera, lambda r=renderer: self.rendered_frame(r))
+                else:
+                    # Window mode has no frame callbacks; the periodic snapshots are analysed instead
+                    self.activity_monitor.submit(camera, lambda url=self.camera_url(i): self.frame_cache.latest(url))
+            if self.activity.get("auto_promote"):
+                self.promote_active_tile()
+        except Exception as e:
+            metrics.event(f"Error in sample_activity: {str(e)}", level="error")
+
+    @staticmethod
+    def rendered_frame(renderer):
+        frame = renderer.copy_frame()
+        if frame is None:
+            return None
+        data, width, height, pitch = frame
+        return {"data": data, "width": width, "height": height, "pitch": pitch, "format": "RV32", "seq": None}
+
+    def promote_active_tile(self):
+        """Show the most active camera fullscreen while its activity lasts, then go back to the grid."""
+        scores = self.activity_monitor.scores()
+        if self.promoted is not None:
+            camera = self.camera_label(self.promoted) if self.promoted < len(self.labels) else None
+            if not scores.get(camera, {}).get("active"):
+                self.set_tile_fullscreen(self.promoted, False)
+                self.promoted = None
+            return
+        if any(label and label.is_fullscreen for label in self.labels):
+            return
+        candidates = [(scores[camera]["score"], i) for i in self.visible_tiles()
+                      for camera in [self.camera_label(i)] if scores.get(camera, {}).get("active")]
+        if candidates:
+            _, index = max(candidates)
+            self.set_tile_fullscreen(index, True)
+            self.promoted = index
+            metrics.event(f"Promoted stream {index} for activity", camera=self.camera_label(index))
+
+    def set_tile_fullscreen(self, index, fullscreen):
+        self.promoting = True
+        try:
+            self.labels[index].set_fullscreen(fullscreen)
+        finally:
+            self.promoting = False
+
+    def start_snapshots(self):
+        """Start refreshing the frame cache and, if a port is configured, the local snapshot/MJPEG server."""
+        if self.snapshot_interval > 0:
+            self.snapshot_timer.start(int(self.snapshot_interval * 1000))
+        # Playback streams recordings through the server, so with an index it runs on a free port
+        if self.snapshot_port or self.segment_index:
+            try:
+                from frame_server import FrameServer
+                self.frame_server = FrameServer(self.frame_cache, lambda: list(self.rtsp_urls),
+                                                port=self.snapshot_port, metrics=metrics, recorder=self.recorder,
+                                                segment_index=self.segment_index,
+                                                activity=self.activity_monitor)
+                self.frame_server.start()
+            except OSError as e:
+                metrics.event(f"Error starting frame server on port {self.snapshot_port}: {str(e)}", level="error")
+
+    def grab_snapshots(self):
+        """Refresh the cached frame of every tile on screen; hidden or paused tiles keep their last one."""
         try:
+            for i in self.visible_tiles():
+                player = self.players[i] if i < len(self.players) else None
+                if not player or not self.stream_status[i] or self.suspended[i] \
+                        or player in self.snapshots_pending.values() or player in self.playback_players:
+                    continue
+                renderer = getattr(player, "video_renderer", None)
+                if renderer:
+                    # Composited tiles already have the frame in memory: copy it, encode on request
+                    frame = renderer.copy_frame()
+                    if frame:
+                        data, width, height, pitch = frame
+                        self.frame_cache.push(self.camera_url(i), data, width, height, "RV32", pitch)
+                    continue
+                handle = self.lifecycle.snapshot(player, self.snapshot_width)
+                if not handle.done():
+                    self.snapshots_pending[handle] = player
+                handle.add_done_callback(lambda h, url=self.camera_url(i): self.store_snapshot(url, h))
+        except Exception as e:
+            metrics.event(f"Error in grab_snapshots: {str(e)}", level="error")
+
+    def store_snapshot(self, url, handle):
+        # Runs on the lifecycle thread that took the snapshot; the frame cache has its own lock
+        if handle.exception() is None and handle.result():
+            self.frame_cache.push(url, handle.result())
+
+    def camera_snapshot(self, camera):
+        """Latest JPEG of camera (position in the camera list) and its age in seconds, or None."""
+        if not 0 <= camera < len(self.rtsp_urls):
+            return None
+        result = self.frame_cache.jpeg(self.rtsp_urls[camera])
+        if result is None:
+            return None
+        _, timestamp, jpeg = result
+        return jpeg, time.time() - timestamp
+
+    def publish_metrics(self):
+        """Refresh the wall-wide gauges and publish a new metrics snapshot."""
+        try:
+            metrics.set("cameras", len(self.rtsp_urls))
+            metrics.set("tiles_playing", sum(1 for i, player in enumerate(self.players)
+                                             if player and self.stream_status[i] and not self.suspended[i]))
+            metrics.set("tiles_suspended", sum(1 for suspended in self.suspended if suspended))
+            metrics.set("warm_players_idle", len(self.player_pool))
+            metrics.set("lifecycle_pending", self.lifecycle.pending())
+            metrics.set("bringups_in_flight", sum(1 for worker in self.workers if worker))
+            metrics.publish()
+        except Exception as e:
+            metrics.event(f"Error in publish_metrics: {str(e)}", level="error")
+
+    def expire_player_pool(self):
+        self.release_pooled(self.player_pool.expire())
+        if not len(self.player_pool):
+            self.pool_timer.stop()
+
+    def release_pooled(self, entries):
+        if entries:
+            handle = self.lifecycle.release_many([entry["player"] for entry in entries])
+            self.retire_labels([entry["widget"] for entry in entries], handle)
+
+    def profile_url(self, main_url, profile):
+        """URL for the requested profile of a camera, falling back to higher-resolution profiles."""
+        if not main_url:
+            return ''
+        profiles = self.stream_profiles.get(main_url, {})
+        for name in STREAM_PROFILES[STREAM_PROFILES.index(profile):]:
+            if name == "main":
+                return main_url
+            if profiles.get(name):
+                return profiles[name]
+        return main_url
+
+    def select_profile(self, cell_width, fullscreen=False, max_profile="main"):
+        if fullscreen or cell_width >= self.profile_thresholds["main"]:
+            profile = "main"
+        elif cell_width >= self.profile_thresholds["sub"]:
+            profile = "sub"
+        else:
+            profile = "mobile"
+        return STREAM_PROFILES[min(STREAM_PROFILES.index(profile), STREAM_PROFILES.index(max_profile))]
+
+    def stream_url_for(self, main_url, cell_width, fullscreen=False):
+        """URL a camera should play given its cell width, fullscreen state, tuning profile and limits."""
+        max_profile = TUNING_PROFILES[self.tuning_for_url(main_url)]["max_stream_profile"]
+        max_width = self.limits_for_url(main_url, cell_width, fullscreen)["max_width"]
+        if max_width:
+            # A per-camera resolution cap holds even for a fullscreen tile
+            return self.profile_url(main_url, self.select_profile(min(cell_width, max_width), False, max_profile))
+        return self.profile_url(main_url, self.select_profile(cell_width, fullscreen, max_profile))
+
+    def limits_for_url(self, main_url, cell_width, fullscreen=False):
+        return tile_limits(cell_width, fullscreen, self.camera_limits.get(main_url))
+
+    def decode_options_for(self, main_url, cell_width, fullscreen=False):
+        return limit_media_options(self.limits_for_url(main_url, cell_width, fullscreen))
+
+    def tile_pool_key(self, index, url, cell_width):
+        """Pool key of the player tile index should have for url at cell_width."""
+        fullscreen = index < len(self.labels) and self.labels[index] is not None and self.labels[index].is_fullscreen
+        main_url = self.camera_url(index)
+        return pool_key(url, build_media_options(self.tuning_for_url(main_url), self.hw_decode),
+                        self.decode_options_for(main_url, cell_width, fullscreen))
+
+    def decode_limits_changed(self, index, url, cell_width):
+        """True if tile index is playing or bringing up url with the decode limits of another cell size.
+
+        In composited mode that includes a player whose output size no longer fits its tile:
+        libVLC only takes a new size when the stream is opened again.
+        """
+        wanted = self.tile_pool_key(index, url, cell_width)
+        worker = self.workers[index]
+        if worker:
+            return pool_key(worker.url, worker.media_options, worker.decode_options) != wanted
+        key = self.player_keys.get(self.players[index]) if self.players[index] else None
+        if key is None:
+            # Playback players have no key and are left alone
+            return False
+        renderer = self.labels[index].renderer
+        return key != wanted or bool(renderer and renderer.needs_reconfigure())
+
+    def apply_render_limits(self, index):
+        """Composited mode: cap the tile's renderer to its size and frame-rate limit without reopening the stream."""
+        label = self.labels[index]
+        if not label.renderer:
+            return
+        limits = self.limits_for_url(self.camera_url(index), label.width(), label.is_fullscreen)
+        width = min(label.width(), limits["max_width"]) if limits["max_width"] else label.width()
+        label.renderer.set_max_size(width, label.height() * width // max(1, label.width()))
+        label.renderer.max_fps = min([fps for fps in (self.render_fps, limits["max_fps"]) if fps], default=0)
+
+    def tile_url(self, index, cell_width):
+        fullscreen = index < len(self.labels) and self.labels[index].is_fullscreen
+        return self.stream_url_for(self.camera_url(index), cell_width, fullscreen)
+
+    def tuning_for_url(self, main_url):
+        return resolve_profile_name(self.camera_tuning.get(main_url, self.tuning_profile))
+
+    def tuning_for(self, index):
+        return self.tuning_for_url(self.camera_url(index))
+
+    def set_tuning_profile(self, index, name):
+        try:
+            main_url = self.camera_url(index)
+            if not main_url:
+                return
+            if name == self.tuning_profile:
+                self.camera_tuning.pop(main_url, None)
+            else:
+                self.camera_tuning[main_url] = name
+            if not self.updating:
+                # Media options are fixed once a player is created, so re-open with the new profile
+                self.switch_stream(index, self.tile_url(index, self.compute_cell_size()[0]))
+            self.save_config()
+        except Exception as e:
+            metrics.event(f"Error in set_tuning_profile: {str(e)}", level="error")
+
+    def apply_stream_profiles(self, cell_width):
+        """Switch each tile to the profile that matches its displayed size."""
+        for i, label in enumerate(self.labels):
+            if not self.camera_url(i):
+                continue
+            url = self.tile_url(i, cell_width)
+            if url != self.active_urls[i]:
+                metrics.event(f"Switching stream {i} to {url}", level="debug")
+                self.switch_stream(i, url)
+            elif self.decode_limits_changed(i, url, cell_width):
+                # The limits are media options and the output size is set up by libVLC, both fixed at open
+                metrics.event(f"Reopening stream {i} with the decode limits of its new size", level="debug")
+                self.switch_stream(i, url)
+
+    def set_profile_url(self, index, profile, url):
+        try:
+            main_url = self.camera_url(index)
+            if not main_url:
+                QMessageBox.information(self, "Info", "Set the main RTSP URL for this tile first.")
+                return
+            profiles = self.stream_profiles.setdefault(main_url, {})
+            if url:
+                profiles[profile] = url
+            else:
+                profiles.pop(profile, None)
+            if not profiles:
+                del self.stream_profiles[main_url]
+            if not self.updating:
+                self.apply_stream_profiles(self.compute_cell_size()[0])
+            self.save_config()
+        except Exception as e:
+            metrics.event(f"Error in set_profile_url: {str(e)}", level="error")
+
+    def tile_fullscreen_changed(self, index, fullscreen):
+        if not self.promoting:
+            self.promoted = None
+        # Fullscreen always promotes to the main stream; shrinking back re-derives from the cell size
+        if not self.updating and index < len(self.labels):
+            # Render limits first: the new size decides whether the stream has to be reopened
+            self.apply_render_limits(index)
+            self.apply_stream_profiles(self.compute_cell_size()[0])
+        self.update_tile_visibility()
+
+    def visible_tiles(self):
+        """Indices of tiles the operator can currently see."""
+        fullscreen = [i for i, label in enumerate(self.labels) if label.is_fullscreen]
+        if fullscreen:
+            return set(fullscreen[-1:])
+        return set(range(min(len(self.labels), self.tiles_per_page())))
+
+    def update_tile_visibility(self):
+        """Suspend decode on tiles that are off-grid or covered and resume the ones that came back."""
+        try:
+            visible = self.visible_tiles()
+            if self.timeline:
+                self.timeline.set_visible(visible)
+            for i, player in enumerate(self.players):
+                if not player or not self.stream_status[i] or (self.timeline and i in self.timeline.tiles):
+                    continue
+                if i in visible and self.suspended[i]:
+                    self.resume_tile(i)
+                elif i not in visible and not self.suspended[i]:
+                    self.suspend_tile(i)
+        except Exception as e:
+            metrics.event(f"Error in update_tile_visibility: {str(e)}", level="error")
+
+    def suspend_tile(self, index):
+        player = self.players[index]
+        self.health_monitor.unregister(player)
+        if self.hidden_tile_policy == "stop":
+            # Drops the RTSP session; the validated media stays attached so resuming skips the probe
+            self.lifecycle.stop(player)
+        else:
+            # RTSP PAUSE keeps the session open so resume only waits for the next keyframe
+            self.lifecycle.pause(player)
+        self.suspended[index] = True
+        metrics.transition(self.camera_label(index), "suspended", policy=self.hidden_tile_policy)
+        metrics.event(f"Suspended stream {index} ({self.hidden_tile_policy})", camera=self.camera_label(index),
+                      level="debug")
+
+    def in_playback(self, index):
+        return index < len(self.players) and self.players[index] in self.playback_players
+
+    def play_recording(self, index, when_text):
+        """Jump tile index to a recorded moment of its camera, streamed by the frame server from the index."""
+        try:
+            if not self.frame_server:
+                metrics.event("Playback needs the frame server, which is not running", level="warning")
+                return
+            when = parse_when(when_text)
+            url = self.camera_url(index)
+            # One indexed lookup; the stream starts on the keyframe it returns, nothing is scanned
+            start = self.segment_index.seek(url, when)
+            if start is None:
+                self.labels[index].setText(f"No recording of stream {index + 1} at {when_text}")
+                return
+            if self.workers[index]:
+                self.workers[index].cancel()
+                self.workers[index] = None
+            self.reconnect_tokens[index] = None
+            self.release_player(index)
+            host, port = self.frame_server.address
+            query = urllib.parse.urlencode({"url": url, "start": start["time"]})
+            handle = self.lifecycle.open(self.decoder_host or self.vlc_instance,
+                                         f"http://{host}:{port}/recording?{query}", ["network-caching=300"])
+            # Picked up by lifecycle_completed unless the tile is given something else first
+            self.playback_opening[index] = (handle, start["time"])
+            self.labels[index].setText(f"Opening recording of stream {index + 1}...")
+        except ValueError as e:
+            metrics.event(f"Invalid playback time {when_text!r}: {str(e)}", level="warning")
+        except Exception as e:
+            metrics.event(f"Error in play_recording: {str(e)}", level="error")
+
+    def start_playback(self, index, player, start_time):
+        """Show and start the recording player the lifecycle service opened for tile index."""
+        try:
+            if player is None:
+                self.labels[index].setText(f"Could not open the recording of stream {index + 1}")
+                return
+            self.attach_video(player, self.labels[index])
+            self.players[index] = player
+            self.stream_status[index] = True
+            self.playback_players.add(player)
+            self.start_play(index, player)
+            metrics.transition(self.camera_label(index), "playback", at=start_time)
+            metrics.event(f"Stream {index} playing recording from "
+                          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))}",
+                          camera=self.camera_label(index))
+        except Exception as e:
+            metrics.event(f"Error in start_playback: {str(e)}", level="error")
+
+    def back_to_live(self, index):
+        self.switch_stream(index, self.active_urls[index] or self.camera_url(index))
+
+    def build_timeline_bar(self):
+        from playback_timeline import PLAYBACK_RATES
+        self.timeline_bar = QWidget()
+        layout = QHBoxLayout(self.timeline_bar)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        buttons = [("-10s", lambda: self.timeline.skip(-10)), ("<|", lambda: self.timeline.step(-1)),
+                   ("Pause", self.toggle_timeline), ("|>", lambda: self.timeline.step(1)),
+                   ("+10s", lambda: self.timeline.skip(10))]
+        for text, slot in buttons:
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            layout.addWidget(button)
+            if text == "Pause":
+                self.timeline_play_button = button
+        self.timeline_rate_combo = QComboBox()
+        self.timeline_rate_combo.addItems([f"{rate:g}x" for rate in PLAYBACK_RATES])
+        self.timeline_rate_combo.setCurrentText("1x")
+        self.timeline_rate_combo.currentIndexChanged.connect(
+            lambda i: self.timeline and self.timeline.set_rate(PLAYBACK_RATES[i]))
+        layout.addWidget(self.timeline_rate_combo)
+        # One hour around the chosen moment; dragging seeks at most every 120 ms so scrubbing stays fluid
+        self.timeline_slider = QSlider(Qt.Horizontal)
+        self.timeline_slider.setRange(0, 3600)
+        self.timeline_slider.sliderMoved.connect(lambda value: self.timeline_seek_timer.start(120))
+        self.timeline_slider.sliderReleased.connect(self.seek_timeline_to_slider)
+        layout.addWidget(self.timeline_slider, 1)
+        self.timeline_label = QLabel("")
+        self.timeline_label.setStyleSheet("color: white;")
+        layout.addWidget(self.timeline_label)
+        live_button = QPushButton("Live")
+        live_button.clicked.connect(lambda: self.show_page(self.page))
+        layout.addWidget(live_button)
+        self.timeline_layout.addWidget(self.timeline_bar)
+
+    def open_timeline(self):
+        when, ok = QInputDialog.getText(self, "Playback Timeline",
+                                        "Start time (HH:MM[:SS], YYYY-MM-DD HH:MM:SS or -5m):", QLineEdit.Normal, "-5m")
+        if ok and when.strip():
+            self.start_timeline(when.strip())
+
+    def start_timeline(self, when_text):
+        """Play the recordings of every camera on the page against one clock, starting at when_text."""
+        try:
+            from playback_timeline import PlaybackTimeline
+            when = parse_when(when_text)
+            if self.timeline:
+                self.stop_timeline()
+            self.tour_check.setChecked(False)
+            self.discard_prewarm()
+            self.stop_existing_players()
+            # Plays local segment files, which decoder processes cannot open seekably, so always in-process
+            self.timeline = PlaybackTimeline(self.vlc_instance, self.segment_index, when,
+                                             on_status=self.timeline_status)
+            for i in range(min(len(self.labels), self.tiles_per_page())):
+                url = self.camera_url(i)
+                if not url:
+                    continue
+                player = self.timeline.add(i, url)
+                self.attach_video(player, self.labels[i])
+                self.players[i] = player
+                self.stream_status[i] = True
+                self.playback_players.add(player)
+                metrics.transition(self.camera_label(i), "timeline")
+            self.timeline.set_visible(self.visible_tiles())
+            self.timeline.play()
+            if self.timeline_bar is None:
+                self.build_timeline_bar()
+            self.timeline_origin = when - 1800
+            self.timeline_play_button.setText("Pause")
+            self.timeline_rate_combo.setCurrentText("1x")
+            self.timeline_bar.setVisible(True)
+            self.timeline_timer.start(200)
+            self.tick_timeline()
+            metrics.event(f"Timeline playback of page {self.page + 1} from "
+                          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(when))}")
+        except ValueError as e:
+            metrics.event(f"Invalid timeline time {when_text!r}: {str(e)}", level="warning")
+        except Exception as e:
+            metrics.event(f"Error in start_timeline: {str(e)}", level="error")
+
+    def stop_timeline(self):
+        """Leave timeline mode; the tiles' players are released by whoever brings the page back up."""
+        self.timeline_timer.stop()
+        self.timeline_seek_timer.stop()
+        self.timeline.close()
+        self.timeline = None
+        if self.timeline_bar:
+            self.timeline_bar.setVisible(False)
+
+    def toggle_timeline(self):
+        self.timeline.toggle()
+        self.timeline_play_button.setText("Play" if self.timeline.clock.paused else "Pause")
+
+    def seek_timeline_to_slider(self):
+        if self.timeline:
+            self.timeline.seek(self.timeline_origin + self.timeline_slider.value())
+
+    def timeline_status(self, index, text):
+        if index < len(self.labels) and self.labels[index]:
+            self.labels[index].setText(text)
+
+    def tick_timeline(self):
+        try:
+            self.timeline.tick()
+            position = self.timeline.position()
+            self.timeline_label.setText(time.strftime(" %Y-%m-%d %H:%M:%S ", time.localtime(position)))
+            if not self.timeline_slider.isSliderDown():
+                offset = position - self.timeline_origin
+                if not 0 <= offset <= 3600:
+                    # Played or skipped off the slider: centre it on the current position again
+                    self.timeline_origin = position - 1800
+                    offset = 1800
+                self.timeline_slider.setValue(int(offset))
+        except Exception as e:
+            metrics.event(f"Error in tick_timeline: {str(e)}", level="error")
+
+    def attach_video(self, player, label):
+        """Send player's pictures to label: its native window, or its painter in composited mode."""
+        from video_renderer import VideoCallbackRenderer, attach_window
+        if self.render_mode == "composited":
+            renderer = getattr(player, "video_renderer", None)
+            if renderer is None:
+                renderer = VideoCallbackRenderer(max_size=(label.width(), label.height()), max_fps=self.render_fps)
+                renderer.attach(player)
+            label.set_renderer(renderer)
+            if label in self.labels:
+                self.apply_render_limits(self.labels.index(label))
+        else:
+            attach_window(player, label)
+
+    def repaint_tiles(self):
+        """Composited mode: one update per tile that has a new frame, coalesced by Qt into a single repaint."""
+        for label in self.labels:
+            if label.renderer and label.renderer.take_dirty():
+                label.update()
+
+    def resume_tile(self, index):
+        player = self.players[index]
+        self.suspended[index] = False
+        self.attach_video(player, self.labels[index])
+        if player.get_state() == vlc.State.Paused:
+            self.lifecycle.pause(player, False)
+        else:
+            # Camera did not honour PAUSE or the session was dropped: reopen it behind any pending
+            # stop. A failed reopen shows up as "no video" in the health monitor and is reconnected.
+            self.lifecycle.play(player)
+        if player in self.playback_players:
+            metrics.transition(self.camera_label(index), "playback")
+            return
+        self.health_monitor.register(index, player, self.camera_label(index))
+        metrics.transition(self.camera_label(index), "playing")
+        metrics.event(f"Resumed stream {index}", camera=self.camera_label(index), level="debug")
+
+    def create_worker(self, index, url, main_url, fullscreen=False):
+        media_options = build_media_options(self.tuning_for_url(main_url), self.hw_decode)
+        decode_options = self.decode_options_for(main_url, self.compute_cell_size()[0], fullscreen)
+        instance = self.decoder_host or self.vlc_instance
+        worker = StreamUpdateWorker(url, index, instance, probe_cache=self.probe_cache,
+                                    media_options=media_options, decode_options=decode_options,
+                                    trust_stale=self.restoring, camera=camera_label(main_url) or None)
+        worker.progress_update.connect(self.update_status)
+        worker.stream_configured.connect(
+            lambda idx, player, status, message, w=worker: self.configure_stream(w, idx, player, status, message))
+        worker.finished.connect(lambda w=worker, idx=index: self.worker_finished(idx, w))
+        return worker
+
+    def submit_worker(self, index, url, priority=0):
+        fullscreen = index < len(self.labels) and self.labels[index].is_fullscreen
+        worker = self.create_worker(index, url, self.camera_url(index), fullscreen)
+        self.workers[index] = worker
+        self.active_urls[index] = url
+        self.bringup_pool.submit(worker, priority)
+        return worker
+
+    def stop_existing_players(self, park=False):
+        """Cancel this page's bring-ups and let go of its players.
+
+        With park=True players that are up are kept in the warm pool together with their label
+        (the label slot becomes None) instead of being released.
+        """
+        try:
+            # Only this page's bring-ups; a pre-warm for the next page keeps going
             for worker in self.workers:
-                if worker and worker.isRunning():
-                    worker.terminate()
-                    worker.wait(3000)
+                if worker:
+                    worker.cancel()
             
-            for player in self.players:
-                if player:
-                    try:
-                        state = player.get_state()
-                        if state not in (vlc.State.Stopped, vlc.State.Ended):
-                            player.stop()
-                        player.release()
-                    except Exception as e:
-                        print(f"Error stopping/releasing player: {str(e)}")
+            for index in list(self.playback_opening):
+                self.cancel_playback_open(index)
+            players = []
+            evicted = []
+            for i, player in enumerate(self.players):
+                if not player:
+                    continue
+                self.health_monitor.unregister(player)
+                self.playback_players.discard(player)
+                key = self.player_keys.pop(player, None)
+                self.play_started.pop(player, None)
+                if park and key and self.stream_status[i] and i < len(self.labels):
+                    self.grid_layout.removeWidget(self.labels[i])
+                    evicted.extend(self.player_pool.park(key, player, self.labels[i], paused=self.suspended[i]))
+                    self.labels[i] = None
+                else:
+                    players.append(player)
+            # One batch for the whole page; the GUI moves on while the sessions are torn down
+            released = self.lifecycle.release_many(players)
+            self.release_pooled(evicted)
             self.players = [None] * len(self.labels)
             self.stream_status = [False] * len(self.labels)
             self.workers = [None] * len(self.labels)
+            self.active_urls = [''] * len(self.labels)
+            self.suspended = [False] * len(self.labels)
+            self.reconnect_tokens = [None] * len(self.labels)
+            return released
         except Exception as e:
-            print(f"Error in stop_existing_players: {str(e)}")
+            metrics.event(f"Error in stop_existing_players: {str(e)}", level="error")
     
-    def configure_stream(self, index, player, status, message):
+    def configure_stream(self, worker, index, player, status, message):
         try:
+            staged = self.prewarm
+            if staged and index < len(staged["workers"]) and staged["workers"][index] is worker:
+                self.configure_prewarm_stream(worker, index, player, status, message)
+                return
+            if worker.is_cancelled() or index >= len(self.workers) or self.workers[index] is not worker:
+                # Result from a bring-up that was superseded while the signal was queued
+                if player:
+                    self.lifecycle.release(player)
+                return
             if index < len(self.labels):
                 self.labels[index].setText(message)
                 
+                if status and player and index not in self.visible_tiles():
+                    # Hidden tile: keep the validated player ready but do not start decoding
+                    self.player_keys[player] = pool_key(worker.url, worker.media_options, worker.decode_options)
+                    self.players[index] = player
+                    self.stream_status[index] = True
+                    self.suspended[index] = True
+                    self.labels[index].setText(f"Stream {index + 1} suspended")
+                    return
+
                 if status and player:
-                    for attempt in range(3):
-                        try:
-                            player.set_hwnd(self.labels[index].winId())
-                            if player.play() == -1:
-                                raise Exception("Failed to start player")
-                            print(f"Started player {index} (attempt {attempt + 1})")
-                            break
-                        except Exception as e:
-                            print(f"Error starting player {index} (attempt {attempt + 1}): {str(e)}")
-                            if attempt == 2:
-                                self.labels[index].setText(f"Stream Error: {str(e)}")
-                                status = False
-                            time.sleep(3.0)
+                    self.attach_video(player, self.labels[index])
+                    # A failed start is reported back through play_failed() once play() has returned
+                    self.start_play(index, player)
+                    camera = self.camera_label(index)
+                    self.health_monitor.register(index, player, camera)
+                    self.player_keys[player] = pool_key(worker.url, worker.media_options, worker.decode_options)
+                    self.play_started[player] = time.monotonic()
+                    metrics.inc("streams_started_total", camera=camera)
+                    metrics.observe("bringup_seconds", time.monotonic() - worker.started_at, camera=camera)
+                    metrics.transition(camera, "starting")
+                    metrics.event(f"Started player {index}", camera=camera)
+                    self.startup_profile.mark("first tile playing")
                 
                 self.players[index] = player
                 self.stream_status[index] = status
+                if not status and self.active_urls[index]:
+                    metrics.inc("bringup_failures_total", camera=self.camera_label(index))
+                    metrics.transition(self.camera_label(index), "unavailable", reason=message)
+                    # Retried from the event loop with backoff, never by sleeping here
+                    self.schedule_reconnect(index, message)
         except Exception as e:
-            print(f"Error in configure_stream: {str(e)}")
+            metrics.event(f"Error in configure_stream: {str(e)}", level="error")
     
-    def worker_finished(self, index):
+    def configure_prewarm_stream(self, worker, index, player, status, message):
+        staged = self.prewarm
+        if worker.is_cancelled():
+            if player:
+                self.lifecycle.release(player)
+            return
+        label = staged["labels"][index]
+        label.setText(message)
+        if status and player:
+            # Decoding into the hidden label means the page is live the moment it is shown
+            self.attach_video(player, label)
+            self.start_play(index, player)
+            # Failures are only acted on once the page is shown and the player is in self.players
+            self.health_monitor.register(index, player, worker.camera)
+            metrics.inc("streams_started_total", camera=worker.camera)
+            self.player_keys[player] = pool_key(worker.url, worker.media_options, worker.decode_options)
+        staged["players"][index] = player
+        staged["status"][index] = status
+
+    def worker_finished(self, index, worker=None):
         try:
-            if index < len(self.workers):
+            staged = self.prewarm
+            if staged and index < len(staged["workers"]) and staged["workers"][index] is worker:
+                staged["workers"][index] = None
+                return
+            if index < len(self.workers) and (worker is None or self.workers[index] is worker):
                 self.workers[index] = None
-                if all(worker is None or not worker.isRunning() for worker in self.workers):
-                    self.updating = False
-                    self.set_controls_enabled(True)
-                    self.progress_bar.setVisible(False)
-                    self.status_label.setText("Ready")
-                    self.central_widget.setUpdatesEnabled(True)
-        except Exception as e:
-            print(f"Error in worker_finished: {str(e)}")
+                self.check_bringup_done()
+        except Exception as e:
+            metrics.event(f"Error in worker_finished: {str(e)}", level="error")
     
+    def check_bringup_done(self):
+        if self.updating and all(worker is None for worker in self.workers):
+            self.updating = False
+            self.set_controls_enabled(True)
+            self.progress_bar.setVisible(False)
+            self.status_label.setText("Ready")
+            self.central_widget.setUpdatesEnabled(True)
+            self.config_store.defer(self.probe_cache.save)
+        if self.restoring and not self.updating:
+            self.restoring = False
+            self.startup_profile.mark("first page up")
+            self.startup_profile.report()
+
     def set_controls_enabled(self, enabled):
         try:
             self.input_button.setEnabled(enabled)
             self.grid_combo.setEnabled(enabled)
+            self.prev_page_button.setEnabled(enabled)
+            self.next_page_button.setEnabled(enabled)
         except Exception as e:
-            print(f"Error in set_controls_enabled: {str(e)}")
+            metrics.event(f"Error in set_controls_enabled: {str(e)}", level="error")
     
     def update_status(self, message):
         try:
             self.status_label.setText(message)
         except Exception as e:
-            print(f"Error in update_status: {str(e)}")
+            metrics.event(f"Error in update_status: {str(e)}", level="error")
         
+    def compute_cell_size(self):
+        screen = QDesktopWidget().screenGeometry()
+        max_width, max_height = screen.width(), screen.height() - 50
+        window_size = self.central_widget.size()
+        control_height = self.control_layout.sizeHint().height()
+        grid_width = min(window_size.width(), max_width)
+        grid_height = min(window_size.height() - control_height, max_height)
+
+        cell_width = grid_width // self.grid_cols
+        cell_height = grid_height // self.grid_rows
+        aspect_ratio = self.labels[0].aspect_ratio if self.labels else 4 / 3
+        cell_height = min(cell_height, int(cell_width / aspect_ratio))
+        cell_width = int(cell_height * aspect_ratio)
+        return cell_width, cell_height
+
     def update_grid_layout(self):
-        print("Updating grid layout")
+        metrics.event("Updating grid layout", level="debug")
         try:
             if not self.labels:
                 return
@@ -407,28 +2279,26 @@ class RTSPViewer(QMainWindow):
                 if item and item.widget():
                     item.widget().setParent(None)
             
-            screen = QDesktopWidget().screenGeometry()
-            max_width, max_height = screen.width(), screen.height() - 50
-            window_size = self.central_widget.size()
-            control_height = self.control_layout.sizeHint().height()
-            grid_width = min(window_size.width(), max_width)
-            grid_height = min(window_size.height() - control_height, max_height)
-            
-            cell_width = grid_width // self.grid_size
-            cell_height = grid_height // self.grid_size
-            if self.labels:
-                cell_height = min(cell_height, int(cell_width / self.labels[0].aspect_ratio))
-                cell_width = int(cell_height * self.labels[0].aspect_ratio)
+            cell_width, cell_height = self.compute_cell_size()
             
+            tiles_on_grid = self.tiles_per_page()
             for i, label in enumerate(self.labels):
-                row = i // self.grid_size
-                col = i % self.grid_size
+                if i >= tiles_on_grid:
+                    label.hide()
+                    continue
+                row = i // self.grid_cols
+                col = i % self.grid_cols
                 label.setFixedSize(cell_width, cell_height)
+                self.apply_render_limits(i)
                 self.grid_layout.addWidget(label, row, col, 1, 1)
+                label.show()
             
-            print("Grid layout updated")
+            if not self.updating:
+                self.apply_stream_profiles(cell_width)
+            self.update_tile_visibility()
+            metrics.event("Grid layout updated", level="debug")
         except Exception as e:
-            print(f"Error in update_grid_layout: {str(e)}")
+            metrics.event(f"Error in update_grid_layout: {str(e)}", level="error")
         
     def resizeEvent(self, event: QResizeEvent):
         try:
@@ -436,7 +2306,7 @@ class RTSPViewer(QMainWindow):
                 self.resize_timer.start(100)
             super().resizeEvent(event)
         except Exception as e:
-            print(f"Error in resizeEvent: {str(e)}")
+            metrics.event(f"Error in resizeEvent: {str(e)}", level="error")
     
     def deferred_resize(self):
         try:
@@ -449,76 +2319,140 @@ class RTSPViewer(QMainWindow):
                 
                 self.update_grid_layout()
         except Exception as e:
-            print(f"Error in deferred_resize: {str(e)}")
+            metrics.event(f"Error in deferred_resize: {str(e)}", level="error")
     
-    def monitor_streams(self):
+    def on_stream_failed(self, index, player, reason):
         try:
-            if self.updating:
-                QTimer.singleShot(5000, self.monitor_streams)
+            if index >= len(self.players) or self.players[index] is not player or self.suspended[index]:
+                # Player was replaced, released or suspended while the report was queued
                 return
-                
-            for i, player in enumerate(self.players):
-                if player and i < len(self.stream_status) and self.stream_status[i]:
-                    try:
-                        state = player.get_state()
-                        if state in (vlc.State.Error, vlc.State.Ended):
-                            print(f"Stream {i} failed: {state}")
-                            self.stream_status[i] = False
-                            if i < len(self.labels):
-                                self.labels[i].setText("Stream Error - Restarting...")
-                            QTimer.singleShot(1000, lambda idx=i: self.restart_stream(idx))
-                    except Exception as e:
-                        print(f"Error checking stream {i}: {str(e)}")
-                        
-            QTimer.singleShot(5000, self.monitor_streams)
-        except Exception as e:
-            print(f"Error in monitor_streams: {str(e)}")
+            camera = self.camera_label(index)
+            metrics.inc("stream_failures_total", camera=camera, reason=reason)
+            metrics.transition(camera, "failed", reason=reason)
+            metrics.event(f"Stream {index} failed: {reason}", camera=camera, level="warning")
+            self.health_monitor.unregister(player)
+            self.stream_status[index] = False
+            if self.active_urls[index]:
+                self.probe_cache.invalidate(self.active_urls[index])
+            self.schedule_reconnect(index, reason)
+        except Exception as e:
+            metrics.event(f"Error in on_stream_failed: {str(e)}", level="error")
     
-    def restart_stream(self, index):
+    def on_stream_healthy(self, index, player):
+        started = self.play_started.pop(player, None)
+        if index < len(self.players) and self.players[index] is player:
+            self.reconnect_manager.record_success(self.camera_url(index))
+            camera = self.camera_label(index)
+            if started is not None:
+                metrics.observe("time_to_first_frame_seconds", time.monotonic() - started, camera=camera)
+            metrics.transition(camera, "playing")
+
+    def schedule_reconnect(self, index, reason):
+        """Queue a fresh bring-up of tile index after the camera's backoff delay."""
         try:
-            if (index < len(self.players) and index < len(self.rtsp_urls) and 
-                index < len(self.labels) and self.players[index]):
-                player = self.players[index]
-                player.set_hwnd(self.labels[index].winId())
-                if player.play() != -1:
-                    self.stream_status[index] = True
-                    print(f"Restarted stream {index}")
-                else:
-                    self.labels[index].setText(f"Stream {index+1} Failed")
+            main_url = self.camera_url(index)
+            if not main_url:
+                return
+            delay, state, attempt = self.reconnect_manager.next_attempt(main_url)
+            token = object()
+            self.reconnect_tokens[index] = token
+            if state == CLOSED:
+                self.labels[index].setText(f"{reason} - reconnecting in {delay:.0f}s (attempt {attempt})")
+            else:
+                self.labels[index].setText(f"Offline ({reason}) - circuit open, next try in {delay:.0f}s")
+            self.labels[index].setToolTip(f"Reconnect state: {state}, {attempt} consecutive failures")
+            camera = self.camera_label(index)
+            metrics.inc("reconnects_total", camera=camera)
+            metrics.set("reconnect_failures", attempt, camera=camera)
+            metrics.transition(camera, "reconnecting", attempt=attempt, circuit=state)
+            metrics.event(f"Stream {index} reconnect #{attempt} in {delay:.1f}s ({state})", camera=camera)
+            QTimer.singleShot(int(delay * 1000), lambda: self.reconnect_tile(index, token))
         except Exception as e:
-            print(f"Error restarting stream {index}: {str(e)}")
-            if index < len(self.labels):
-                self.labels[index].setText(f"Restart Error: {str(e)}")
-        
+            metrics.event(f"Error in schedule_reconnect: {str(e)}", level="error")
+
+    def reconnect_tile(self, index, token):
+        try:
+            # The token is dropped when the tile is switched, paged away or re-scheduled
+            if index >= len(self.reconnect_tokens) or self.reconnect_tokens[index] is not token:
+                return
+            self.reconnect_tokens[index] = None
+            self.reconnect_manager.attempt_started(self.camera_url(index))
+            url = self.tile_url(index, self.compute_cell_size()[0])
+            # The backoff already spaces attempts out; each one re-validates instead of trusting the cache
+            self.probe_cache.invalidate(url)
+            self.switch_stream(index, url, priority=index)
+        except Exception as e:
+            metrics.event(f"Error in reconnect_tile: {str(e)}", level="error")
+
     def closeEvent(self, event):
         try:
-            for worker in self.workers:
-                if worker and worker.isRunning():
-                    worker.terminate()
-                    worker.wait(3000)
-                
-            for player in self.players:
-                if player:
-                    try:
-                        state = player.get_state()
-                        if state not in (vlc.State.Stopped, vlc.State.Ended):
-                            player.stop()
-                        player.release()
-                    except Exception as e:
-                        print(f"Error releasing player: {str(e)}")
+            # One budget for the whole shutdown: each wait below only gets what the earlier ones left
+            deadline = time.monotonic() + SHUTDOWN_DEADLINE
+            self.stop_services()
+            self.stop_existing_players()
+            self.release_pooled(self.player_pool.drain())
+            self.health_monitor.stop(timeout=max(0.0, min(0.25, deadline - time.monotonic())))
             
-            try:
-                self.vlc_instance.release()
-            except Exception as e:
-                print(f"Error releasing VLC instance: {str(e)}")
+            # The players queued for release above are torn down meanwhile
+            self.release_libvlc(deadline)
             
-            self.save_config()
+            if not self.config_store.close(timeout=max(0.0, deadline - time.monotonic())):
+                metrics.event("Config write did not finish before exit", level="warning")
+            metrics.close()
             event.accept()
         except Exception as e:
-            print(f"Error in closeEvent: {str(e)}")
+            metrics.event(f"Error in closeEvent: {str(e)}", level="error")
+
+    def stop_services(self):
+        """Stop the timers, bring-up and background services ahead of the player teardown."""
+        self.tour_timer.stop()
+        self.prewarm_timer.stop()
+        # Start the final write first so it overlaps with the player teardown
+        self.save_timer.stop()
+        self.write_config()
+        self.discard_prewarm()
+        self.bringup_pool.shutdown()
+        self.pool_timer.stop()
+        self.snapshot_timer.stop()
+        self.render_timer.stop()
+        self.activity_timer.stop()
+        if self.activity_monitor:
+            self.activity_monitor.close()
+        if self.timeline:
+            self.stop_timeline()
+        self.metrics_timer.stop()
+        if self.frame_server:
+            self.frame_server.stop()
+
+    def release_libvlc(self, deadline):
+        """Stop recording, drain the lifecycle service and release libVLC if nothing still uses it by deadline."""
+        recording_stopped = not self.recorder or self.recorder.close(timeout=max(0.0, deadline - time.monotonic()))
+        if not recording_stopped:
+            metrics.event("Recording did not stop before exit; its spool is recovered next start", level="warning")
+        # Bounded wait: a camera stuck in stop() is left to the daemon thread and process exit
+        drained = self.lifecycle.shutdown(deadline=max(0.0, deadline - time.monotonic()))
+        if self.decoder_host:
+            self.decoder_host.release(timeout=max(0.0, deadline - time.monotonic()))
+        # The recorder's players run on the same instance
+        if drained and recording_stopped:
+            try:
+                self.vlc_instance.release()
+            except Exception as e:
+                metrics.event(f"Error releasing VLC instance: {str(e)}", level="error")
+        else:
+            metrics.event(f"Shutdown deadline hit with {self.lifecycle.pending()} player operation(s) pending; "
+                          "leaving them to process exit", level="warning")
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    viewer = RTSPViewer()
+    import argparse
+    parser = argparse.ArgumentParser(description="RTSP video wall")
+    parser.add_argument("--startup-profile", action="store_true", help="print a startup timing breakdown")
+    parser.add_argument("--vlc-verbose", type=int, default=0, help="libVLC log verbosity (0-2)")
+    # Anything else (e.g. -style) is left for Qt
+    args, qt_args = parser.parse_known_args()
+    startup_profile = StartupProfile(enabled=args.startup_profile)
+    startup_profile.mark("imports")
+    app = QApplication(sys.argv[:1] + qt_args)
+    viewer = RTSPViewer(startup_profile=startup_profile, vlc_verbose=args.vlc_verbose)
     viewer.show()
     sys.exit(app.exec_())
\ No newline at end of file
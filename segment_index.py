@@ -0,0 +1,246 @@
+import datetime
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from probe_cache import normalize_url
+from viewer_metrics import camera_label
+
+INDEX_FILE = "index.sqlite"
+
+TS_PACKET_SIZE = 188
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    camera TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    start REAL NOT NULL,
+    end REAL,
+    size INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS segments_by_time ON segments (camera, start);
+CREATE TABLE IF NOT EXISTS keyframes (
+    segment INTEGER NOT NULL,
+    time REAL NOT NULL,
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (segment, time)
+) WITHOUT ROWID;
+"""
+
+
+def camera_key(url):
+    """Index key for a camera: its normalised URL without credentials."""
+    return camera_label(normalize_url(url))
+
+
+def parse_when(text, now=None):
+    """Epoch seconds for a timestamp typed by a user or passed in a query string.
+
+    Accepts epoch seconds, "YYYY-mm-dd HH:MM[:SS]" (or ISO with a T), "HH:MM[:SS]" for today
+    and relative times such as "-90s", "-5m" or "-2h". Raises ValueError otherwise.
+    """
+    text = text.strip()
+    now = time.time() if now is None else now
+    relative = re.fullmatch(r"-(\d+(?:\.\d+)?)([smh]?)", text)
+    if relative:
+        return now - float(relative.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[relative.group(2)]
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            clock = datetime.datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+        return datetime.datetime.combine(datetime.date.fromtimestamp(now), clock).timestamp()
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def psi_packets(head):
+    """PAT and PMT packets from the start of a segment, to put in front of a read that starts mid-file."""
+    packets = []
+    for offset in range(0, len(head) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        packet = head[offset:offset + TS_PACKET_SIZE]
+        if packet[0] != 0x47 or not packet[1] & 0x40:
+            continue
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        payload = 4 + (packet[4] + 1 if packet[3] & 0x20 else 0)
+        # After the pointer field: PAT is PID 0, a PMT is table_id 2 on whatever PID the PAT names
+        table = payload + 1 + packet[payload] if payload < TS_PACKET_SIZE else TS_PACKET_SIZE
+        if pid == 0 or (table < TS_PACKET_SIZE and packet[table] == 0x02):
+            packets.append(packet)
+    return b"".join(packets)
+
+
+class SegmentIndex:
+    """SQLite index of recorded segments: wall-clock time -> segment file -> keyframe byte offset.
+
+    The recorder's writer thread adds rows in one transaction per flush, after the data they
+    point at is on disk; readers (playback, clip requests, other processes) use their own
+    connection per thread and never wait for the writer thanks to WAL mode. Paths are stored
+    relative to the index so a recordings directory can be moved as a whole.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(self.directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._local.db = db
+        return db
+
+    def _relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self.directory)
+
+    def _absolute(self, path):
+        return os.path.join(self.directory, path)
+
+    def record(self, entries):
+        """Apply a batch of ("segment", path, camera, start), ("keyframe", path, time, offset)
+        and ("end", path, end, size) entries in one transaction."""
+        db = self._db()
+        with db:
+            for entry in entries:
+                path = self._relative(entry[1])
+                if entry[0] == "segment":
+                    db.execute("INSERT OR REPLACE INTO segments (camera, path, start) VALUES (?, ?, ?)",
+                               (camera_key(entry[2]), path, entry[3]))
+                elif entry[0] == "keyframe":
+                    db.execute("INSERT OR REPLACE INTO keyframes (segment, time, offset) "
+                               "SELECT id, ?, ? FROM segments WHERE path = ?", (entry[2], entry[3], path))
+                elif entry[0] == "end":
+                    db.execute("UPDATE segments SET end = ?, size = ? WHERE path = ?", (entry[2], entry[3], path))
+
+    def close_dangling(self, url=None, before=None):
+        """End the segments that have no end (of url, or of every camera) and were last written before before.
+
+        A recorder that was killed never records the end of its last segments, and readers would
+        treat them as still growing. They end at their file's last write; rows whose file is gone
+        are dropped. Returns how many rows were fixed.
+        """
+        db = self._db()
+        query = "SELECT id, path, start FROM segments WHERE end IS NULL"
+        params = ()
+        if url is not None:
+            query += " AND camera = ?"
+            params = (camera_key(url),)
+        fixed = 0
+        with db:
+            for segment, path, start in db.execute(query, params).fetchall():
+                try:
+                    info = os.stat(self._absolute(path))
+                except FileNotFoundError:
+                    db.execute("DELETE FROM keyframes WHERE segment = ?", (segment,))
+                    db.execute("DELETE FROM segments WHERE id = ?", (segment,))
+                    fixed += 1
+                    continue
+                if before is None or info.st_mtime < before:
+                    db.execute("UPDATE segments SET end = ?, size = ? WHERE id = ?",
+                               (max(start, info.st_mtime), info.st_size, segment))
+                    fixed += 1
+        return fixed
+
+    def cameras(self):
+        return [row[0] for row in self._db().execute("SELECT DISTINCT camera FROM segments ORDER BY camera")]
+
+    def segments(self, url, start, end):
+        """Segments of url overlapping [start, end] as dicts (path, start, end, size), oldest first."""
+        rows = self._db().execute(
+            "SELECT path, start, end, size FROM segments WHERE camera = ? AND start < ? "
+            "AND (end IS NULL OR end > ?) ORDER BY start", (camera_key(url), end, start))
+        return [{"path": self._absolute(path), "start": seg_start, "end": seg_end, "size": size}
+                for path, seg_start, seg_end, size in rows]
+
+    def segment_at(self, url, when):
+        """The segment of url that covers when as a dict (path, start, end), or None in a gap."""
+        row = self._db().execute("SELECT path, start, end FROM segments WHERE camera = ? AND start <= ? "
+                                 "ORDER BY start DESC LIMIT 1", (camera_key(url), when)).fetchone()
+        if row is None or (row[2] is not None and row[2] <= when):
+            return None
+        return {"path": self._absolute(row[0]), "start": row[1], "end": row[2]}
+
+    def next_segment(self, url, after):
+        """The first segment of url starting after after, or None."""
+        row = self._db().execute("SELECT path, start, end FROM segments WHERE camera = ? AND start > ? "
+                                 "ORDER BY start LIMIT 1", (camera_key(url), after)).fetchone()
+        return {"path": self._absolute(row[0]), "start": row[1], "end": row[2]} if row else None
+
+    def seek(self, url, when):
+        """Where to start reading to show url at when: the last keyframe at or before it.
+
+        Returns a dict (path, offset, time, segment_start) or None if nothing is recorded at
+        or after when. A time in a gap between segments resolves to the start of the next one.
+        """
+        db = self._db()
+        camera = camera_key(url)
+        row = db.execute("SELECT id, path, start, end FROM segments WHERE camera = ? AND start <= ? "
+                         "ORDER BY start DESC LIMIT 1", (camera, when)).fetchone()
+        if row is None or (row[3] is not None and row[3] < when):
+            row = db.execute("SELECT id, path, start, end FROM segments WHERE camera = ? AND start > ? "
+                             "ORDER BY start LIMIT 1", (camera, when)).fetchone()
+            if row is None:
+                return None
+        segment, path, start, _ = row
+        keyframe = db.execute("SELECT time, offset FROM keyframes WHERE segment = ? AND time <= ? "
+                              "ORDER BY time DESC LIMIT 1", (segment, max(when, start))).fetchone()
+        keyframe_time, offset = keyframe or (start, 0)
+        return {"path": self._absolute(path), "offset": offset, "time": keyframe_time, "segment_start": start}
+
+    def ranges(self, url, start, end):
+        """(path, from_offset, to_offset) byte ranges that cover url from start to end.
+
+        The first range starts on the keyframe at or before start; the last one stops at the
+        first keyframe at or after end, or runs to the end of the file (to_offset None).
+        """
+        first = self.seek(url, start)
+        if first is None or first["segment_start"] >= end:
+            return []
+        db = self._db()
+        rows = db.execute("SELECT id, path FROM segments WHERE camera = ? AND start >= ? AND start < ? "
+                          "ORDER BY start", (camera_key(url), first["segment_start"], end)).fetchall()
+        result = []
+        for i, (segment, path) in enumerate(rows):
+            cut = None
+            if i == len(rows) - 1:
+                row = db.execute("SELECT offset FROM keyframes WHERE segment = ? AND time >= ? "
+                                 "ORDER BY time LIMIT 1", (segment, end)).fetchone()
+                cut = row[0] if row else None
+            result.append((self._absolute(path), first["offset"] if i == 0 else 0, cut))
+        return result
+
+    def read(self, ranges, chunk_size=256 * 1024):
+        """Yield the bytes of ranges as one MPEG-TS stream; a segment still being written is read as far as it goes."""
+        for path, start, stop in ranges:
+            try:
+                with open(path, "rb") as f:
+                    if start:
+                        # A reader joining mid-segment needs the program tables before any picture
+                        yield psi_packets(f.read(16 * TS_PACKET_SIZE))
+                        f.seek(start)
+                    remaining = None if stop is None else stop - start
+                    while remaining is None or remaining > 0:
+                        data = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                        if not data:
+                            break
+                        if remaining is not None:
+                            remaining -= len(data)
+                        yield data
+            except FileNotFoundError:
+                continue
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
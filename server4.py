@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory
 from flask_cors import CORS
 import json
 import datetime
@@ -6,6 +6,9 @@ import base64
 import os
 import uuid
 import requests
+import asyncio
+from rtsp_probe import probe_many
+from segment_index import SegmentIndex, INDEX_FILE, parse_when
 
 app = Flask(__name__)
 CORS(app)
@@ -56,6 +59,15 @@ CAMERA_CONFIGS = {
 
 DEFAULT_LIVE_CAM_KEY = "Entrance"
 
+# Địa chỉ frame server cục bộ của rtsp_viewer14 (ví dụ http://127.0.0.1:8091).
+# Nếu được đặt, snapshot được lấy từ khung hình viewer đang giải mã thay vì gọi CGI của camera.
+VIEWER_SNAPSHOT_URL = os.environ.get('VIEWER_SNAPSHOT_URL')
+
+# Thư mục ghi hình của recorder.py / rtsp_viewer14 (chứa index.sqlite).
+# Clip được cắt theo camera và khoảng thời gian nhờ chỉ mục, không cần quét static/uploads.
+RECORDINGS_DIR = os.environ.get('RECORDINGS_DIR', 'recordings')
+segment_index = SegmentIndex(os.path.join(RECORDINGS_DIR, INDEX_FILE))
+
 # --- Định tuyến cho các tệp tĩnh (static files) ---
 # Flask mặc định phục vụ các tệp từ thư mục 'static'
 # Vì vậy, nếu bạn đặt 'black_camera.gif' vào 'static/images/',
@@ -104,6 +116,8 @@ def handle_event():
             event_data['snapshot_live_url_static'] = None
             event_data['attached_video_web_url'] = None # Thêm trường cho video
             event_data['attached_file_snapshot_web_url'] = None # Thêm trường cho snapshot dạng file
+            event_data['recorded_clip_path'] = None # Clip do viewer ghi quanh thời điểm sự kiện
+            event_data['recorded_clip_web_url'] = None # Clip lấy từ chỉ mục ghi hình
 
             config_key = None
             if ch_name and ch_name in CAMERA_CONFIGS:
@@ -117,9 +131,25 @@ def handle_event():
                 if CAMERA_CONFIGS[config_key].get('snapshot_url'):
                     # Sử dụng proxy để lấy snapshot từ camera
                     event_data['snapshot_live_url_static'] = f'/api/camera_snapshot_proxy/{config_key}'
+                if os.path.exists(segment_index.path):
+                    # 10 giây trước và sau sự kiện, phục vụ bởi /api/recordings
+                    event_time = datetime.datetime.now().timestamp()
+                    event_data['recorded_clip_web_url'] = (f'/api/recordings/{config_key}'
+                                                           f'?start={event_time - 10:.0f}&end={event_time + 10:.0f}')
             else:
                 print(f"  Warning: No camera configuration found for device '{device_name}' or channel '{ch_name}'")
 
+            # --- Yêu cầu viewer cắt clip sự kiện từ bộ đệm ghi hình (vài giây trước + sau sự kiện) ---
+            if VIEWER_SNAPSHOT_URL and event_data['rtsp_url_static']:
+                try:
+                    response = requests.post(f"{VIEWER_SNAPSHOT_URL}/clip",
+                                             data={'url': event_data['rtsp_url_static'], 'post': 10}, timeout=0.5)
+                    if response.status_code == 200:
+                        event_data['recorded_clip_path'] = response.json().get('path')
+                        print(f"  Recorded clip: {event_data['recorded_clip_path']}")
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    print(f"  Viewer clip unavailable: {e}")
+
             # --- Xử lý Attach Snapshot (Base64 trong JSON) - Ưu tiên cái này nếu có ---
             attach_snapshot_b64 = event_data.get('Attach Snapshot')
             if attach_snapshot_b64:
@@ -371,6 +401,16 @@ def get_latest_lpr_info():
 @app.route('/api/camera_snapshot_proxy/<camera_key>', methods=['GET'])
 def get_camera_snapshot_proxy(camera_key):
     config = CAMERA_CONFIGS.get(camera_key)
+    if config and VIEWER_SNAPSHOT_URL and config.get('rtsp_url'):
+        # Ưu tiên khung hình mới nhất từ viewer: không tạo thêm kết nối nào tới camera
+        try:
+            response = requests.get(f"{VIEWER_SNAPSHOT_URL}/snapshot", params={'url': config['rtsp_url']}, timeout=0.5)
+            if response.status_code == 200:
+                return response.content, 200, {'Content-Type': 'image/jpeg',
+                                               'X-Frame-Age': response.headers.get('X-Frame-Age', '')}
+        except requests.exceptions.RequestException as e:
+            print(f"Viewer snapshot unavailable for {camera_key}: {e}")
+
     if not config or not config.get('snapshot_url'):
         # Nếu không có cấu hình hoặc URL snapshot, trả về placeholder từ static/images
         return send_from_directory('static/images', 'no_signal.jpg', mimetype='image/jpeg'), 404
@@ -403,6 +443,61 @@ def get_camera_snapshot_proxy(camera_key):
         # Trả về ảnh "no_signal.jpg" hoặc ảnh báo lỗi khác khi có lỗi request
         return send_from_directory('static/images', 'no_signal.jpg', mimetype='image/jpeg'), 500
 
+@app.route('/api/recordings/<camera_key>', methods=['GET'])
+def get_recording(camera_key):
+    """Clip MPEG-TS của một camera theo khoảng thời gian: ?start=...&end=... (epoch, ISO, HH:MM hoặc -5m)."""
+    config = CAMERA_CONFIGS.get(camera_key)
+    if not config or not config.get('rtsp_url'):
+        return jsonify({"status": "error", "message": f"Unknown camera '{camera_key}'"}), 404
+    try:
+        start = parse_when(request.args.get('start', '-1m'))
+        end = parse_when(request.args['end']) if 'end' in request.args else start + 60
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid time: {e}"}), 400
+    # Tra cứu chỉ mục: khung hình khóa gần nhất trước start, cắt tại khung hình khóa sau end
+    ranges = segment_index.ranges(config['rtsp_url'], start, end) if os.path.exists(segment_index.path) else []
+    if not ranges:
+        return jsonify({"status": "error", "message": "No recording in that range"}), 404
+    filename = f"{camera_key}_{datetime.datetime.fromtimestamp(start).strftime('%Y%m%d-%H%M%S')}.ts"
+    return Response(segment_index.read(ranges), mimetype='video/mp2t',
+                    headers={'Content-Disposition': f'inline; filename="{filename}"'})
+
+@app.route('/api/recordings/<camera_key>/segments', methods=['GET'])
+def get_recording_segments(camera_key):
+    """Danh sách đoạn ghi hình của camera trong khoảng thời gian (mặc định: 1 giờ gần nhất)."""
+    config = CAMERA_CONFIGS.get(camera_key)
+    if not config or not config.get('rtsp_url'):
+        return jsonify({"status": "error", "message": f"Unknown camera '{camera_key}'"}), 404
+    try:
+        start = parse_when(request.args.get('start', '-1h'))
+        end = parse_when(request.args['end']) if 'end' in request.args else datetime.datetime.now().timestamp()
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid time: {e}"}), 400
+    if not os.path.exists(segment_index.path):
+        return jsonify([])
+    segments = segment_index.segments(config['rtsp_url'], start, end)
+    for segment in segments:
+        # Không trả về đường dẫn tuyệt đối của máy chủ
+        segment['path'] = os.path.relpath(segment['path'], RECORDINGS_DIR)
+    return jsonify(segments)
+
+@app.route('/api/camera_status', methods=['GET'])
+def get_camera_status():
+    """Kiểm tra song song rtsp_url của từng camera trong CAMERA_CONFIGS bằng OPTIONS/DESCRIBE."""
+    camera_keys = [key for key, config in CAMERA_CONFIGS.items() if config.get('rtsp_url')]
+    urls = [CAMERA_CONFIGS[key]['rtsp_url'] for key in camera_keys]
+    try:
+        timeout = float(request.args.get('timeout', 5))
+    except ValueError:
+        timeout = 5.0
+    results = asyncio.run(probe_many(urls, timeout=timeout))
+    status = {}
+    for key, result in zip(camera_keys, results):
+        # Không trả về URL có chứa mật khẩu
+        result.pop('url', None)
+        status[key] = result
+    return jsonify(status)
+
 @app.route('/api/errors', methods=['GET'])
 def get_errors():
     return jsonify(error_log[-50:][::-1])
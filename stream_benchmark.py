@@ -0,0 +1,429 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import vlc
+
+from tuning_profiles import TUNING_PROFILES, DEFAULT_PROFILE, build_media_options
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def make_benchmark_instance():
+    # Frames are decoded but not shown, so the numbers are decode cost only
+    return vlc.Instance('--no-xlib --quiet --vout=dummy --aout=dummy --no-audio --rtsp-timeout=15')
+
+
+def read_stats(media):
+    stats = vlc.MediaStats()
+    if not media.get_stats(stats):
+        return None
+    return {
+        "decoded_video": stats.decoded_video,
+        "displayed_pictures": stats.displayed_pictures,
+        "lost_pictures": stats.lost_pictures,
+        "demux_corrupted": stats.demux_corrupted,
+        "demux_discontinuity": stats.demux_discontinuity,
+        "input_bitrate": stats.input_bitrate,
+        "demux_bitrate": stats.demux_bitrate,
+    }
+
+
+def player_stats(player):
+    """read_stats() for the media player is playing, giving back the reference get_media() takes."""
+    media = player.get_media()
+    if media is None:
+        return None
+    try:
+        return read_stats(media)
+    finally:
+        media.release()
+
+
+def current_rss_mb():
+    if psutil:
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    try:
+        import resource
+        # Peak rather than current RSS, but still comparable between runs
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        return None
+
+
+def measure_stream(instance, url, media_options, duration=10.0, first_frame_timeout=15.0):
+    """Play url headless for duration seconds and return timing, decode and CPU figures."""
+    player = instance.media_player_new()
+    media = instance.media_new(url)
+    for option in media_options:
+        media.add_option(option)
+    player.set_media(media)
+    result = {"url": url, "first_frame_s": None, "decoded_frames": 0, "decode_fps": 0.0, "lost_frames": 0,
+              "cpu_percent": None, "error": None}
+    try:
+        cpu_start = time.process_time()
+        started = time.monotonic()
+        if player.play() == -1:
+            result["error"] = "play() failed"
+            return result
+        while time.monotonic() - started < first_frame_timeout:
+            stats = read_stats(media)
+            if stats and stats["decoded_video"] > 0:
+                result["first_frame_s"] = round(time.monotonic() - started, 3)
+                break
+            if player.get_state() in (vlc.State.Error, vlc.State.Ended):
+                result["error"] = f"player state {player.get_state()}"
+                return result
+            time.sleep(0.01)
+        else:
+            result["error"] = "no frame decoded"
+            return result
+        baseline = read_stats(media)
+        window_start = time.monotonic()
+        time.sleep(duration)
+        elapsed = time.monotonic() - window_start
+        final = read_stats(media)
+        result["decoded_frames"] = final["decoded_video"] - baseline["decoded_video"]
+        result["decode_fps"] = round(result["decoded_frames"] / elapsed, 2)
+        result["lost_frames"] = final["lost_pictures"] - baseline["lost_pictures"]
+        result["input_kbps"] = round(final["input_bitrate"] * 8000, 1)
+        # process_time covers every libVLC decoder thread in this process
+        result["cpu_percent"] = round(100.0 * (time.process_time() - cpu_start) / (time.monotonic() - started), 1)
+        result["rss_mb"] = current_rss_mb()
+        return result
+    finally:
+        player.stop()
+        media.release()
+        player.release()
+
+
+def benchmark_profiles(url, profiles=None, duration=10.0, hw_decode="auto"):
+    """Run measure_stream once per tuning profile on the same source."""
+    instance = make_benchmark_instance()
+    results = []
+    try:
+        for name in profiles or list(TUNING_PROFILES):
+            options = build_media_options(name, hw_decode)
+            result = measure_stream(instance, url, options, duration)
+            result["profile"] = name
+            # Glass-to-glass latency needs an optical reference; the caching budget plus the time
+            # to first frame is the part the viewer controls.
+            result["caching_ms"] = TUNING_PROFILES[name]["network-caching"]
+            result["decoder"] = options[-1].split("=", 1)[1]
+            print(f"{name}: first frame {result['first_frame_s']}s, {result['decode_fps']} fps, "
+                  f"CPU {result['cpu_percent']}%" + (f", error: {result['error']}" if result["error"] else ""))
+            results.append(result)
+    finally:
+        instance.release()
+    return results
+
+
+def generate_test_file(path, width=1920, height=1080, fps=25, seconds=20):
+    """Encode a synthetic H.264 test clip with ffmpeg (testsrc2 pattern, one keyframe per second)."""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg not found; pass --source with an existing H.264 file instead")
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"testsrc2=size={width}x{height}:rate={fps}", "-t", str(seconds),
+                    "-c:v", "libx264", "-preset", "veryfast", "-g", str(fps), "-pix_fmt", "yuv420p", path],
+                   check=True)
+    return path
+
+
+def serve_sources(path, base_port, count):
+    """Child process: loop path as count RTSP streams on base_port .. base_port + count - 1."""
+    instance = vlc.Instance('--no-xlib --quiet --vout=dummy --aout=dummy --no-audio')
+    players = []
+    for i in range(count):
+        media = instance.media_new(path)
+        media.add_option(f"sout=#rtp{{sdp=rtsp://127.0.0.1:{base_port + i}/cam}}")
+        media.add_option("sout-keep")
+        media.add_option("input-repeat=65535")
+        player = instance.media_player_new()
+        player.set_media(media)
+        player.play()
+        players.append(player)
+    print(f"Serving {count} streams from {path} on ports {base_port}-{base_port + count - 1}", flush=True)
+    try:
+        # Parent closes stdin to stop us
+        sys.stdin.read()
+    finally:
+        for player in players:
+            player.stop()
+            player.release()
+        instance.release()
+
+
+class SyntheticSources:
+    """Context manager serving a test file as local RTSP streams from a child process.
+
+    Serving runs in its own process so its CPU does not count against the wall being measured.
+    """
+    def __init__(self, path, count, base_port=18554, ready_timeout=15.0):
+        self.path = path
+        self.count = count
+        self.base_port = base_port
+        self.ready_timeout = ready_timeout
+        self.process = None
+
+    @property
+    def urls(self):
+        return [f"rtsp://127.0.0.1:{self.base_port + i}/cam" for i in range(self.count)]
+
+    def __enter__(self):
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", self.path,
+                                         "--port", str(self.base_port), "--count", str(self.count)],
+                                        stdin=subprocess.PIPE)
+        deadline = time.monotonic() + self.ready_timeout
+        for i in range(self.count):
+            while True:
+                try:
+                    with socket.create_connection(("127.0.0.1", self.base_port + i), timeout=0.5):
+                        break
+                except OSError:
+                    if time.monotonic() > deadline or self.process.poll() is not None:
+                        self.__exit__(None, None, None)
+                        raise RuntimeError(f"Synthetic stream on port {self.base_port + i} did not come up")
+                    time.sleep(0.1)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        return False
+
+
+def run_wall(urls, duration=10.0, profile=DEFAULT_PROFILE, hw_decode="auto", first_frame_timeout=20.0):
+    """Bring up one player per URL exactly as the viewer does and measure them together.
+
+    Returns (per_stream, summary). CPU and RSS are process-wide, since libVLC does not attribute
+    decoder threads to players; the per-stream figure is the wall total divided by the stream count.
+    """
+    from PyQt5.QtCore import Qt
+    from rtsp_viewer14 import StreamUpdateWorker, StreamBringUpPool
+
+    instance = make_benchmark_instance()
+    pool = StreamBringUpPool(max_workers=9)
+    media_options = build_media_options(profile, hw_decode)
+    lock = threading.Lock()
+    all_configured = threading.Event()
+    streams = [{"index": i, "url": url, "status": False, "message": "", "bringup_s": None,
+                "first_frame_s": None, "player": None} for i, url in enumerate(urls)]
+    pending = [len(urls)]
+    # Every player the wall started, kept apart from the per-stream results so cleanup always sees them
+    players = []
+    closed = [False]
+    rss_before = current_rss_mb()
+    cpu_start = time.process_time()
+    started = time.monotonic()
+
+    def configured(index, player, status, message):
+        # Same hand-off as RTSPViewer.configure_stream, minus the window handle
+        stream = streams[index]
+        stream["bringup_s"] = round(time.monotonic() - started, 3)
+        stream["status"] = status
+        stream["message"] = message
+        if status and player:
+            with lock:
+                if closed[0]:
+                    # A bring-up that finished after the run ended
+                    player.release()
+                    return
+                players.append(player)
+            stream["player"] = player
+            if player.play() == -1:
+                stream["status"] = False
+                stream["message"] = "play() failed"
+        elif player:
+            player.release()
+        with lock:
+            pending[0] -= 1
+            if pending[0] == 0:
+                all_configured.set()
+
+    try:
+        for i, url in enumerate(urls):
+            worker = StreamUpdateWorker(url, i, instance, media_options=media_options)
+            # No Qt event loop runs here, so the result must be handled on the pool thread
+            worker.stream_configured.connect(configured, Qt.DirectConnection)
+            pool.submit(worker, i)
+        all_configured.wait(first_frame_timeout)
+        _wait_for_first_frames(streams, started, started + first_frame_timeout, all_configured)
+
+        elapsed, window_cpu = _measure_window(streams, duration)
+        rss_after = current_rss_mb()
+        cpu_percent = round(100.0 * window_cpu / elapsed, 1)
+        per_stream = _share_process_totals(streams, cpu_percent, rss_before, rss_after)
+        first_frames = [s["first_frame_s"] for s in streams if s["first_frame_s"] is not None]
+        summary = {
+            "streams": len(urls),
+            "playing": sum(1 for s in streams if s["first_frame_s"] is not None),
+            "profile": profile,
+            "decoder": media_options[-1].split("=", 1)[1],
+            "wall_ready_s": max(first_frames) if first_frames else None,
+            "total_decode_fps": round(sum(s.get("decode_fps", 0) for s in streams), 2),
+            "total_dropped_frames": sum(s.get("dropped_frames", 0) for s in streams),
+            "cpu_percent": cpu_percent,
+            "rss_mb": rss_after,
+            "setup_cpu_s": round(time.process_time() - cpu_start - window_cpu, 3),
+        }
+        return per_stream, summary
+    finally:
+        pool.shutdown()
+        with lock:
+            closed[0] = True
+        for stream in streams:
+            stream.pop("player", None)
+        for player in players:
+            player.stop()
+            player.release()
+        instance.release()
+
+
+def _wait_for_first_frames(streams, started, deadline, all_configured):
+    """Record each playing stream's first_frame_s, until all have one or deadline passes."""
+    while time.monotonic() < deadline:
+        waiting = False
+        for stream in streams:
+            if stream["player"] and stream["first_frame_s"] is None:
+                stats = player_stats(stream["player"])
+                if stats and stats["decoded_video"] > 0:
+                    stream["first_frame_s"] = round(time.monotonic() - started, 3)
+                else:
+                    waiting = True
+        if not waiting and all_configured.is_set():
+            return
+        time.sleep(0.01)
+
+
+def _measure_window(streams, duration):
+    """Sample every playing stream over duration seconds; returns (elapsed, process CPU seconds)."""
+    baselines = {s["index"]: player_stats(s["player"]) for s in streams if s["player"]}
+    window_cpu = time.process_time()
+    window_start = time.monotonic()
+    time.sleep(duration)
+    elapsed = time.monotonic() - window_start
+    window_cpu = time.process_time() - window_cpu
+    for stream in streams:
+        if not stream["player"]:
+            continue
+        final = player_stats(stream["player"])
+        base = baselines[stream["index"]]
+        if final and base:
+            decoded = final["decoded_video"] - base["decoded_video"]
+            stream["decode_fps"] = round(decoded / elapsed, 2)
+            stream["dropped_frames"] = final["lost_pictures"] - base["lost_pictures"]
+            stream["input_kbps"] = round(final["input_bitrate"] * 8000, 1)
+    return elapsed, window_cpu
+
+
+def _share_process_totals(streams, cpu_percent, rss_before, rss_after):
+    """Split the process-wide CPU and RSS growth evenly over the playing streams."""
+    playing = [s for s in streams if s["player"]]
+    for stream in streams:
+        if playing:
+            stream["cpu_percent"] = round(cpu_percent / len(playing), 1)
+            if rss_before is not None and rss_after is not None:
+                stream["rss_mb"] = round((rss_after - rss_before) / len(playing), 1)
+    return list(streams)
+
+
+def run_benchmark(urls, grid_sizes=(1, 4, 9, 16), duration=10.0, profile=DEFAULT_PROFILE, hw_decode="auto"):
+    """Run one wall per grid size, cycling through urls to fill the tiles."""
+    report = {"host": {"cpus": os.cpu_count(), "platform": sys.platform}, "runs": []}
+    for tiles in grid_sizes:
+        wall_urls = [urls[i % len(urls)] for i in range(tiles)]
+        per_stream, summary = run_wall(wall_urls, duration, profile, hw_decode)
+        summary["grid"] = tiles
+        print(f"{tiles} tiles: ready in {summary['wall_ready_s']}s, {summary['playing']}/{tiles} playing, "
+              f"{summary['total_decode_fps']} fps, {summary['total_dropped_frames']} dropped, "
+              f"CPU {summary['cpu_percent']}%, RSS {summary['rss_mb']} MB")
+        report["runs"].append({"summary": summary, "streams": per_stream})
+    return report
+
+
+def write_csv(report, path):
+    fields = ["grid", "index", "url", "status", "message", "bringup_s", "first_frame_s", "decode_fps",
+              "dropped_frames", "input_kbps", "cpu_percent", "rss_mb"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for run in report["runs"]:
+            for stream in run["streams"]:
+                writer.writerow(dict(stream, grid=run["summary"]["grid"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless stream and stream-wall benchmarks for the viewer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    profiles_parser = commands.add_parser("profiles", help="Measure each tuning profile on one stream")
+    profiles_parser.add_argument("url")
+    profiles_parser.add_argument("--profiles", nargs="+", choices=list(TUNING_PROFILES))
+    profiles_parser.add_argument("--duration", type=float, default=10.0)
+    profiles_parser.add_argument("--hw-decode", default="auto", help='"auto", "off" or a libavcodec hw decoder name')
+    profiles_parser.add_argument("--json", help="Write the results to this file")
+
+    wall_parser = commands.add_parser("wall", help="Measure walls of 1/4/9/16 tiles")
+    wall_parser.add_argument("urls", nargs="*", help="Sources to play; synthetic local streams if omitted")
+    wall_parser.add_argument("--source", help="Video file to serve as synthetic streams (generated with ffmpeg if omitted)")
+    wall_parser.add_argument("--sources", type=int, default=4, help="Number of synthetic streams to serve")
+    wall_parser.add_argument("--resolution", default="1920x1080")
+    wall_parser.add_argument("--grids", type=int, nargs="+", default=[1, 4, 9, 16])
+    wall_parser.add_argument("--duration", type=float, default=10.0)
+    wall_parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(TUNING_PROFILES))
+    wall_parser.add_argument("--hw-decode", default="auto")
+    wall_parser.add_argument("--json", help="Write the full report to this file")
+    wall_parser.add_argument("--csv", help="Write one row per stream to this file")
+
+    serve_parser = commands.add_parser("serve", help=argparse.SUPPRESS)
+    serve_parser.add_argument("path")
+    serve_parser.add_argument("--port", type=int, default=18554)
+    serve_parser.add_argument("--count", type=int, default=1)
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve_sources(args.path, args.port, args.count)
+        return 0
+    if args.command == "profiles":
+        results = benchmark_profiles(args.url, args.profiles, args.duration, args.hw_decode)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=4)
+        return 0
+
+    if args.urls:
+        report = run_benchmark(args.urls, args.grids, args.duration, args.profile, args.hw_decode)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = args.source
+            if not source:
+                width, height = (int(n) for n in args.resolution.lower().split("x"))
+                source = generate_test_file(os.path.join(tmp, "synthetic.mp4"), width, height)
+            with SyntheticSources(source, args.sources) as sources:
+                report = run_benchmark(sources.urls, args.grids, args.duration, args.profile, args.hw_decode)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+    if args.csv:
+        write_csv(report, args.csv)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SDP = "\r\n".join([
+    "v=0",
+    "o=- 0 0 IN IP4 127.0.0.1",
+    "s=fake",
+    "t=0 0",
+    "m=video 0 RTP/AVP 96",
+    "a=rtpmap:96 H264/90000",
+    "a=framerate:25",
+    "a=framesize:96 1280-720",
+    "a=control:trackID=1",
+    "m=audio 0 RTP/AVP 0",
+    "a=control:trackID=2",
+    "",
+])
+
+
+def _md5(text):
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+class FakeRTSPServer:
+    """Minimal RTSP server on a loopback port, run on its own event loop thread.
+
+    Answers OPTIONS and DESCRIBE. auth is None, "basic" or "digest"; with auth set, DESCRIBE
+    needs username/password and gets 401 with a challenge until they are right. close_after_401
+    drops the connection after each 401, as some cameras do, and hang never answers at all.
+    Every request is kept in requests as (method, headers).
+    """
+    def __init__(self):
+        self.auth = None
+        self.username = "admin"
+        self.password = "secret"
+        self.realm = "fake"
+        self.nonce = "0123456789abcdef"
+        self.qop = "auth"
+        self.sdp = SDP
+        self.close_after_401 = False
+        self.hang = False
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        self._server = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name="fake-rtsp", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._serve, "127.0.0.1", 0), self.loop).result(5)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._close_server(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+        self.loop.close()
+
+    async def _close_server(self):
+        self._server.close()
+        # Connections still open (a hung request) end here, before the loop goes away
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def url(self, path="/stream", credentials=None):
+        auth = f"{credentials[0]}:{credentials[1]}@" if credentials else ""
+        return f"rtsp://{auth}127.0.0.1:{self.port}{path}"
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode().split("\r\n")
+                method, uri, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, _, value = line.partition(":")
+                        headers[key.strip().lower()] = value.strip()
+                self.requests.append((method, headers))
+                if self.hang:
+                    await asyncio.sleep(3600)
+                status, extra, body = self._answer(method, uri, headers)
+                response = [f"RTSP/1.0 {status}", f"CSeq: {headers.get('cseq', '0')}", "Server: fake-rtsp"]
+                response += [f"{key}: {value}" for key, value in extra]
+                if body:
+                    response.append(f"Content-Length: {len(body.encode())}")
+                writer.write(("\r\n".join(response) + "\r\n\r\n" + body).encode())
+                await writer.drain()
+                if status.startswith("401") and self.close_after_401:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _answer(self, method, uri, headers):
+        if method == "OPTIONS":
+            return "200 OK", [("Public", "OPTIONS, DESCRIBE, SETUP, PLAY, TEARDOWN")], ""
+        if method != "DESCRIBE":
+            return "405 Method Not Allowed", [], ""
+        if self.auth and not self._authorized(method, headers.get("authorization", "")):
+            if self.auth == "basic":
+                challenge = f'Basic realm="{self.realm}"'
+            else:
+                challenge = f'Digest realm="{self.realm}", nonce="{self.nonce}"'
+                if self.qop:
+                    challenge += f', qop="{self.qop}"'
+            return "401 Unauthorized", [("WWW-Authenticate", challenge)], ""
+        return "200 OK", [("Content-Type", "application/sdp")], self.sdp
+
+    def _authorized(self, method, authorization):
+        scheme, _, rest = authorization.partition(" ")
+        if self.auth == "basic":
+            expected = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+            return scheme == "Basic" and rest == expected
+        if scheme != "Digest":
+            return False
+        params = dict((key, quoted or plain) for key, quoted, plain
+                      in re.findall(r'(\w+)=(?:"([^"]*)"|([^,\s]+))', rest))
+        ha1 = _md5(f"{self.username}:{self.realm}:{self.password}")
+        ha2 = _md5(f"{method}:{params.get('uri')}")
+        if self.qop:
+            expected = _md5(f"{ha1}:{self.nonce}:{params.get('nc')}:{params.get('cnonce')}:auth:{ha2}")
+        else:
+            expected = _md5(f"{ha1}:{self.nonce}:{ha2}")
+        return params.get("username") == self.username and params.get("response") == expected
+
+
+@pytest.fixture
+def rtsp_server():
+    server = FakeRTSPServer().start()
+    yield server
+    server.stop()
@@ -0,0 +1,28 @@
+import pytest
+
+from camera_import import percentile, summarize
+
+
+@pytest.mark.parametrize("p, expected", [(0.0, 1), (0.1, 1), (0.5, 5), (0.9, 9), (0.95, 10), (1.0, 10)])
+def test_percentile_nearest_rank(p, expected):
+    assert percentile(list(range(1, 11)), p) == expected
+
+
+def test_percentile_small_samples():
+    assert percentile([], 0.5) is None
+    assert percentile([7], 0.95) == 7
+    # Nearest rank of the median of two values is the lower one, not the upper
+    assert percentile([1, 2], 0.5) == 1
+    assert percentile([1, 2, 3, 4], 0.5) == 2
+
+
+def test_summarize_counts_and_latencies():
+    def row(valid, latency, reachable=True, auth="none", error=None):
+        return {"valid": valid, "latency": latency, "reachable": reachable, "auth": auth, "error": error}
+    rows = [row(True, 0.1), row(True, 0.3), row(True, 0.2), row(False, 0.05, auth="failed"),
+            row(False, None, reachable=False, error="Timed out after 3s")]
+    summary = summarize(rows, 1.234)
+    assert summary["cameras"] == 5 and summary["valid"] == 3
+    assert summary["unreachable"] == 1 and summary["auth_failed"] == 1 and summary["timed_out"] == 1
+    assert summary["latency_p50"] == 0.2 and summary["latency_p95"] == 0.3
+    assert summary["elapsed"] == 1.23
@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+
+import pytest
+
+import config_store
+from config_store import SCHEMA_VERSION, ConfigStore, migrate
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ConfigStore(str(tmp_path / "vms_config.json"))
+    yield store
+    store.close(timeout=2.0)
+
+
+def test_migrate_square_grid_from_version_1():
+    config = migrate({"grid_size": 3, "rtsp_urls": ["rtsp://cam/live"]})
+    assert config == {"grid_rows": 3, "grid_cols": 3, "rtsp_urls": ["rtsp://cam/live"], "schema_version": SCHEMA_VERSION}
+    # Explicit rows/cols win over grid_size
+    assert migrate({"grid_size": 3, "grid_rows": 2})["grid_cols"] == 3
+    assert migrate({"grid_size": 3, "grid_rows": 2})["grid_rows"] == 2
+
+
+def test_migrate_keeps_current_and_newer_versions():
+    current = {"schema_version": SCHEMA_VERSION, "grid_rows": 4}
+    assert migrate(dict(current)) == current
+    newer = migrate({"schema_version": SCHEMA_VERSION + 1, "future_key": True})
+    assert newer == {"schema_version": SCHEMA_VERSION + 1, "future_key": True}
+
+
+def test_save_writes_and_load_migrates(store):
+    store.save({"grid_rows": 2, "grid_cols": 3})
+    assert store.flush(timeout=2.0)
+    assert store.load() == {"grid_rows": 2, "grid_cols": 3, "schema_version": SCHEMA_VERSION}
+    assert not os.path.exists(store.path + ".tmp")
+
+
+def test_load_without_a_file(store):
+    with pytest.raises(FileNotFoundError):
+        store.load()
+
+
+def test_failed_write_leaves_the_old_file(store, monkeypatch):
+    store.save({"grid_rows": 2})
+    assert store.flush(timeout=2.0)
+
+    def crash(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(config_store.os, "replace", crash)
+    store.save({"grid_rows": 5})
+    assert store.flush(timeout=2.0)
+    # The new text only ever reached the temp file
+    assert store.load()["grid_rows"] == 2
+    assert json.load(open(store.path + ".tmp"))["grid_rows"] == 5
+
+
+def test_bursts_collapse_and_deferred_tasks_run_after_the_write(store, monkeypatch):
+    writes = []
+    gate = threading.Event()
+    original = store._write
+
+    def slow_write(text):
+        gate.wait(2.0)
+        writes.append(json.loads(text)["n"])
+        original(text)
+    monkeypatch.setattr(store, "_write", slow_write)
+    store.save({"n": 0})
+    for n in range(1, 20):
+        store.save({"n": n})
+    seen = []
+    store.defer(lambda: seen.append(json.load(open(store.path))["n"]))
+    gate.set()
+    assert store.flush(timeout=2.0)
+    assert writes[-1] == 19 and len(writes) <= 2
+    assert seen == [19]
+
+
+def test_close_flushes_and_stops_the_writer(tmp_path):
+    store = ConfigStore(str(tmp_path / "vms_config.json"))
+    store.save({"grid_rows": 1})
+    assert store.close(timeout=2.0)
+    store._thread.join(2.0)
+    assert not store._thread.is_alive()
+    assert store.load()["grid_rows"] == 1
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+import vlc
+
+import playback_timeline
+from playback_timeline import PlaybackTimeline
+
+URL = "rtsp://cam/live"
+
+
+class FakeMedia:
+    def __init__(self, path):
+        self.path = path
+        self.options = []
+
+    def add_option(self, option):
+        self.options.append(option)
+
+    def release(self):
+        pass
+
+
+class FakePlayer:
+    def __init__(self):
+        self.calls = []
+        self.fail = None
+
+    def _call(self, name, *args):
+        if name == self.fail:
+            raise RuntimeError(f"{name} failed")
+        self.calls.append((name,) + args)
+
+    def set_media(self, media):
+        self._call("set_media", media.path)
+
+    def play(self):
+        self._call("play")
+
+    def set_pause(self, paused):
+        self._call("set_pause", paused)
+
+    def set_time(self, ms):
+        self._call("set_time", ms)
+
+    def set_rate(self, rate):
+        self._call("set_rate", rate)
+
+    def get_time(self):
+        return 0
+
+    def get_state(self):
+        return vlc.State.Playing
+
+
+class FakeInstance:
+    def media_player_new(self):
+        return FakePlayer()
+
+    def media_new(self, path):
+        return FakeMedia(path)
+
+
+class FakeIndex:
+    def segment_at(self, url, when):
+        return {"path": "/rec/a.ts", "start": 100.0, "end": 200.0}
+
+    def next_segment(self, url, after):
+        return None
+
+
+@pytest.fixture
+def timeline(monkeypatch):
+    monkeypatch.setattr(playback_timeline, "prefetch", lambda path: None)
+    timeline = PlaybackTimeline(FakeInstance(), FakeIndex(), 110.0)
+    yield timeline
+    timeline.close()
+
+
+def test_shown_tile_resumes_when_playing(timeline):
+    player = timeline.add(0, URL)
+    timeline.play()
+    assert player.calls[:2] == [("set_media", "/rec/a.ts"), ("play",)]
+    timeline.set_visible(set())
+    assert player.calls[-1] == ("set_pause", 1)
+    player.calls.clear()
+    timeline.set_visible({0})
+    # Caught up with the clock inside the same segment, then unpaused
+    assert [call[0] for call in player.calls] == ["set_time", "set_pause"]
+    assert player.calls[-1] == ("set_pause", 0)
+
+
+def test_shown_tile_stays_paused_when_paused(timeline):
+    player = timeline.add(0, URL)
+    timeline.tick()
+    timeline.set_visible(set())
+    player.calls.clear()
+    timeline.set_visible({0})
+    assert player.calls == [("set_time", 10000)]
+
+
+def test_error_while_showing_a_tile_is_logged(timeline, monkeypatch):
+    events = []
+    monkeypatch.setattr(playback_timeline.metrics, "event", lambda message, **fields: events.append((message, fields)))
+    player = timeline.add(0, URL)
+    timeline.play()
+    timeline.set_visible(set())
+    player.fail = "set_time"
+    timeline.set_visible({0})
+    assert events == [(f"Error in playback of {URL}: set_time failed", {"camera": URL, "level": "error"})]
+    assert timeline.tiles[0].visible
+
+
+def test_clock_pauses_and_seeks():
+    clock = playback_timeline.PlaybackClock(50.0)
+    assert clock.position() == 50.0
+    clock.play()
+    time.sleep(0.01)
+    assert clock.position() > 50.0
+    clock.pause()
+    clock.seek(10.0)
+    assert clock.position() == 10.0
@@ -0,0 +1,45 @@
+from player_pool import WarmPlayerPool, pool_key
+
+
+def test_pool_key_normalises_the_url_and_keeps_options_apart():
+    options = ["rtsp-tcp", "network-caching=300"]
+    assert pool_key("RTSP://Cam/live", options) == pool_key("rtsp://cam:554/live", list(options))
+    assert pool_key("rtsp://cam/live", options) != pool_key("rtsp://cam/live", ["rtsp-tcp"])
+    assert pool_key("rtsp://cam/live", options, ["avcodec-skiploopfilter=4"]) != pool_key("rtsp://cam/live", options)
+
+
+def test_park_and_take():
+    pool = WarmPlayerPool()
+    assert pool.park("a", "player-a", "widget-a", paused=True, now=1.0) == []
+    entry = pool.take("a")
+    assert entry == {"player": "player-a", "widget": "widget-a", "parked_at": 1.0, "paused": True}
+    assert pool.take("a") is None and len(pool) == 0
+
+
+def test_eviction_beyond_max_idle_drops_the_oldest():
+    pool = WarmPlayerPool(max_idle=2)
+    pool.park("a", "player-a", None, now=1.0)
+    pool.park("b", "player-b", None, now=2.0)
+    evicted = pool.park("c", "player-c", None, now=3.0)
+    assert [entry["player"] for entry in evicted] == ["player-a"]
+    assert [entry["player"] for entry in pool.idle()] == ["player-b", "player-c"]
+
+
+def test_parking_the_same_key_evicts_the_previous_player():
+    pool = WarmPlayerPool(max_idle=2)
+    pool.park("a", "old", None, now=1.0)
+    pool.park("b", "player-b", None, now=2.0)
+    evicted = pool.park("a", "new", None, now=3.0)
+    assert [entry["player"] for entry in evicted] == ["old"]
+    # The re-parked key is now the newest, so "b" goes first
+    assert [entry["player"] for entry in pool.park("c", "player-c", None, now=4.0)] == ["player-b"]
+
+
+def test_expire_and_drain():
+    pool = WarmPlayerPool(idle_ttl=10.0)
+    pool.park("a", "player-a", None, now=0.0)
+    pool.park("b", "player-b", None, now=5.0)
+    assert [entry["player"] for entry in pool.expire(now=10.0)] == []
+    assert [entry["player"] for entry in pool.expire(now=12.0)] == ["player-a"]
+    assert [entry["player"] for entry in pool.drain()] == ["player-b"]
+    assert len(pool) == 0 and pool.idle() == []
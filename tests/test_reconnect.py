@@ -0,0 +1,89 @@
+import pytest
+
+import reconnect
+from reconnect import CLOSED, HALF_OPEN, OPEN, ReconnectManager
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    # uniform(0, x) -> x: the delay is the full backoff
+    monkeypatch.setattr(reconnect.random, "uniform", lambda low, high: high)
+
+
+def test_backoff_doubles_up_to_max_delay(no_jitter):
+    manager = ReconnectManager(base_delay=1.0, max_delay=8.0, failure_threshold=10, min_spacing=0)
+    delays = [manager.next_attempt("cam", now=1000.0 * i)[0] for i in range(6)]
+    assert delays == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+
+def test_jitter_never_goes_below_half_the_backoff(monkeypatch):
+    monkeypatch.setattr(reconnect.random, "uniform", lambda low, high: low)
+    manager = ReconnectManager(base_delay=2.0, min_spacing=0)
+    assert manager.next_attempt("cam", now=0.0)[0] == 1.0
+    assert manager.next_attempt("cam", now=100.0)[0] == 2.0
+
+
+def test_circuit_opens_half_opens_and_closes(no_jitter):
+    manager = ReconnectManager(base_delay=1.0, failure_threshold=3, open_cooldown=120.0, min_spacing=0)
+    assert manager.next_attempt("cam", now=0.0)[1:] == (CLOSED, 1)
+    assert manager.next_attempt("cam", now=10.0)[1:] == (CLOSED, 2)
+    delay, state, attempt = manager.next_attempt("cam", now=20.0)
+    assert (delay, state, attempt) == (120.0, OPEN, 3)
+    manager.attempt_started("cam")
+    assert manager.state("cam") == (HALF_OPEN, 3)
+    # A failed half-open attempt waits out another cooldown
+    assert manager.next_attempt("cam", now=200.0)[:2] == (120.0, OPEN)
+    manager.record_success("cam")
+    assert manager.state("cam") == (CLOSED, 0)
+    assert manager.next_attempt("cam", now=400.0)[:2] == (1.0, CLOSED)
+
+
+def test_attempt_started_leaves_a_closed_circuit_alone():
+    manager = ReconnectManager()
+    manager.next_attempt("cam", now=0.0)
+    manager.attempt_started("cam")
+    assert manager.state("cam") == (CLOSED, 1)
+
+
+def test_forget():
+    manager = ReconnectManager()
+    manager.next_attempt("a", now=0.0)
+    manager.next_attempt("b", now=0.0)
+    manager.forget("a")
+    assert manager.state("a") == (CLOSED, 0) and manager.state("b") == (CLOSED, 1)
+    manager.forget()
+    assert manager.state("b") == (CLOSED, 0)
+
+
+def test_simultaneous_failures_are_spaced(no_jitter):
+    manager = ReconnectManager(base_delay=1.0, min_spacing=0.3)
+    starts = sorted(manager.next_attempt(f"cam{i}", now=0.0)[0] for i in range(10))
+    assert starts[0] == 1.0
+    assert all(later - earlier >= 0.3 - 1e-9 for earlier, later in zip(starts, starts[1:]))
+    assert starts[-1] == pytest.approx(1.0 + 9 * 0.3)
+
+
+def test_distant_slot_does_not_delay_nearby_attempts(no_jitter):
+    manager = ReconnectManager(base_delay=1.0, failure_threshold=1, open_cooldown=120.0, min_spacing=0.3)
+    assert manager.next_attempt("open", now=0.0)[0] == 120.0
+    manager.failure_threshold = 10
+    # Reserved far in the future, the open circuit's slot leaves the next second free
+    assert manager.next_attempt("cam", now=0.0)[0] == 1.0
+
+
+def test_early_attempt_fills_a_gap_between_slots(monkeypatch):
+    # With base_delay 2.0 a first failure waits 1.0 + uniform(0, 1.0); these are the uniform draws
+    draws = iter([0.5, 5.0, 2.0, 2.0])
+    monkeypatch.setattr(reconnect.random, "uniform", lambda low, high: next(draws))
+    manager = ReconnectManager(base_delay=2.0, min_spacing=0.3)
+    assert manager.next_attempt("a", now=0.0)[0] == 1.5
+    assert manager.next_attempt("b", now=0.0)[0] == 6.0
+    # 3.0 lies between the two slots and is clear of both, so the slot at 6.0 does not push it
+    assert manager.next_attempt("c", now=0.0)[0] == 3.0
+    assert manager.next_attempt("d", now=0.0)[0] == pytest.approx(3.3)
+
+
+def test_slots_in_the_past_are_forgotten(no_jitter):
+    manager = ReconnectManager(base_delay=1.0, min_spacing=0.3)
+    manager.next_attempt("a", now=0.0)
+    assert manager.next_attempt("b", now=100.0)[0] == 1.0
@@ -0,0 +1,42 @@
+import pytest
+
+from tuning_profiles import limit_media_options, tile_limits
+
+
+@pytest.mark.parametrize("cell_width, max_fps, skip_loop_filter, skip_frame", [
+    (1280, 0, 0, 0),
+    (960, 0, 0, 0),
+    (959, 15, 1, 1),
+    (480, 15, 1, 1),
+    (300, 10, 4, 2),
+    (120, 5, 4, 2),
+])
+def test_tiers_by_cell_width(cell_width, max_fps, skip_loop_filter, skip_frame):
+    limits = tile_limits(cell_width)
+    assert (limits["max_fps"], limits["skip_loop_filter"], limits["skip_frame"]) == (max_fps, skip_loop_filter, skip_frame)
+    assert limits["max_width"] == cell_width and not limits["keyframe_only"]
+
+
+def test_fullscreen_is_uncapped():
+    assert tile_limits(200, fullscreen=True) == {"max_fps": 0, "max_width": 0, "skip_loop_filter": 0,
+                                                 "skip_frame": 0, "keyframe_only": False}
+
+
+def test_override_wins_and_unknown_keys_are_ignored():
+    limits = tile_limits(1280, override={"max_fps": 8, "keyframe_only": True, "bogus": 1})
+    assert limits["max_fps"] == 8 and limits["keyframe_only"] and "bogus" not in limits
+
+
+def test_camera_max_width_picks_the_tier():
+    # A camera capped at 400 px decodes like a 400 px cell, even fullscreen
+    for limits in (tile_limits(1280, override={"max_width": 400}),
+                   tile_limits(1280, fullscreen=True, override={"max_width": 400})):
+        assert (limits["max_fps"], limits["skip_frame"], limits["max_width"]) == (10, 2, 400)
+
+
+def test_limit_media_options():
+    assert limit_media_options(tile_limits(1280)) == ["avcodec-skiploopfilter=0"]
+    assert limit_media_options(tile_limits(300)) == ["avcodec-skiploopfilter=4", "avcodec-skip-frame=2",
+                                                     "video-filter=fps", "fps-fps=10"]
+    keyframes = limit_media_options(tile_limits(1280, override={"keyframe_only": True}))
+    assert keyframes == ["avcodec-skiploopfilter=0", "avcodec-skip-frame=3"]
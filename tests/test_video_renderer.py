@@ -0,0 +1,52 @@
+import ctypes
+
+from decoder_process import FRAME_HEADER, FRAME_SLOTS, HEADER_SIZE, fit_frame, frame_slot_size
+from video_renderer import SharedFrameRenderer, VideoCallbackRenderer
+
+
+def setup_output(renderer, source_width, source_height):
+    width, height, pitches, lines = ((ctypes.c_uint * 1)(value) for value in (source_width, source_height, 0, 0))
+    chroma = ctypes.create_string_buffer(4)
+    assert renderer._setup(None, ctypes.cast(chroma, ctypes.c_void_p), width, height, pitches, lines)
+    assert chroma.raw == b"RV32"
+    return width[0], height[0]
+
+
+def test_fit_frame():
+    assert fit_frame(1920, 1080, (640, 360)) == (640, 360)
+    assert fit_frame(640, 360, (1920, 1080)) == (640, 360)
+    # Widths round down to a multiple of 8, and a slot that is too small shrinks the picture further
+    assert fit_frame(1920, 1080, (301, 400)) == (296, 168)
+    assert fit_frame(1920, 1080, (1920, 1080), frame_slot_size((640, 360))) == (600, 340)
+
+
+def test_callback_output_is_reconfigured_only_when_far_off():
+    renderer = VideoCallbackRenderer(max_size=(640, 360))
+    assert not renderer.needs_reconfigure()
+    assert setup_output(renderer, 1920, 1080) == (640, 360)
+    renderer.set_max_size(700, 394)
+    assert not renderer.needs_reconfigure()
+    renderer.set_max_size(320, 180)
+    assert renderer.needs_reconfigure()
+    assert setup_output(renderer, 1920, 1080) == (320, 180)
+    assert not renderer.needs_reconfigure()
+    # A small source cannot grow, whatever the tile size
+    renderer.set_max_size(640, 360)
+    assert setup_output(renderer, 352, 288) == (352, 288)
+    renderer.set_max_size(1920, 1080)
+    assert not renderer.needs_reconfigure()
+
+
+def test_shared_output_uses_the_size_the_child_reports():
+    slot_size = frame_slot_size((1280, 720))
+    buffer = bytearray(HEADER_SIZE + FRAME_SLOTS * slot_size)
+    renderer = SharedFrameRenderer(memoryview(buffer), slot_size, max_size=(1280, 720))
+    FRAME_HEADER.pack_into(buffer, 0, 1, 1280, 720, 1280 * 4, 0)
+    assert renderer.take_dirty() and renderer.width == 1280
+    # Until the child reports its source size nothing is known to be off
+    renderer.set_max_size(320, 180)
+    assert not renderer.needs_reconfigure()
+    renderer.source_size = (1920, 1080)
+    assert renderer.needs_reconfigure()
+    renderer.set_max_size(1280, 720)
+    assert not renderer.needs_reconfigure()
@@ -0,0 +1,145 @@
+import glob
+import sys
+
+DEFAULT_PROFILE = "balanced"
+
+# Media-level libVLC options per named profile. "hw_decode" asks for hardware decoding when the
+# box has it; "max_stream_profile" caps the main/sub/mobile selection made from the tile size.
+TUNING_PROFILES = {
+    "low-latency": {
+        "network-caching": 200,
+        "live-caching": 200,
+        "rtsp-frame-buffer-size": 200000,
+        "clock-jitter": 0,
+        "clock-synchro": 0,
+        "avcodec-threads": 2,
+        "hw_decode": True,
+        "max_stream_profile": "main",
+    },
+    "balanced": {
+        "network-caching": 1000,
+        "live-caching": 1000,
+        "rtsp-frame-buffer-size": 200000,
+        "clock-jitter": 0,
+        "clock-synchro": 0,
+        "avcodec-threads": 2,
+        "hw_decode": True,
+        "max_stream_profile": "main",
+    },
+    "bandwidth-saver": {
+        "network-caching": 1500,
+        "live-caching": 1500,
+        "rtsp-frame-buffer-size": 100000,
+        "avcodec-threads": 1,
+        "hw_decode": True,
+        "max_stream_profile": "sub",
+    },
+    "cpu-only": {
+        "network-caching": 1000,
+        "live-caching": 1000,
+        "rtsp-frame-buffer-size": 200000,
+        "clock-jitter": 0,
+        "clock-synchro": 0,
+        "avcodec-threads": 0,
+        "hw_decode": False,
+        "max_stream_profile": "main",
+    },
+}
+
+# Decode limits by displayed cell width, largest tiles first: (min_cell_width, max_fps,
+# avcodec-skiploopfilter, avcodec-skip-frame). max_fps 0 keeps the camera's own rate;
+# skiploopfilter 1 skips deblocking on non-reference frames, 4 on all frames, which is
+# invisible at thumbnail size. skip-frame 1 never decodes B-frames, 2 no non-reference frame
+# (B-frames and the upper layer of cameras that encode with temporal layers), so nothing
+# else is predicted from the skipped pictures.
+TILE_LIMIT_TIERS = [
+    (960, 0, 0, 0),
+    (480, 15, 1, 1),
+    (240, 10, 4, 2),
+    (0, 5, 4, 2),
+]
+
+_hw_decoder = None
+
+
+def detect_hw_decoder():
+    """Best guess at the libavcodec hardware decoder for this box, or "none" for software decode."""
+    global _hw_decoder
+    if _hw_decoder is None:
+        if sys.platform.startswith("win"):
+            _hw_decoder = "d3d11va"
+        elif sys.platform == "darwin":
+            _hw_decoder = "videotoolbox"
+        elif glob.glob("/dev/nvidia[0-9]*") or glob.glob("/dev/dri/renderD*"):
+            # "any" lets libavcodec pick VA-API/VDPAU/NVDEC and fall back to software by itself
+            _hw_decoder = "any"
+        else:
+            _hw_decoder = "none"
+    return _hw_decoder
+
+
+def resolve_profile_name(name):
+    return name if name in TUNING_PROFILES else DEFAULT_PROFILE
+
+
+def build_media_options(profile_name, hw_decode="auto"):
+    """libVLC media options for a tuning profile.
+
+    hw_decode is the global override from vms_config.json: "auto" uses hardware decode when the
+    profile allows it and the box has a decoder, "off" forces software decode everywhere.
+    """
+    profile = TUNING_PROFILES[resolve_profile_name(profile_name)]
+    options = ["no-audio", "rtsp-tcp", "no-video-title"]
+    for key, value in profile.items():
+        if key in ("hw_decode", "max_stream_profile"):
+            continue
+        options.append(f"{key}={value}")
+    decoder = "none"
+    if profile["hw_decode"] and hw_decode != "off":
+        decoder = detect_hw_decoder() if hw_decode == "auto" else hw_decode
+    options.append(f"avcodec-hw={decoder}")
+    return options
+
+
+def tile_limits(cell_width, fullscreen=False, override=None):
+    """Per-tile decode limits derived from the cell width; override is the camera's camera_limits entry.
+
+    max_width 0 means no resolution cap. A camera's own max_width also picks the tier, so a
+    capped camera decodes as cheaply in a large or fullscreen tile as in a cell that wide.
+    keyframe_only decodes I-frames only, roughly one picture per GOP, and is never chosen
+    automatically.
+    """
+    override = override or {}
+    width = float("inf") if fullscreen else cell_width
+    if override.get("max_width"):
+        width = min(width, override["max_width"])
+    for min_width, max_fps, skip_loop_filter, skip_frame in TILE_LIMIT_TIERS:
+        if width >= min_width:
+            break
+    limits = {
+        "max_fps": max_fps,
+        "max_width": 0 if fullscreen else cell_width,
+        "skip_loop_filter": skip_loop_filter,
+        "skip_frame": skip_frame,
+        "keyframe_only": False,
+    }
+    limits.update({key: value for key, value in override.items() if key in limits})
+    return limits
+
+
+def limit_media_options(limits):
+    """libVLC media options that apply tile_limits().
+
+    skiploopfilter and skip-frame cut decode work; skipped pictures are never decoded. The
+    fps filter then brings what is left down to max_fps. It drops pictures after they are
+    decoded, so on a stream where every frame is a reference frame only a smaller stream
+    profile (picked from max_width) lowers the decode cost of a capped tile.
+    """
+    options = [f"avcodec-skiploopfilter={limits['skip_loop_filter']}"]
+    # keyframe_only skips B and P frames
+    skip_frame = 3 if limits["keyframe_only"] else limits["skip_frame"]
+    if skip_frame:
+        options.append(f"avcodec-skip-frame={skip_frame}")
+    if limits["max_fps"]:
+        options += ["video-filter=fps", f"fps-fps={limits['max_fps']}"]
+    return options
@@ -0,0 +1,302 @@
+import ctypes
+import sys
+import threading
+import time
+
+import vlc
+from PyQt5 import sip
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QImage
+
+from decoder_process import FRAME_HEADER, fit_frame, frame_slot_offset
+from viewer_metrics import metrics
+
+# libVLC may hold PICTURE_POOL pictures at once; one more buffer is always the displayed frame
+PICTURE_POOL = 2
+BUFFER_COUNT = PICTURE_POOL + 1
+
+# How far (as a fraction of its width) the output may be off the tile's size before the viewer reopens it
+RECONFIGURE_SLACK = 0.25
+
+# python-vlc declares the chroma argument as c_char_p, which hands Python a read-only copy.
+# The setup callback has to write "RV32" into it, so it is declared with a raw pointer and cast.
+_FormatCb = ctypes.CFUNCTYPE(ctypes.c_uint, ctypes.POINTER(ctypes.c_void_p), ctypes.c_void_p,
+                             ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint),
+                             ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint))
+
+
+def attach_window(player, widget):
+    """Render player into widget's native window with the call libVLC expects on this platform."""
+    handle = int(widget.winId())
+    if sys.platform.startswith("win"):
+        player.set_hwnd(handle)
+    elif sys.platform == "darwin":
+        player.set_nsobject(handle)
+    else:
+        player.set_xwindow(handle)
+
+
+def _align(value, alignment=32):
+    return (value + alignment - 1) // alignment * alignment
+
+
+class VideoCallbackRenderer:
+    """Receives a player's pictures through libVLC video callbacks instead of a native window.
+
+    The setup callback asks libVLC for RV32 scaled down to fit max_size, so the decoder side
+    does the downscale, and points it at pre-allocated buffers that each have a QImage view on
+    them: handing a frame to Qt is a buffer swap, not a copy. Frames arriving faster than
+    max_fps are dropped at display time. All callbacks run on libVLC threads and only touch
+    state under the lock; paint() takes the same lock so a buffer is never rewritten mid-draw.
+    libVLC only asks for the size when it sets up its output, so a resized tile keeps the old
+    size until the viewer reopens it (see needs_reconfigure).
+    """
+    def __init__(self, max_size=(640, 360), max_fps=15):
+        self.max_size = max_size
+        self.max_fps = max_fps
+        self.width = 0
+        self.height = 0
+        self.pitch = 0
+        self.source_size = (0, 0)
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self._lock = threading.Lock()
+        self._buffers = []
+        self._images = []
+        self._front = None
+        self._locked = set()
+        self._dirty = False
+        self._last_display = 0.0
+        # ctypes callback objects must stay referenced for as long as libVLC may call them
+        self._setup_cb = _FormatCb(self._setup)
+        self._cleanup_cb = vlc.CallbackDecorators.VideoCleanupCb(self._cleanup)
+        self._lock_cb = vlc.CallbackDecorators.VideoLockCb(self._lock_picture)
+        self._unlock_cb = vlc.CallbackDecorators.VideoUnlockCb(self._unlock_picture)
+        self._display_cb = vlc.CallbackDecorators.VideoDisplayCb(self._display_picture)
+
+    def attach(self, player):
+        """Must be called before play(); the player keeps the renderer alive until it is released."""
+        player.video_set_callbacks(self._lock_cb, self._unlock_cb, self._display_cb, None)
+        player.video_set_format_callbacks(ctypes.cast(self._setup_cb, vlc.CallbackDecorators.VideoFormatCb),
+                                          self._cleanup_cb)
+        player.video_renderer = self
+
+    def set_max_size(self, width, height):
+        """Target size for the next time libVLC (re)configures the output; frames are scaled when painted meanwhile."""
+        self.max_size = (width, height)
+
+    def needs_reconfigure(self):
+        """True if the output libVLC set up is off max_size by more than RECONFIGURE_SLACK."""
+        with self._lock:
+            if not self.width:
+                return False
+            wanted = fit_frame(*self.source_size, self.max_size)[0]
+            return abs(wanted - self.width) > RECONFIGURE_SLACK * self.width
+
+    def _setup(self, opaque, chroma, width, height, pitches, lines):
+        try:
+            source_width, source_height = width[0], height[0]
+            out_width, out_height = fit_frame(source_width, source_height, self.max_size)
+            pitch = out_width * 4
+            rows = _align(out_height)
+            buffers = []
+            images = []
+            for _ in range(BUFFER_COUNT):
+                raw = (ctypes.c_ubyte * (pitch * rows + 32))()
+                address = _align(ctypes.addressof(raw))
+                buffers.append((raw, address))
+                images.append(QImage(sip.voidptr(address), out_width, out_height, pitch, QImage.Format_RGB32))
+            ctypes.memmove(chroma, b"RV32", 4)
+            width[0], height[0] = out_width, out_height
+            pitches[0], lines[0] = pitch, rows
+            with self._lock:
+                self.width, self.height, self.pitch = out_width, out_height, pitch
+                self.source_size = (source_width, source_height)
+                self._buffers, self._images = buffers, images
+                self._front = None
+                self._locked.clear()
+            return PICTURE_POOL
+        except Exception as e:
+            metrics.event(f"Error configuring video callbacks: {str(e)}", level="error")
+            return 0
+
+    def _cleanup(self, opaque):
+        with self._lock:
+            self._front = None
+            self._locked.clear()
+            self._dirty = True
+
+    def _lock_picture(self, opaque, planes):
+        with self._lock:
+            index = next((i for i in range(len(self._buffers)) if i != self._front and i not in self._locked), 0)
+            self._locked.add(index)
+            planes[0] = self._buffers[index][1]
+        # Non-zero identifier handed back to unlock/display
+        return index + 1
+
+    def _unlock_picture(self, opaque, picture, planes):
+        pass
+
+    def _display_picture(self, opaque, picture):
+        index = (picture or 1) - 1
+        now = time.monotonic()
+        with self._lock:
+            self._locked.discard(index)
+            if self.max_fps and now - self._last_display < 1.0 / self.max_fps:
+                self.frames_dropped += 1
+                return
+            self._front = index
+            self._last_display = now
+            self._dirty = True
+            self.frames_shown += 1
+
+    def has_frame(self):
+        with self._lock:
+            return self._front is not None
+
+    def take_dirty(self):
+        """True once per newly displayed frame (or cleared output) since the last call."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, False
+            return dirty
+
+    def paint(self, painter, rect):
+        """Draw the newest frame into rect keeping its aspect ratio; False if there is none yet."""
+        with self._lock:
+            if self._front is None:
+                return False
+            image = self._images[self._front]
+            scale = min(rect.width() / self.width, rect.height() / self.height)
+            target_width, target_height = int(self.width * scale), int(self.height * scale)
+            target = QRect(rect.x() + (rect.width() - target_width) // 2,
+                           rect.y() + (rect.height() - target_height) // 2, target_width, target_height)
+            painter.drawImage(target, image)
+            return True
+
+    def copy_frame(self):
+        """(bytes, width, height, pitch) copy of the newest frame in RV32, or None."""
+        with self._lock:
+            if self._front is None:
+                return None
+            address = self._buffers[self._front][1]
+            return ctypes.string_at(address, self.pitch * self.height), self.width, self.height, self.pitch
+
+
+class SharedFrameRenderer:
+    """Paints frames a decoder child process writes into shared memory (see decoder_process.py).
+
+    Same interface as VideoCallbackRenderer. The child never waits for the parent, so a frame
+    is copied out of its slot before it is drawn, and the copy is dropped if the header shows
+    a newer frame was published meanwhile, since the child may already be reusing that slot.
+    Size and frame-rate limits are sent to the child through on_limits; the child reports the
+    source size back (source_size) so needs_reconfigure can tell when a new size needs a reopen.
+    """
+    def __init__(self, buffer, slot_size, max_size=(640, 360), max_fps=15, on_limits=None):
+        self._header = FRAME_HEADER
+        self._slot_offset = frame_slot_offset
+        self._buffer = buffer
+        self.slot_size = slot_size
+        self.max_size = tuple(max_size)
+        self._max_fps = max_fps
+        self.on_limits = on_limits
+        self.width = 0
+        self.height = 0
+        self.pitch = 0
+        self.source_size = (0, 0)
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self._lock = threading.Lock()
+        self._seen = 0
+        self._frame = None
+        self._image = None
+
+    @property
+    def max_fps(self):
+        return self._max_fps
+
+    @max_fps.setter
+    def max_fps(self, value):
+        if value != self._max_fps:
+            self._max_fps = value
+            self._send_limits()
+
+    def set_max_size(self, width, height):
+        if (width, height) != self.max_size:
+            self.max_size = (width, height)
+            self._send_limits()
+
+    def needs_reconfigure(self):
+        with self._lock:
+            if not self.width or not self.source_size[0]:
+                return False
+            wanted = fit_frame(*self.source_size, self.max_size, self.slot_size)[0]
+            return abs(wanted - self.width) > RECONFIGURE_SLACK * self.width
+
+    def _send_limits(self):
+        if self.on_limits:
+            self.on_limits(self.max_size, self._max_fps)
+
+    def _read_header(self):
+        try:
+            return self._header.unpack_from(self._buffer, 0)
+        except ValueError:
+            # The player was released and its shared memory closed; keep showing the last frame
+            return None
+
+    def _sequence(self):
+        header = self._read_header()
+        return header[0] if header else self._seen
+
+    def _refresh(self):
+        """Copy the newest frame out of shared memory; True if there was a new one."""
+        header = self._read_header()
+        if header is None:
+            return False
+        seq, width, height, pitch, slot = header
+        if seq == self._seen or not width:
+            return False
+        start = self._slot_offset(slot, self.slot_size)
+        try:
+            data = bytes(self._buffer[start:start + pitch * height])
+        except ValueError:
+            return False
+        if self._sequence() != seq:
+            # Once a newer frame is shown this slot is free again and the child may be writing into it
+            self.frames_dropped += 1
+            return False
+        with self._lock:
+            self._seen = seq
+            self.width, self.height, self.pitch = width, height, pitch
+            self._frame = data
+            self._image = QImage(data, width, height, pitch, QImage.Format_RGB32)
+            self.frames_shown += 1
+        return True
+
+    def has_frame(self):
+        with self._lock:
+            return self._frame is not None or self._sequence() > 0
+
+    def take_dirty(self):
+        """True once per frame the child has written since the last call."""
+        return self._sequence() != self._seen and self._refresh()
+
+    def paint(self, painter, rect):
+        if self._image is None:
+            self._refresh()
+        with self._lock:
+            if self._image is None:
+                return False
+            scale = min(rect.width() / self.width, rect.height() / self.height)
+            target_width, target_height = int(self.width * scale), int(self.height * scale)
+            target = QRect(rect.x() + (rect.width() - target_width) // 2,
+                           rect.y() + (rect.height() - target_height) // 2, target_width, target_height)
+            painter.drawImage(target, self._image)
+            return True
+
+    def copy_frame(self):
+        if self._sequence() != self._seen:
+            self._refresh()
+        with self._lock:
+            if self._frame is None:
+                return None
+            return self._frame, self.width, self.height, self.pitch
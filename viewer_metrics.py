@@ -0,0 +1,197 @@
+import itertools
+import queue
+import threading
+import time
+import urllib.parse
+from collections import deque
+
+# When this process first imported viewer_metrics; the viewer imports it before anything heavy
+PROCESS_START = time.perf_counter()
+
+# Upper bounds in seconds for latency histograms (time to first frame, bring-up)
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+
+LEVELS = ("debug", "info", "warning", "error")
+
+
+def camera_label(url):
+    """url without its user:password, so metrics and events can be shared safely."""
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except ValueError:
+        return url
+    if "@" not in parts.netloc:
+        return url
+    return urllib.parse.urlunsplit(parts._replace(netloc=parts.netloc.rsplit("@", 1)[1]))
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+def _prometheus_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class ViewerMetrics:
+    """Counters, gauges and latency histograms keyed by name and labels, plus a ring of recent events.
+
+    Writers (GUI, health monitor, lifecycle threads) take one short lock. Readers never do:
+    publish() copies everything into an immutable snapshot and swaps it in, and snapshot()
+    just returns the current one, so the HTTP endpoint never contends with the writers.
+    Events replace console prints; with echo on they are written to stdout by a background
+    thread instead of the caller's.
+    """
+    def __init__(self, event_capacity=2000, echo=True, min_level="info"):
+        self.echo = echo
+        self.min_level = min_level
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._states = {}
+        self._events = deque(maxlen=event_capacity)
+        self._seq = itertools.count(1)
+        self._echo_queue = None
+        self._published = {"timestamp": 0.0, "counters": {}, "gauges": {}, "histograms": {}, "states": {},
+                           "events": ()}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            if value is None:
+                self._gauges.pop(key, None)
+            else:
+                self._gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0}
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    def transition(self, camera, state, **fields):
+        """Record that camera's tile entered state ("playing", "failed", "suspended", ...)."""
+        with self._lock:
+            previous = self._states.get(camera)
+            self._states[camera] = state
+        if previous != state:
+            self.inc("state_transitions_total", camera=camera, state=state)
+            self.event(f"{camera}: {previous or 'new'} -> {state}", camera=camera, level="debug", **fields)
+
+    def forget(self, camera):
+        """Drop every series labelled with camera, e.g. after it was removed from the wall."""
+        label = ("camera", str(camera))
+        with self._lock:
+            for series in (self._counters, self._gauges, self._histograms):
+                for key in [key for key in series if label in key[1]]:
+                    del series[key]
+            self._states.pop(camera, None)
+
+    def event(self, message, camera=None, level="info", **fields):
+        if LEVELS.index(level) < LEVELS.index(self.min_level):
+            return
+        record = {"seq": next(self._seq), "timestamp": time.time(), "level": level, "message": message}
+        if camera is not None:
+            record["camera"] = camera
+        if fields:
+            record["fields"] = fields
+        with self._lock:
+            self._events.append(record)
+        if self.echo:
+            self._echo(record)
+
+    def _echo(self, record):
+        if self._echo_queue is None:
+            with self._lock:
+                if self._echo_queue is None:
+                    self._echo_queue = queue.SimpleQueue()
+                    threading.Thread(target=self._run_echo, name="metrics-echo", daemon=True).start()
+        self._echo_queue.put(record)
+
+    def _run_echo(self):
+        while True:
+            record = self._echo_queue.get()
+            if record is None:
+                return
+            print(record["message"] if record["level"] == "info" else f"[{record['level']}] {record['message']}",
+                  flush=True)
+
+    def publish(self):
+        """Build a new immutable snapshot from the live series; cheap enough to call every second."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: {"buckets": tuple(value["buckets"]), "count": value["count"], "sum": value["sum"]}
+                          for key, value in self._histograms.items()}
+            states = dict(self._states)
+            events = tuple(self._events)
+        self._published = {"timestamp": time.time(), "counters": counters, "gauges": gauges,
+                           "histograms": histograms, "states": states, "events": events}
+        return self._published
+
+    def snapshot(self):
+        """The last published snapshot; never blocks and is never modified afterwards."""
+        return self._published
+
+    def events(self, since=0):
+        return [record for record in self.snapshot()["events"] if record["seq"] > since]
+
+    def as_json(self, snapshot=None):
+        """JSON-friendly form of a snapshot, series grouped by name."""
+        snapshot = snapshot or self.snapshot()
+        result = {"timestamp": snapshot["timestamp"], "counters": {}, "gauges": {}, "histograms": {},
+                  "states": snapshot["states"]}
+        for section in ("counters", "gauges"):
+            for (name, key), value in snapshot[section].items():
+                result[section].setdefault(name, []).append({"labels": dict(key), "value": value})
+        for (name, key), value in snapshot["histograms"].items():
+            result["histograms"].setdefault(name, []).append(
+                {"labels": dict(key), "buckets": dict(zip(LATENCY_BUCKETS, value["buckets"])),
+                 "count": value["count"], "sum": round(value["sum"], 6)})
+        return result
+
+    def prometheus_text(self, snapshot=None, prefix="vms_"):
+        """A snapshot in the Prometheus text exposition format."""
+        snapshot = snapshot or self.snapshot()
+        lines = []
+        for section, kind in (("counters", "counter"), ("gauges", "gauge")):
+            for name in sorted({name for name, _ in snapshot[section]}):
+                lines.append(f"# TYPE {prefix}{name} {kind}")
+                for (series, key), value in sorted(snapshot[section].items()):
+                    if series == name:
+                        lines.append(f"{prefix}{name}{_prometheus_labels(key)} {value}")
+        for name in sorted({name for name, _ in snapshot["histograms"]}):
+            lines.append(f"# TYPE {prefix}{name} histogram")
+            for (series, key), value in sorted(snapshot["histograms"].items()):
+                if series != name:
+                    continue
+                for bound, count in zip(LATENCY_BUCKETS, value["buckets"]):
+                    lines.append(f"{prefix}{name}_bucket{_prometheus_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{prefix}{name}_bucket{_prometheus_labels(key, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{prefix}{name}_count{_prometheus_labels(key)} {value['count']}")
+                lines.append(f"{prefix}{name}_sum{_prometheus_labels(key)} {value['sum']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self._echo_queue is not None:
+            self._echo_queue.put(None)
+
+
+# Shared by everything in the viewer process, like the root logger
+metrics = ViewerMetrics()